@@ -0,0 +1,213 @@
+"""Manifest of the files stored in one cache directory.
+Each cache file is recorded when it is written as one line of a JSON-lines file
+(timesteps, shape, dtype, size, modification time and checksum), so that checking
+the cache does not require opening every file"""
+
+import os
+import glob
+import json
+import fnmatch
+import hashlib
+import threading
+
+import xarray as xr
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+
+def file_stat(path):
+    """
+    Size and modification time of a cache file (netCDF file or Zarr store)
+    :param path: filename
+    :return: size in bytes and modification time in ns
+    """
+    if os.path.isdir(path):
+        size = sum(os.path.getsize(os.path.join(_root, _file))
+                   for _root, _, _files in os.walk(path) for _file in _files)
+    else:
+        size = os.path.getsize(path)
+    return size, os.stat(path).st_mtime_ns
+
+
+def file_checksum(path):
+    """
+    SHA1 checksum of a cache file (for Zarr stores over all files within the store)
+    :param path: filename
+    :return: checksum as hex string
+    """
+    _hash = hashlib.sha1()
+    if os.path.isdir(path):
+        _files = sorted(os.path.relpath(os.path.join(_root, _file), path)
+                        for _root, _, _files in os.walk(path) for _file in _files)
+    else:
+        _files = [None]
+
+    for _file in _files:
+        _path = path if _file is None else os.path.join(path, _file)
+        if _file is not None:
+            _hash.update(_file.encode())
+        with open(_path, 'rb') as _fh:
+            for _block in iter(lambda: _fh.read(2**20), b''):
+                _hash.update(_block)
+    return _hash.hexdigest()
+
+
+def open_cache_file(path):
+    """
+    Open cache file (netCDF file or Zarr store) and return first data variable
+    :param path: filename
+    :return: xarray DataArray
+    """
+    _kwargs = {'engine': 'zarr'} if path.endswith('.zarr') else {}
+    with xr.open_dataset(path, **_kwargs) as ds_in:
+        return ds_in[list(ds_in.data_vars)[0]]
+
+
+class CacheManifest:
+    """ Append-only manifest of the cache files in one directory.
+    Later lines override earlier ones for the same file """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.filename = f'{directory}/{MANIFEST_NAME}'
+        self._entries = None
+        # entries may be recorded from several threads (e.g. concurrent downloads)
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def describe(path, da=None, checksum=True):
+        """
+        Create manifest entry for a cache file
+        :param path: filename
+        :param da: data saved in the file (opened from the file if None, only the header is read)
+        :param checksum: compute checksum (reads the complete file), otherwise sha1 is set to None
+        :return: dictionary
+        """
+        if da is None:
+            da = open_cache_file(path)
+        size, mtime_ns = file_stat(path)
+        return {'file': os.path.basename(path),
+                'ntime': int(da.sizes.get('time', 0)),
+                'dims': list(da.dims),
+                'shape': [int(_size) for _size in da.shape],
+                'dtype': str(da.dtype),
+                'size': size,
+                'mtime_ns': mtime_ns,
+                'sha1': file_checksum(path) if checksum else None}
+
+    @property
+    def entries(self):
+        """ dictionary of manifest entries (filename: entry) """
+        with self._lock:
+            return self._read_entries()
+
+    def _read_entries(self):
+        """ Read manifest file if not done yet """
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.filename):
+                with open(self.filename, encoding='utf-8') as _fh:
+                    for _line in _fh:
+                        try:
+                            self._update(json.loads(_line))
+                        except ValueError:
+                            # incomplete line (e.g. interrupted task)
+                            continue
+        return self._entries
+
+    def _update(self, entry):
+        """ Add entry to entries in memory """
+        if entry.get('removed'):
+            self._entries.pop(entry['file'], None)
+        else:
+            self._entries[entry['file']] = entry
+
+    def _append(self, entry):
+        """
+        Append entry to manifest. The line is written with one call in append mode,
+        so that concurrent tasks writing to the same directory don't mix their entries
+        :param entry: dictionary
+        """
+        with self._lock:
+            self._read_entries()
+            _line = json.dumps(entry) + '\n'
+            # start new line if the last write was interrupted
+            if os.path.exists(self.filename) and os.path.getsize(self.filename) > 0:
+                with open(self.filename, 'rb') as _fh:
+                    _fh.seek(-1, os.SEEK_END)
+                    if _fh.read(1) != b'\n':
+                        _line = '\n' + _line
+            with open(self.filename, 'a', encoding='utf-8') as _fh:
+                _fh.write(_line)
+            self._update(entry)
+
+    def record(self, path, da=None, checksum=True):
+        """
+        Record cache file in manifest (needs to be called after the file has been written)
+        :param path: filename
+        :param da: data saved in the file (opened from the file if None)
+        :param checksum: compute checksum of the file
+        :return: manifest entry
+        """
+        entry = self.describe(path, da, checksum=checksum)
+        self._append(entry)
+        return entry
+
+    def remove(self, path):
+        """
+        Record that a cache file has been removed
+        :param path: filename
+        """
+        if os.path.basename(path) in self.entries:
+            self._append({'file': os.path.basename(path), 'removed': True})
+
+    def lookup(self, path):
+        """
+        Manifest entry of a cache file. Entries are only returned if size and modification
+        time still match the file on disk
+        :param path: filename
+        :return: manifest entry or None if the file is not (correctly) recorded
+        """
+        entry = self.entries.get(os.path.basename(path))
+        if entry is None or not os.path.exists(path):
+            return None
+        if list(file_stat(path)) != [entry['size'], entry['mtime_ns']]:
+            return None
+        return entry
+
+    def files(self, pattern='*'):
+        """
+        Recorded files matching pattern
+        :param pattern: glob pattern for the filename
+        :return: list of filenames (including directory)
+        """
+        return [f'{self.directory}/{_file}' for _file in self.entries
+                if fnmatch.fnmatch(_file, pattern)]
+
+    def rebuild(self, pattern='*'):
+        """
+        Rebuild manifest entries of all cache files in the directory matching pattern
+        (including checksums). Entries of files not matching pattern are kept if the files
+        still exist. The new manifest replaces the old one atomically
+        :param pattern: glob pattern of the files to be recorded
+        :return: number of recorded files matching pattern
+        """
+        entries = [self.describe(_file)
+                   for ext in ['nc', 'zarr']
+                   for _file in sorted(glob.glob(f'{self.directory}/{pattern}.{ext}'))]
+        if not entries and not os.path.exists(self.filename):
+            return 0
+
+        with self._lock:
+            self._entries = None
+            _kept = [entry for _file, entry in self._read_entries().items()
+                     if not any(fnmatch.fnmatch(_file, f'{pattern}.{ext}') for ext in ['nc', 'zarr'])
+                     and os.path.exists(f'{self.directory}/{_file}')]
+
+            _tmpfile = f'{self.filename}.{os.getpid()}.tmp'
+            with open(_tmpfile, 'w', encoding='utf-8') as _fh:
+                for entry in _kept + entries:
+                    _fh.write(json.dumps(entry) + '\n')
+            os.replace(_tmpfile, self.filename)
+            self._entries = None
+        return len(entries)
@@ -145,6 +145,8 @@ class CdsData(dataobjects.ForecastObject):
 
         members = range(int(self.enssize))
 
+        if self.cache_layout != 'member':
+            return [self._save_filename_ensemble(date, self.grid) for date in dates]
 
         files = [filename.format(date, member, self.params, self.grid)
                  for date in dates
@@ -223,19 +225,26 @@ class CdsData(dataobjects.ForecastObject):
 
 
             if self.keep_native == "yes":
-                for number in da_out['number'].values:
-                    da_out_save = da_out.isel(time=slice(self.ndays))
-                    ofile = self._save_filename(date=startdate, number=number, grid='native')
-                    da_out_save.sel(number=number).to_netcdf(ofile)
-
-
-            # save interpolated files if interpolation is necessary
-            for number in da_out['number'].values:
-                if self.linterp:
-                    da_out_save = self.interpolate(da_out.sel(number=number))
+                if self.cache_layout != 'member':
+                    self.save_ensemble(da_out.isel(time=slice(self.ndays)), startdate, 'native')
                 else:
-                    da_out_save = da_out.sel(number=number)
+                    for number in da_out['number'].values:
+                        da_out_save = da_out.isel(time=slice(self.ndays))
+                        ofile = self._save_filename(date=startdate, number=number, grid='native')
+                        self.save_cache_file(da_out_save.sel(number=number), ofile)
+
+            # interpolate all members at once (if interpolation is necessary)
+            if self.linterp:
+                da_out_grid = self.interpolate(da_out)
+            else:
+                da_out_grid = da_out
+
+            if self.cache_layout != 'member':
+                ofile = self.save_ensemble(da_out_grid, startdate, self.grid)
+                print(ofile)
+                continue
 
+            for number in da_out_grid['number'].values:
                 ofile = self._save_filename(date=startdate, number=number, grid=self.grid)
-                da_out_save.to_netcdf(ofile)
+                self.save_cache_file(da_out_grid.sel(number=number), ofile)
                 print(ofile)
@@ -25,7 +25,8 @@ def add_staging_mode(parser):
 
 def add_plotid(parser):
     """Add to parser a positional argument to specify plotid from config."""
-    helpstr = 'plotid [name followed by plot_* in config]'
+    helpstr = 'plotid [name followed by plot_* in config], ' \
+              'several comma-separated plotids are plotted in one process sharing data'
     parser.add_argument('plotid', help=helpstr)
 
 def add_plot_config_option(parser):
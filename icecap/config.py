@@ -147,6 +147,7 @@ class Configuration():
         self.additional_mask = None
         self.calib_method =None
         self.calib_exists = None
+        self.calib_update = None
         self.nsidc_region = None
         self.copy_id = None
 
@@ -295,6 +296,7 @@ class Configuration():
                 additional_mask = self.additional_mask,
                 calib_method=self.calib_method,
                 calib_exists = self.calib_exists,
+                calib_update = self.calib_update,
                 copy_id = self.copy_id
                 )
 
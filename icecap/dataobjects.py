@@ -5,14 +5,21 @@ import os
 import glob
 import datetime as dt
 import shutil
+import hashlib
+import tempfile
 from dateutil.relativedelta import relativedelta
 
 
-import xesmf as xe
+import numpy as np
 import xarray as xr
 
 import utils
 import forecast_info
+import regrid
+import cache_manifest
+
+# approximate size of one chunk (in bytes) of consolidated ensemble cache files
+ENSEMBLE_CHUNK_BYTES = 64 * 1024**2
 
 class DataObject:
     """ Parent data object, with attributes valid
@@ -23,12 +30,16 @@ class DataObject:
         self.filelist = None
         self.verif_name = conf.verdata
         self.cacherootdir = conf.cachedir
+        self.etcdir = conf.etcdir
         self.salldates = conf.salldates
         self.linterp = False
         self.regridder = None
+        self.ds_ref = None
         self.grid = self.verif_name.replace("-grid","")
         self.keep_native = conf.keep_native
+        self.cache_layout = conf.cache_layout
         self.files_to_retrieve = []
+        self.manifests = {}
         self.tmptargetfile = None
         self.periodic = None
         self.ndays = None
@@ -67,11 +78,18 @@ class DataObject:
                 self.files_to_retrieve.append(file)
             else:
                 if check_level > 1:
-                    ds_in = xr.open_dataset(f'{file}')
-                    if len(ds_in.time) < self.ndays:
+                    # number of timesteps is taken from the manifest if the file is recorded.
+                    # Otherwise only the header is read and the file is recorded without
+                    # checksum (checksums can be added with rebuild_manifest.py)
+                    manifest = self.manifest(os.path.dirname(file))
+                    entry = manifest.lookup(file)
+                    if entry is None:
+                        entry = manifest.record(file, checksum=False)
+                    ntime = entry['ntime']
+                    if ntime < self.ndays:
                         if verbose:
                             print(f'Not all timesteps needed found in {file}'
-                                  f' {len(ds_in.time)} < {self.ndays}')
+                                  f' {ntime} < {self.ndays}')
                         self.files_to_retrieve.append(file)
 
 
@@ -80,6 +98,42 @@ class DataObject:
 
         return True
 
+    @staticmethod
+    def _open_cache_file(file, **kwargs):
+        """
+        Open cache file either stored as netCDF or as Zarr store
+        :param file: filename
+        :param kwargs: keyword arguments passed to xr.open_dataset
+        :return: xarray Dataset
+        """
+        if file.endswith('.zarr'):
+            kwargs['engine'] = 'zarr'
+        return xr.open_dataset(file, **kwargs)
+
+    def manifest(self, directory):
+        """
+        Manifest of the cache files in directory
+        :param directory: cache directory
+        :return: cache_manifest.CacheManifest
+        """
+        directory = os.path.normpath(directory)
+        if directory not in self.manifests:
+            # setdefault as manifests might be requested from several threads
+            self.manifests.setdefault(directory, cache_manifest.CacheManifest(directory))
+        return self.manifests[directory]
+
+    def save_cache_file(self, da, ofile):
+        """
+        Save data as netCDF file in cachedir and record it in the manifest.
+        The file is written to a temporary file first, so that incomplete files are never picked up
+        :param da: xarray DataArray
+        :param ofile: filename
+        """
+        ofile_tmp = f'{ofile}.tmp{os.getpid()}'
+        da.to_netcdf(ofile_tmp)
+        os.replace(ofile_tmp, ofile)
+        self.manifest(os.path.dirname(ofile)).record(ofile, da)
+
     def make_filelist(self):
         """
         Create list of files to be saved in cachedir
@@ -91,23 +145,25 @@ class DataObject:
 
     def interpolate(self, ds_raw):
         """
-        Interpolate forecast to observation grid
+        Interpolate forecast to observation grid. All leading dimensions (e.g. number and time)
+        are interpolated at once, so whole ensembles should be passed instead of single members
         :param ds_raw: raw forecast xarray object
         :return: interpolated field as xarray object
         """
         if self.periodic is None:
             raise ValueError("Class attribute periodic used in interpolate can't be set to None")
 
-        ref_file = f'{self.obscachedir}/{self.verif_name}.nc'
-        ds_ref = xr.open_dataarray(ref_file)
+        # the reference grid is read only once and kept in memory
+        if self.ds_ref is None:
+            ref_file = f'{self.obscachedir}/{self.verif_name}.nc'
+            with xr.open_dataarray(ref_file) as _ds_ref:
+                self.ds_ref = _ds_ref.load()
+        ds_ref = self.ds_ref
 
         if self.regridder is None:
-            utils.print_info('Computing weights')
-
-            self.regridder = xe.Regridder(ds_raw.rename({'longitude': 'lon', 'latitude': 'lat'}),
-                                          ds_ref.rename({'longitude': 'lon', 'latitude': 'lat'}),
-                                          "bilinear", periodic=self.periodic,
-                                          unmapped_to_nan=True)
+            self.regridder = self._get_regridder(ds_raw.rename({'longitude': 'lon', 'latitude': 'lat'}),
+                                                 ds_ref.rename({'longitude': 'lon', 'latitude': 'lat'}),
+                                                 "bilinear")
 
         ds_out = self.regridder(ds_raw.rename({'longitude': 'lon', 'latitude': 'lat'}))
 
@@ -122,10 +178,65 @@ class DataObject:
                            'true_scale_latitude']:
             if proj_param in ds_ref.attrs:
                 ds_out.attrs[proj_param] = getattr(ds_ref,proj_param)
-        ds_ref.close()
 
         return ds_out
 
+    @property
+    def weightsdir(self):
+        """ directory storing the interpolation weights """
+        return f'{self.cacherootdir}/weights'
+
+    def _weights_filename(self, ds_in, ds_ref, method):
+        """
+        Filename of interpolation weights. The name contains a hash of the source and target
+        grid coordinates, the interpolation method and the periodicity of the source grid
+        :param ds_in: xarray object on source grid (with lon/lat)
+        :param ds_ref: xarray object on target grid (with lon/lat)
+        :param method: interpolation method used by xesmf
+        :return: filename
+        """
+        _hash = hashlib.sha1()
+        for _coord in [ds_in['lon'], ds_in['lat'], ds_ref['lon'], ds_ref['lat']]:
+            _values = np.ascontiguousarray(_coord.values, dtype='float64')
+            _hash.update(repr(_values.shape).encode())
+            _hash.update(_values.tobytes())
+        _hash.update(f'{method}_{self.periodic}'.encode())
+        return f'{self.weightsdir}/{method}_{_hash.hexdigest()[:16]}.nc'
+
+    def _get_regridder(self, ds_in, ds_ref, method):
+        """
+        Create regridder applying precomputed sparse weights. Weights are read from the weights
+        directory if they have been computed before (e.g. by another retrieval task) or from
+        etc/weights if they are shipped with the code. Otherwise they are computed with xesmf
+        and saved. The file is written to a unique temporary file first and then renamed,
+        so that concurrent tasks computing the same weights never read incomplete files
+        :param ds_in: xarray object on source grid (with lon/lat)
+        :param ds_ref: xarray object on target grid (with lon/lat)
+        :param method: interpolation method used by xesmf
+        :return: regrid.Regridder
+        """
+        weights_file = self._weights_filename(ds_in, ds_ref, method)
+        for _file in [weights_file, f'{self.etcdir}/weights/{os.path.basename(weights_file)}']:
+            if os.path.exists(_file):
+                return regrid.Regridder(_file, ds_in, ds_ref)
+
+        utils.print_info('Computing weights')
+        # xesmf (and ESMF) are only needed if weights have to be computed
+        import xesmf as xe
+        regridder = xe.Regridder(ds_in, ds_ref, method, periodic=self.periodic,
+                                 unmapped_to_nan=True)
+
+        os.makedirs(self.weightsdir, exist_ok=True)
+        _fd, _tmpfile = tempfile.mkstemp(dir=self.weightsdir, suffix='.tmp')
+        os.close(_fd)
+        try:
+            regridder.to_netcdf(_tmpfile)
+            os.replace(_tmpfile, weights_file)
+        finally:
+            if os.path.exists(_tmpfile):
+                os.remove(_tmpfile)
+        return regrid.Regridder(weights_file, ds_in, ds_ref)
+
     def clean_up(self):
         """ Remove temporary files"""
         if self.tmptargetfile is not None:
@@ -141,11 +252,24 @@ class DataObject:
         """
         if args == 'fc':
             return '{}_mem-{:03d}_{}_{}.nc'
+        if args == 'fc_ens':
+            return '{}_ens-{}_{}_{}.nc'
+        if args == 'fc_zarr':
+            return '{}_ens-{}_{}_{}.zarr'
         if args == 'verif':
             return '{}_{}.nc'
 
         raise f'Argument {args} not supported'
 
+    def _ensemble_filenaming_convention(self):
+        """
+        Naming convention for consolidated ensemble cache files (one file per start date)
+        depending on the cache layout (ensemble or zarr)
+        """
+        if self.cache_layout == 'zarr':
+            return self._filenaming_convention('fc_zarr')
+        return self._filenaming_convention('fc_ens')
+
 class ForecastObject(DataObject):
     """ Generic ForecastObject used for staging
     A ForecastObject holds the variables of one specific ForecastConfigObject
@@ -176,6 +300,10 @@ class ForecastObject(DataObject):
 
         self.sdates = fcast.sdates
 
+        # label of the ensemble members stored in one consolidated cache file
+        # (only used if cache_layout is not member)
+        self.ensemble_block = 'fc'
+
         if self.mode == 'hc':
             self.shcdates = fcast.shcdates
             self.refdate = fcast.shcrefdate
@@ -204,11 +332,18 @@ class ForecastObject(DataObject):
             for date in self.refdate:
                 self.cycle = self.init_cycle(date)
                 _fccachedir = self.init_cachedir()
-                files_to_add =  glob.glob(f'{_fccachedir}/*_native.nc')
-                file_list += files_to_add
+                # files not recorded in the manifest (written by older versions) are removed as well
+                files_to_add = self.manifest(_fccachedir).files('*_native.*')
+                files_to_add += glob.glob(f'{_fccachedir}/*_native.nc')
+                files_to_add += glob.glob(f'{_fccachedir}/*_native.zarr')
+                file_list += [file for file in files_to_add if file not in file_list]
 
             for file in file_list:
-                os.remove(file)
+                if os.path.isdir(file):
+                    shutil.rmtree(file)
+                elif os.path.exists(file):
+                    os.remove(file)
+                self.manifest(os.path.dirname(file)).remove(file)
 
     def init_cycle(self, date):
         """
@@ -263,6 +398,61 @@ class ForecastObject(DataObject):
                                self.params,
                                grid)
 
+    def _save_filename_ensemble(self, date, grid):
+        """
+        Create cache file name of consolidated ensemble file
+        :param date: date of forecast
+        :param grid: grid information
+        :return: outfile name as string
+        """
+
+        filename = self._ensemble_filenaming_convention()
+        _cachedir = self.init_cachedir()
+        return f'{_cachedir}/' + \
+               filename.format(date,
+                               self.ensemble_block,
+                               self.params,
+                               grid)
+
+    def save_ensemble(self, da, date, grid):
+        """
+        Save all members of one start date as one consolidated cache file (netCDF4 or Zarr)
+        with chunks (member=all, time=block, spatial dims)
+        :param da: xarray DataArray with dimension number
+        :param date: date of forecast
+        :param grid: grid information
+        :return: outfile name as string
+        """
+        ofile = self._save_filename_ensemble(date, grid)
+
+        da = da.rename({'number': 'member'}).transpose('member', 'time', ...)
+        da = da.drop_vars([i for i in da.coords if i not in list(da.dims) + ['longitude', 'latitude']])
+
+        nbytes_step = da.isel(time=0).nbytes
+        tchunk = int(min(len(da.time), max(1, ENSEMBLE_CHUNK_BYTES // nbytes_step)))
+        chunks = dict(zip(da.dims, da.shape))
+        chunks['time'] = tchunk
+
+        # write to temporary file first so that incomplete files are never picked up
+        ofile_tmp = f'{ofile}.tmp{os.getpid()}'
+        ofile_old = None
+        if self.cache_layout == 'zarr':
+            da.chunk(chunks).to_dataset().to_zarr(ofile_tmp, mode='w')
+            # a Zarr store (directory) can't replace an existing one, so the old store
+            # is moved aside first and only deleted once the new store is in place
+            if os.path.exists(ofile):
+                ofile_old = f'{ofile}.old{os.getpid()}'
+                os.replace(ofile, ofile_old)
+        else:
+            enc = {da.name: {'chunksizes': [chunks[d] for d in da.dims]}}
+            da.to_dataset().to_netcdf(ofile_tmp, encoding=enc)
+        os.replace(ofile_tmp, ofile)
+        if ofile_old is not None:
+            shutil.rmtree(ofile_old)
+        self.manifest(os.path.dirname(ofile)).record(ofile, da)
+
+        return ofile
+
     @staticmethod
     def get_cycle(date):
         """
@@ -278,6 +468,19 @@ class ForecastObject(DataObject):
         return cycle
 
 
+def ensemble_blocks(source, fcsystem):
+    """
+    Labels of consolidated ensemble cache files for one start date.
+    ECMWF ensembles (except long-range) are staged separately for the control (cf)
+    and the perturbed (pf) forecast, all other sources stage all members together
+    :param source: source of the forecast
+    :param fcsystem: forecast system type of the experiment
+    :return: list of labels
+    """
+    if source == 'ecmwf' and fcsystem in ['extended-range', 'medium-range', 's2s']:
+        return ['cf', 'pf']
+    return ['fc']
+
 def define_fccachedir(**kwargs):
     """
     Retrive forecast cache directory
@@ -457,6 +660,7 @@ class PlotConfigObject:
         self.additional_mask = kwargs['additional_mask']
         self.calib_method = kwargs['calib_method']
         self.calib_exists = kwargs['calib_exists']
+        self.calib_update = kwargs['calib_update']
         self.copy_id = kwargs['copy_id']
 
     @property
@@ -288,6 +288,7 @@ class EcmwfData(dataobjects.ForecastObject):
 
         if args.exptype not in ['WIPE']:
             self.type = args.exptype
+            self.ensemble_block = self.type
             self.ldmean = False
             if self.fcsystem in ['extended-range', 'medium-range']:
                 self.ldmean = True
@@ -432,6 +433,9 @@ class EcmwfData(dataobjects.ForecastObject):
         if self.fcsystem in ['long-range']:
             members = range(int(self.enssize))
 
+        if self.cache_layout != 'member':
+            return [self._save_filename_ensemble(date, self.grid) for date in dates]
+
         files = [filename.format(date, member, self.params, self.grid)
                  for date in dates
                  for member in members]
@@ -463,6 +467,11 @@ class EcmwfData(dataobjects.ForecastObject):
 
         xr.set_options(keep_attrs=True)
 
+        # members for consolidated ensemble files (cache_layout ensemble/zarr) are
+        # collected for each startdate and saved after all files have been processed
+        _ensemble_native = {}
+        _ensemble_grid = {}
+
         for file in self._make_download_filelist():
             print(file)
 
@@ -521,16 +530,31 @@ class EcmwfData(dataobjects.ForecastObject):
 
 
             if self.keep_native == "yes":
-                for number in da_out['number'].values:
-                    da_out_save = da_out.isel(time=slice(self.ndays))
-                    ofile = self._save_filename(date=startdate, number=number, grid='native')
-                    da_out_save.sel(number=number).to_netcdf(ofile)
-
-            # save interpolated files if interpolation is necessary
-            for number in da_out['number'].values:
-                if self.linterp:
-                    da_out_save = self.interpolate(da_out.sel(number=[number]))
+                if self.cache_layout != 'member':
+                    _ensemble_native.setdefault(startdate, []).append(da_out.isel(time=slice(self.ndays)))
                 else:
-                    da_out_save = da_out.sel(number=number)
+                    for number in da_out['number'].values:
+                        da_out_save = da_out.isel(time=slice(self.ndays))
+                        ofile = self._save_filename(date=startdate, number=number, grid='native')
+                        self.save_cache_file(da_out_save.sel(number=number), ofile)
+
+            # interpolate all members at once (if interpolation is necessary)
+            if self.linterp:
+                da_out_grid = self.interpolate(da_out)
+            else:
+                da_out_grid = da_out
+
+            if self.cache_layout != 'member':
+                _ensemble_grid.setdefault(startdate, []).append(da_out_grid)
+                continue
+
+            for number in da_out_grid['number'].values:
                 ofile = self._save_filename(date=startdate, number=number, grid=self.grid)
-                da_out_save.sel(number=number).to_netcdf(ofile)
+                self.save_cache_file(da_out_grid.sel(number=number), ofile)
+
+        for startdate, da_list in _ensemble_native.items():
+            self.save_ensemble(xr.concat(da_list, dim='number'), startdate, 'native')
+
+        for startdate, da_list in _ensemble_grid.items():
+            ofile = self.save_ensemble(xr.concat(da_list, dim='number'), startdate, self.grid)
+            print(ofile)
@@ -6,7 +6,7 @@ import utils
 from nersc_tmp_get import nersc_tmp_api
 from cds_get import cds_api
 from verdata_get import verdata_api
-from plot import plot_api
+from plot import plot_api_multi
 
 
 class ProcesstreeSequential(flow.Tree):
@@ -66,16 +66,12 @@ class ProcesstreeSequential(flow.Tree):
         :param plotid_select: if None plot all plotsets, otherwise only selected
         :return: list of output files
         """
-        ofiles_all = []
         if plotid_select is None:
             loop_ids = self.conf.plotsets.keys()
         else:
             loop_ids = utils.convert_to_list(plotid_select)
 
-        for plotid in loop_ids:
-            args.plotid = plotid
-            ofiles = plot_api(self.conf, args)
-            ofiles_all += ofiles
+        ofiles_all = plot_api_multi(self.conf, args, list(loop_ids))
 
         return ofiles_all
 
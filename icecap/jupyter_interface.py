@@ -404,6 +404,7 @@ class ConfigurationJupyter(config.Configuration):
             additional_mask=self.additional_mask,
             calib_method=self.calib_method,
             calib_exists=self.calib_exists,
+            calib_update=self.calib_update,
             copy_id=self.copy_id
         )
 
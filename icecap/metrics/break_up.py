@@ -6,6 +6,7 @@ import matplotlib
 from matplotlib import pyplot as plt
 from matplotlib.colors import ListedColormap
 import utils
+import metrics.metric_utils as mutils
 from .metric import BaseMetric
 
 
@@ -59,45 +60,7 @@ class Metric(BaseMetric):
         :param ds: dataarray ith sea ice forecast data
         :return: day of sea ice break up (sic<threshold)
         """
-        # mask based on threshold (1 water, 0 ice)
-        ds_water = xr.where(ds == 0, 1, 0)
-        ds_water = xr.where(np.isnan(ds), np.nan, ds_water)
-
-        # mask of all members having always water
-        mask_water_member = xr.where(ds.max(dim='time') ==0, np.nan, 1)
-        # mask of all members having always ice
-        mask_ice_member = xr.where(ds.min(dim='time') == 1, np.nan, 1)
-        # mask per member last 7 days (<1 if at least one ice day)
-        mask_end_member = ds_water.isel(time=np.arange(-7, 0)).mean(dim='time')
-        mask_end_member = xr.where(mask_end_member<1,np.nan,1)
-
-        #mask ds_water usign all masks above
-        ds_mask_all = mask_water_member * mask_ice_member * mask_end_member
-        ds_water_masked = xr.where(ds_mask_all==1, ds_water, 0)
-
-        # observations can have nan values. We put them back in here and assume that they are ice
-        ds_water_masked = xr.where(~np.isnan(ds), ds_water_masked, np.nan)
-        ds_water_masked = xr.where(xr.where(np.isnan(ds), 1, 0).mean(dim='time') == 1, 0, ds_water_masked)
-
-        # change coordinate to increasing array and reverse xarray along time dim
-        # this option preferred to reindex (https://github.com/pydata/xarray/discussions/6695)
-        ds_water_masked_reverse = ds_water_masked.isel(time=slice(None, None, -1))
-
-
-        # this finds the first instance where the field is 0 (meaning > threshold)
-        # we have to subtract 1 to get the date of ice free conditions
-        ds_fc_day = ds_water_masked_reverse.argmin(dim='time') - 1
-        ds_fc_day = len(ds_water_masked_reverse.time.values) - ds_fc_day - 1
-
-        # set ice mask entries to -300 and water entries to -200
-        ds_fc_day = xr.where((mask_ice_member * mask_end_member)==1,ds_fc_day,180)
-        ds_fc_day = xr.where(mask_water_member == 1, ds_fc_day, 0)
-
-        # needed as xr.where does not preserve attributes
-        ds_fc_day = ds_fc_day.assign_attrs(ds.attrs)
-
-
-        return ds_fc_day, mask_water_member, (mask_ice_member * mask_end_member)
+        return mutils.ice_event_dates(ds, 'break_up')
 
     def compute(self):
         """ Compute metric """
@@ -137,20 +100,16 @@ class Metric(BaseMetric):
                 da_verdata_calib = processed_data_dict['da_verdata_calib']
 
                 da_fc_calib_metric, _, _ = self.break_up(da_fc_calib)
-                da_fc_calib_metric = da_fc_calib_metric.chunk(dict(date=-1, member=-1))
-                da_fc_calib_metric_upper = da_fc_calib_metric.quantile(2 / 3, dim=('member', 'date'))
-                da_fc_calib_metric_lower = da_fc_calib_metric.quantile(1 / 3, dim=('member', 'date'))
-
-                da_fc_calib_metric_upper = da_fc_calib_metric_upper.drop_vars('quantile')
-                da_fc_calib_metric_lower = da_fc_calib_metric_lower.drop_vars('quantile')
+                # all terciles (and median) are computed at once
+                da_fc_calib_metric_q = mutils.quantiles(da_fc_calib_metric, [2 / 3, 1 / 3], dim=('member', 'date'))
+                da_fc_calib_metric_upper = da_fc_calib_metric_q.isel(quantile=0, drop=True)
+                da_fc_calib_metric_lower = da_fc_calib_metric_q.isel(quantile=1, drop=True)
 
                 # verdata calib
                 da_verdata_calib_metric, _, _ = self.break_up(da_verdata_calib)
-                da_verdata_calib_metric = da_verdata_calib_metric.chunk(dict(date=-1))
-                da_verdata_calib_metric_upper = da_verdata_calib_metric.quantile(2 / 3, dim=('date'))
-                da_verdata_calib_metric_lower = da_verdata_calib_metric.quantile(1 / 3, dim=('date'))
-                da_verdata_calib_metric_lower = da_verdata_calib_metric_lower.drop_vars('quantile')
-                da_verdata_calib_metric_upper = da_verdata_calib_metric_upper.drop_vars('quantile')
+                da_verdata_calib_metric_q = mutils.quantiles(da_verdata_calib_metric, [2 / 3, 1 / 3], dim='date')
+                da_verdata_calib_metric_upper = da_verdata_calib_metric_q.isel(quantile=0, drop=True)
+                da_verdata_calib_metric_lower = da_verdata_calib_metric_q.isel(quantile=1, drop=True)
 
 
                 early_fc_calib = xr.where(da_fc_calib_metric < da_fc_calib_metric_lower, 1, 0).mean(dim='member')
@@ -3,6 +3,7 @@ import os
 import numpy as np
 import xarray as xr
 import utils
+import metrics.metric_utils as mutils
 from .metric import BaseMetric
 
 
@@ -34,26 +35,13 @@ class Metric(BaseMetric):
         processed_data_dict = self.process_data_for_metric(average_dims, persistence,
                                                            sice_threshold)
 
-        if self.calib:
-            da_fc_verif_ice = processed_data_dict['da_fc_verif_bc'].mean(dim='member')
-        else:
-            da_fc_verif_ice = processed_data_dict['da_fc_verif'].mean(dim='member')
-
-        da_verdata_verif_ice = processed_data_dict['da_verdata_verif'].isel(member=0)
-        da_persistence_ice = processed_data_dict['da_verdata_persistence']
-
-        # brier score
-        da_fc_verif_bs = ((da_fc_verif_ice - da_verdata_verif_ice) ** 2).mean(dim=('date', 'inidate'))
-        da_persistence_bs = ((da_persistence_ice - da_verdata_verif_ice) ** 2).mean(dim=('date', 'inidate'))
-        # set zeros to very small values to allow division
-        da_persistence_bs = xr.where(da_persistence_bs == 0, 1e-11, da_persistence_bs)
-        da_fc_verif_bs = xr.where(da_fc_verif_bs == 0, 1e-11, da_fc_verif_bs)
-        da_fc_verif_bss = 1 - da_fc_verif_bs / da_persistence_bs
+        # brier score (data are already set to 1/0 using sice_threshold)
+        acc = self.accumulate_scores(processed_data_dict, ['brier'])
+        da_fc_verif_bs = acc.get('brier_fc')
+        da_persistence_bs = acc.get('brier_pers')
+        da_fc_verif_bss = 1 - mutils.skill_ratio(da_fc_verif_bs, da_persistence_bs)
         # clip bss to -1 to 1
         da_fc_verif_bss = da_fc_verif_bss.clip(-1, 1)
-        # restore zero values before saving
-        da_persistence_bs = xr.where(da_persistence_bs == 1e-11, 0, da_persistence_bs)
-        da_fc_verif_bs = xr.where(da_fc_verif_bs == 1e-11, 0, da_fc_verif_bs)
 
         if self.area_statistic_kind == 'score':
             data = [da_fc_verif_bs,
@@ -15,7 +15,8 @@ class Metric(BaseMetric):
 
     def compute(self):
         """ Compute metric """
-        average_dims = ['member','inidate']
+        # the calibration statistics are sums over all start dates, so only members are averaged
+        average_dims = ['member']
         persistence = False
         sice_threshold = None
 
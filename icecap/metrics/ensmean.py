@@ -32,6 +32,15 @@ class Metric(BaseMetric):
         if self.area_statistic_kind is not None:
             self.area_statistic_kind = 'data'
 
+        # without calibration (which needs all forecasts) and area statistics the mean over
+        # all forecasts can be computed while loading the data. For one forecast set this
+        # is the same as the mean computed below (as long as missing values, i.e. land,
+        # are the same for all members)
+        if not self.calib and self.area_statistic_kind is None and len(self.fcverifsets) == 1:
+            average_dims = ['member', 'date', 'inidate']
+        # remaining dimensions to average over
+        mean_dims = [d for d in ('date', 'member', 'inidate') if average_dims is None or d not in average_dims]
+
         processed_data_dict = self.process_data_for_metric(average_dims, persistence, sice_threshold)
 
         data_plot = []
@@ -39,9 +48,9 @@ class Metric(BaseMetric):
         if 'lsm' in processed_data_dict:
             data_plot.append(processed_data_dict['lsm'])
         if self.calib:
-            da_fc_verif_plot = processed_data_dict['da_fc_verif_bc'].mean(dim=('date','member','inidate'))
+            da_fc_verif_plot = processed_data_dict['da_fc_verif_bc'].mean(dim=mean_dims)
         else:
-            da_fc_verif_plot = processed_data_dict['da_fc_verif'].mean(dim=('date','member','inidate'))
+            da_fc_verif_plot = processed_data_dict['da_fc_verif'].mean(dim=mean_dims)
 
 
         data_plot.append(da_fc_verif_plot.rename(f'{self.title_fcname}'))
@@ -52,7 +61,7 @@ class Metric(BaseMetric):
 
 
         if self.add_verdata == "yes":
-            da_verdata_verif = processed_data_dict['da_verdata_verif'].mean(dim=('date','member','inidate'))
+            da_verdata_verif = processed_data_dict['da_verdata_verif'].mean(dim=mean_dims)
             data_plot.append(da_verdata_verif.rename(f'{self.verif_name}'))
 
 
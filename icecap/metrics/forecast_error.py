@@ -36,23 +36,26 @@ class Metric(BaseMetric):
         average_dims = None
         persistence = True
 
+        # without calibration (which needs all forecasts) and area statistics the mean over
+        # all forecasts can be computed while loading the data. For one forecast set this
+        # is the same as the pooled mean computed below (as long as missing values, i.e. land,
+        # are the same for all members)
+        if not self.calib and self.area_statistic_kind is None and len(self.fcverifsets) == 1:
+            average_dims = ['member', 'date', 'inidate']
+
         processed_data_dict = self.process_data_for_metric(average_dims, persistence)
 
         data_plot = []
         data_plot.append(processed_data_dict['lsm_full'])
         if 'lsm' in processed_data_dict:
             data_plot.append(processed_data_dict['lsm'])
-        if self.calib:
-            da_fc_verif_plot = processed_data_dict['da_fc_verif_bc'].mean(dim=('date','member','inidate'))
-        else:
-            da_fc_verif_plot = processed_data_dict['da_fc_verif'].mean(dim=('date','member','inidate'))
 
-        da_verdata_verif = processed_data_dict['da_verdata_verif'].mean(dim=('date','member','inidate'))
-        bias = (da_fc_verif_plot - da_verdata_verif).rename(f'{self.verif_expname[0]}')
+        acc = self.accumulate_scores(processed_data_dict, ['mean'])
+        da_verdata_verif = acc.get('mean_obs')
+        bias = (acc.get('mean_fc') - da_verdata_verif).rename(f'{self.verif_expname[0]}')
 
         if persistence:
-            da_persistence = processed_data_dict['da_verdata_persistence'].mean(dim=('date','inidate'))
-            bias_persistence = (da_persistence - da_verdata_verif).rename(f'{self.verif_expname[0]}')
+            bias_persistence = (acc.get('mean_pers') - da_verdata_verif).rename(f'{self.verif_expname[0]}')
 
         data_plot += [
             bias.rename(f'{self.title_fcname}'),
@@ -3,41 +3,40 @@ import os
 import numpy as np
 import xarray as xr
 import cartopy.crs as ccrs
-from scipy import ndimage
 from dask.distributed import Client
+import metrics.metric_utils as mutils
 from .metric import BaseMetric
 
 client=Client(threads_per_worker=1)
 xr.set_options(keep_attrs=True)
 os.environ['HDF5_USE_FILE_LOCKING']='FALSE'
 
-def _distance_haversine(lonlat1, lonlat2):
+def _distance_haversine(lon1, lat1, lon2, lat2):
     """
-    Calculates distance between set of points on globe
+    Calculates distance between points on globe (element-wise)
     https://gis.stackexchange.com/questions/372035/find-closest-point-to-shapefile-coastline-in-python
-    :param lonlat1: "ice edge points" as array with [lon,lat] points
-    :param lonlat2: 2nd input array with [lon,lat] points
-    :return: closest distance of lonlat2 to any within lonlat1
+    :param lon1: longitude of 1st set of points
+    :param lat1: latitude of 1st set of points
+    :param lon2: longitude of 2nd set of points
+    :param lat2: latitude of 2nd set of points
+    :return: distance in km
     """
-    avg_earth_radius = 6371. # Earth radius in meter
+    avg_earth_radius = 6371. # Earth radius in km
 
-    # Get array data; convert to radians to simulate 'map(radians,...)' part
-    coords_arr = np.deg2rad(lonlat1)
-    a = np.deg2rad(lonlat2)
+    lon1, lat1, lon2, lat2 = map(np.deg2rad, (lon1, lat1, lon2, lat2))
 
-    # Get the differentiations
-    lat = coords_arr[:,1] - a[:,1,None]
-    lng = coords_arr[:,0] - a[:,0,None]
+    d = np.sin((lat1 - lat2) * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon1 - lon2) * 0.5) ** 2
+    return 2 * avg_earth_radius * np.arcsin(np.sqrt(d))
 
-    # Compute the "cos(lat1) * cos(lat2) * sin(lng * 0.5) ** 2" part.
-    # Add into "sin(lat * 0.5) ** 2" part.
-    add0 = np.cos(a[:,1,None])*np.cos(coords_arr[:,1])* np.sin(lng * 0.5) ** 2
-    d = np.sin(lat * 0.5) ** 2 +  add0
-
-    # Get h and assign into dataframe
-    h = 2 * avg_earth_radius * np.arcsin(np.sqrt(d))
-    #return {'dist_to_coastline': h.min(1), 'lonlat':lonlat2, 'where':h.argmin()}
-    return h.min(1)
+def _unit_vector(lon, lat):
+    """
+    Position of points on the unit sphere
+    :param lon: longitude
+    :param lat: latitude
+    :return: array with x/y/z as first dimension
+    """
+    lon, lat = np.deg2rad(lon), np.deg2rad(lat)
+    return np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
 
 class Metric(BaseMetric):
     """ Metric object """
@@ -50,22 +49,13 @@ class Metric(BaseMetric):
 
     @staticmethod
     def _remove_small_cluster(da, min_size=None):
-        out_array = np.empty_like(da.values)
-
-        for mi, member in enumerate(da['member'].values):
-            for ti, ts in enumerate(da['time'].values):
-                array = da.sel(time=ts, member=member).values
-                labelling, label_count = ndimage.label(array)
-
-                for l in range(1, label_count + 1):
-                    if (labelling == l).sum() < min_size:
-                        labelling[labelling == l] = 0
-
-                labelling[labelling > 0] = 1
-                out_array[mi, ti, :, :] = labelling
-
-        ds_out = da.copy(deep=True, data=out_array)
-        return ds_out
+        """
+        Remove ice regions with less than min_size grid cells for each member/time step
+        :param da: DataArray with 1 for ice and 0 for no ice
+        :param min_size: minimum number of grid cells
+        :return: DataArray with small ice regions set to 0
+        """
+        return da.copy(deep=True, data=mutils.remove_small_clusters(da.values, min_size))
 
 
     def _compute_distance(self, da, min_size=None):
@@ -85,72 +75,46 @@ class Metric(BaseMetric):
 
         if 'member' not in da.dims:
             da = da.expand_dims('member')
-
-        out_dist = np.zeros([len(da.member), len(da.time)], dtype="float32")
-
-        for tsi, ts in enumerate(da.time.values):
-            current_point = points[tsi]
-
-            _projection = getattr(da, 'projection')
-            _proj_options = {}
-            for proj_param in ['central_longitude', 'central_latitude',
-                               'true_scale_latitude']:
-                if proj_param in da.attrs:
-                    _proj_options[proj_param] = getattr(da, proj_param)
-
-            data_crs = getattr(ccrs, _projection)(**_proj_options)
-            x, y = data_crs.transform_point(current_point[0],
-                                            current_point[1],
-                                            src_crs=ccrs.PlateCarree())
-
-
-            for m in da.member.values:
-                da_tmp = da.sel(member=[m], time=[ts])
-                ds_bool_tmp = xr.where(da_tmp > .15, 1, 0)
-
-                if min_size is not None:
-                    ds_bool_tmp = self._remove_small_cluster(ds_bool_tmp, min_size=min_size)
-
-                ds_bool_tmp = ds_bool_tmp.sel(member=m, time=ts)
-                if ds_bool_tmp.sel(xc=x, yc=y, method="nearest").values == 1:
-                    out_dist[m, tsi] = 0
-                else:
-
-                    ds_center = ds_bool_tmp.isel(xc=slice(1, -1), yc=slice(1, -1))
-                    ds_left_center = ds_bool_tmp.isel(xc=slice(None, -2), yc=slice(1, -1))
-                    ds_right_center = ds_bool_tmp.isel(xc=slice(2, None), yc=slice(1, -1))
-                    ds_up_center = ds_bool_tmp.isel(xc=slice(1, -1), yc=slice(None, -2))
-                    ds_down_center = ds_bool_tmp.isel(xc=slice(1, -1), yc=slice(2, None))
-
-                    # create stacked shifted grids
-                    ds_merged = np.stack((ds_left_center.values,
-                                          ds_right_center.values,
-                                          ds_up_center.values,
-                                          ds_down_center.values), axis=0)
-
-                    # calculate minimum over shifted grids
-                    ds_merged_min = ds_merged.min(axis=0)
-                    ds_merged_min = xr.where(np.isnan(ds_merged_min), 0, ds_merged_min)
-
-                    # edge grid cells are define as those with ice
-                    # and with one surrounding cell with no ice
-                    edge_arr = np.logical_and(ds_merged_min == 0, ds_center > 0)
-                    ds_edge = ds_center.copy(deep=True, data=edge_arr)
-
-                    tind = np.where(ds_edge.values)
-
-
-
-
-                    if 'lon' in da.coords:
-                        tind_lon = ds_edge.lon.values[tind].flatten()
-                        tind_lat = ds_edge.lat.values[tind].flatten()
-                    else:
-                        tind_lon = ds_edge.longitude.values[tind].flatten()
-                        tind_lat = ds_edge.latitude.values[tind].flatten()
-                    edge_points = (np.column_stack((tind_lon, tind_lat))).tolist()
-
-                    out_dist[m, tsi] = _distance_haversine(edge_points, [current_point])
+        da = da.transpose('member', 'time', 'yc', 'xc')
+        points = np.array(points, dtype=np.float64)
+
+        # grid cell containing each point
+        _proj_options = {}
+        for proj_param in ['central_longitude', 'central_latitude',
+                           'true_scale_latitude']:
+            if proj_param in da.attrs:
+                _proj_options[proj_param] = getattr(da, proj_param)
+        data_crs = getattr(ccrs, getattr(da, 'projection'))(**_proj_options)
+        points_xy = data_crs.transform_points(ccrs.PlateCarree(), points[:, 0], points[:, 1])
+        ix = da.indexes['xc'].get_indexer(points_xy[:, 0], method='nearest')
+        iy = da.indexes['yc'].get_indexer(points_xy[:, 1], method='nearest')
+
+        ds_bool = xr.where(da > .15, 1, 0)
+        if min_size is not None:
+            ds_bool = self._remove_small_cluster(ds_bool, min_size=min_size)
+        ice = ds_bool.values > 0
+        edge = mutils.detect_edge_cells(ice)
+
+        if 'lon' in da.coords:
+            lon, lat = da['lon'], da['lat']
+        else:
+            lon, lat = da['longitude'], da['latitude']
+        lon = lon.transpose('yc', 'xc').values[1:-1, 1:-1]
+        lat = lat.transpose('yc', 'xc').values[1:-1, 1:-1]
+        cells = _unit_vector(lon, lat)
+
+        out_dist = np.full([len(da.member), len(da.time)], np.nan, dtype="float32")
+        for tsi in range(len(da.time)):
+            # the closest edge cell has the largest cosine of the angle to the point,
+            # this is determined for all members at once
+            cos_angle = np.tensordot(_unit_vector(*points[tsi]), cells, axes=1)
+            cos_angle_edge = np.where(edge[:, tsi], cos_angle, -np.inf).reshape(len(da.member), -1)
+            nearest = cos_angle_edge.argmax(axis=1)
+            dist = _distance_haversine(lon.flat[nearest], lat.flat[nearest], *points[tsi])
+            out_dist[:, tsi] = np.where(edge[:, tsi].any(axis=(1, 2)), dist, np.nan)
+
+        # distance is 0 if point is within the ice
+        out_dist[ice[:, np.arange(len(da.time)), iy, ix]] = 0
 
         ds_out = xr.DataArray(out_dist,
                               coords={'member': da['member'],
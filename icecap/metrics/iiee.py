@@ -1,6 +1,5 @@
 """ Metric calculating Integrated Ice Edge Error (IIEE) """
 import os
-import numpy as np
 import xarray as xr
 import utils
 from .metric import BaseMetric
@@ -36,57 +35,24 @@ class Metric(BaseMetric):
 
         data_plot = []
         data_plot.append(processed_data_dict['lsm_full'])
-        if self.calib:
-            da_fc_verif= processed_data_dict['da_fc_verif_bc'].mean(dim='member')
-        else:
-            da_fc_verif = processed_data_dict['da_fc_verif'].mean(dim='member')
 
-
-        da_verdata_verif = processed_data_dict['da_verdata_verif'].mean(dim='member')
-        da_persistence = processed_data_dict['da_verdata_persistence']
-
-        # set sic>0.15 to 1 else 0
-        # set nan values if obs are missing
-        da_fc_verif = xr.where(~np.isnan(da_verdata_verif), da_fc_verif, np.nan)
-        da_fc_verif = xr.where(da_fc_verif>0.15,1,0)
-        da_persistence = xr.where(~np.isnan(da_verdata_verif), da_persistence, np.nan)
-        da_persistence = xr.where(da_persistence>0.15,1,0)
-        da_verdata_verif = xr.where(da_verdata_verif > 0.15, 1, 0)
-
-        ensmean_over_fc = xr.ones_like(da_verdata_verif).where(da_fc_verif - da_verdata_verif == 1, 0)
-        ensmean_under_fc = xr.ones_like(da_verdata_verif).where(da_fc_verif - da_verdata_verif == -1, 0)
-
-        ensmean_over_pers = xr.ones_like(da_verdata_verif).where(da_persistence - da_verdata_verif == 1, 0)
-        ensmean_under_pers = xr.ones_like(da_verdata_verif).where(da_persistence - da_verdata_verif == -1, 0)
-
-
-
-        data, lsm = self.calc_area_statistics([ensmean_over_fc, ensmean_under_fc,
-                                               ensmean_over_pers, ensmean_under_pers],
-                                              processed_data_dict['lsm_full'],
-                                              statistic=self.area_statistic_function)
-        ensmean_over_fc = data[0]
-        ensmean_under_fc = data[1]
-        ensmean_over_pers = data[2]
-        ensmean_under_pers = data[3]
-
-
-        iiee_fc = ensmean_over_fc + ensmean_under_fc
-        aee_fc = np.fabs(ensmean_over_fc - ensmean_under_fc)
-        me_fc = 2 * np.minimum(ensmean_over_fc, ensmean_under_fc)
-
-
-
-        iiee_pers = ensmean_over_pers + ensmean_under_pers
-        aee_pers = np.fabs(ensmean_over_pers - ensmean_under_pers)
-        me_pers = 2 * np.minimum(ensmean_over_pers, ensmean_under_pers)
-
-        data_plot.append(iiee_fc.rename(f'{self.title_fcname}').mean(dim=('inidate', 'date')))
-        data_plot.append(aee_fc.rename('noplot_fc_aee').mean(dim=('inidate', 'date')))
-        data_plot.append(me_fc.rename('noplot_fc_me').mean(dim=('inidate', 'date')))
-        data_plot.append(iiee_pers.rename('persistence').mean(dim=('inidate', 'date')))
-        data_plot.append(aee_pers.rename('noplot_persistence_aee').mean(dim=('inidate', 'date')))
-        data_plot.append(me_pers.rename('noplot_persistence_me').mean(dim=('inidate', 'date')))
+        # set sic>0.15 to 1 else 0 and derive over/underestimation of the ice edge for each date
+        # (fc is set to nan if obs are missing)
+        def area_sum(data):
+            return self.calc_area_statistics(data, processed_data_dict['lsm_full'],
+                                             statistic=self.area_statistic_function, verbose=False)[0]
+
+        acc = self.accumulate_scores(processed_data_dict, ['iiee'], area_sum=area_sum)
+
+        data_plot.append(acc.get('iiee_fc').rename(f'{self.title_fcname}'))
+        data_plot.append(acc.get('aee_fc').rename('noplot_fc_aee'))
+        data_plot.append(acc.get('me_fc').rename('noplot_fc_me'))
+        data_plot.append(acc.get('iiee_pers').rename('persistence'))
+        data_plot.append(acc.get('aee_pers').rename('noplot_persistence_aee'))
+        data_plot.append(acc.get('me_pers').rename('noplot_persistence_me'))
+        # land-sea-mask of selected region
+        _, lsm = self.calc_area_statistics([acc.template], processed_data_dict['lsm_full'],
+                                           statistic=self.area_statistic_function)
         data_plot.append(lsm)
 
 
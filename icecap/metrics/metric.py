@@ -9,7 +9,12 @@ addition of new metrics as easy as possible.
 
 import os.path
 import calendar
+import concurrent.futures
 import datetime as dt
+import glob
+import hashlib
+import json
+import shutil
 import xarray as xr
 import numpy as np
 import pandas as pd
@@ -19,9 +24,26 @@ import utils
 import forecast_info
 import metrics.metric_utils as mutils
 
+# decoded observation files shared by all metrics within one process
+OBS_CACHE = mutils.DataCache()
+# loaded/processed data shared between metrics (only enabled when plotting several plotids at once)
+SHARED_DATA = mutils.SharedData()
+# region weights for area statistics (for each grid, land-sea mask and region definition)
+REGION_WEIGHTS = {}
+# boolean masks of region_extent boxes (for each grid and region_extent)
+REGION_MASKS = {}
+# netCDF group of calibration files containing the calibration statistics
+CALIB_STATISTICS_GROUP = 'statistics'
+
 class BaseMetric(dataobjects.DataObject):
     """Generic Metric Object inherited by each specific metric"""
 
+    # attributes which do not affect the processed data (only used for scores/plotting)
+    presentation_attributes = ['metricname', 'plottype', 'use_metric_name', 'result', 'default_cmap',
+                               'norm', 'levels', 'ticks', 'ticklabels', 'plottext', 'legendtext',
+                               'ylabel', 'clip', 'extend', 'ofile', 'inset_position', 'plot_shading',
+                               'add_verdata', 'read_workers', 'processed_cache']
+
     def __init__(self, name, conf):
         super().__init__(conf)
 
@@ -74,6 +96,10 @@ class BaseMetric(dataobjects.DataObject):
         self.ofile = conf.plotsets[name].ofile
 
         self.use_dask = False
+        OBS_CACHE.max_bytes = utils.memory_to_bytes(conf.obs_cache_memory)
+        SHARED_DATA.max_bytes = utils.memory_to_bytes(conf.shared_data_memory)
+        self.read_workers = int(conf.read_workers)
+        self.processed_cache = conf.processed_cache
 
 
 
@@ -84,6 +110,8 @@ class BaseMetric(dataobjects.DataObject):
         self.temporal_average = conf.plotsets[name].temporal_average
 
         self.region_extent = conf.plotsets[name].region_extent
+        # index window (yc/xc) read from the cache files (set in process_data_for_metric)
+        self.spatial_window = None
         self.nsidc_region = conf.plotsets[name].nsidc_region
         self.plot_shading = conf.plotsets[name].plot_shading
         self.inset_position = conf.plotsets[name].inset_position
@@ -172,6 +200,15 @@ class BaseMetric(dataobjects.DataObject):
         if self.calib_method is not None:
             self.calib = True
 
+        self.calib_update = conf.plotsets[name].calib_update
+        if self.calib_update is None:
+            self.calib_update = 'no'
+        if self.calib_update == 'yes':
+            if self.calib_method not in ['mean', 'anom'] or self.calib_exists == 'yes':
+                raise ValueError('calib_update only works with calib_method mean or anom and calib_exists = no')
+            if self.calibrationdir is None:
+                raise ValueError("Calibrationdir needs to be specified if updating calibration files")
+
 
         if self.temporal_average is not None:
             self.temporal_average_split = self.temporal_average.split(':')
@@ -318,6 +355,7 @@ class BaseMetric(dataobjects.DataObject):
 
 
             fcsets[date]['enssize'] = getattr(self, f'{name}_enssize')[0]
+            fcsets[date]['ensblocks'] = dataobjects.ensemble_blocks(kwargs['source'], kwargs['fcsystem'])
 
 
         # second option: dates are given as MMDD and fromyear toyear is given so we construct all dates here
@@ -379,6 +417,7 @@ class BaseMetric(dataobjects.DataObject):
 
                 fcsets[date]['cachedir'] = dataobjects.define_fccachedir(**kwargs)
                 fcsets[date]['enssize'] = getattr(self, f'{name}_enssize')[0]
+                fcsets[date]['ensblocks'] = dataobjects.ensemble_blocks(kwargs['source'], kwargs['fcsystem'])
 
         return fcsets
 
@@ -394,6 +433,8 @@ class BaseMetric(dataobjects.DataObject):
             _filename = f"{self.obscachedir}/" \
                         f"{filename.format('20171130', self.params, self.grid)}"
             da = xr.open_dataarray(_filename)
+            if self.spatial_window:
+                da = da.isel(self.spatial_window)
             da = da.expand_dims(dim={"member": [1], "date": [1], "inidate": [1]})
             da['time'] = ['dummy']
         else:
@@ -406,6 +447,312 @@ class BaseMetric(dataobjects.DataObject):
 
         return da
 
+    def _select_target_time(self, _da_file, target):
+        """
+        Convert time of a single file to lead time and apply temporal averaging (if selected)
+        :param _da_file: xarray DataArray for one forecast/start date
+        :param target: target days (either the one from the namelist or i:0 for persistence)
+        :return: xarray DataArray
+        """
+        if target == 'i:0':
+            return self.convert_time_to_lead(_da_file, target=target)
+
+        if self.temporal_average_timescale == 'days' and self.temporal_average_type == 'data':
+            _da_file = self.convert_time_to_lead(_da_file, target=target)
+            _date_da = np.arange(_da_file.time.values[0],
+                              _da_file.time.values[-1]+1)
+            start = 0
+            if _date_da[0] > 0:
+                start = int(self.temporal_average_value)
+
+            time_bounds = mutils.np_arange_include_upper(start, _date_da[-1] + 1, int(self.temporal_average_value))
+            _da_file = _da_file.sel(time=slice(time_bounds[0],time_bounds[-1]))
+            _da_file = _da_file.rolling(time=int(self.temporal_average_value)).mean().sel(time=slice(int(self.temporal_average_value) + _da_file.time.values[0] - 1,
+                                                                                   None, int(self.temporal_average_value)))
+        elif self.temporal_average_timescale == 'months':
+            dates_all = _da_file.time.dt.strftime('%Y%m').values
+            dates_unique = list(sorted(set(dates_all)))
+            month_unique = [int(d[4:]) for d in dates_unique]
+            dates_len = [sum(dates_all == d) for d in dates_unique]
+            dates_monlen = [calendar.monthrange(int(d[:4]), int(d[4:]))[1] for d in dates_unique]
+            dates_complete = [True if num == monlen else False for num, monlen in
+                              zip(dates_len, dates_monlen)]
+
+            if max(self.temporal_average_value) > len(dates_complete):
+                raise RuntimeError('Selected month not in data')
+
+            check_if_complete = [dates_complete[mon] for mon in self.temporal_average_value]
+
+            if not all(check_if_complete):
+                raise RuntimeError('Data for selected month not complete')
+            months_select = [month_unique[mon] for mon in self.temporal_average_value]
+            _da_file = _da_file.isel(time=_da_file.time.dt.month.isin(months_select))
+            # remove 29th if in dataset
+            _da_file = _da_file.sel(time=~((_da_file.time.dt.month == 2) & (_da_file.time.dt.day == 29)))
+
+            if self.temporal_average_type == 'data':
+                # averaging over months will be done here if performed over data
+                _da_file = _da_file.resample(time='1ME').mean()
+                _da_file['time'] = self.temporal_average_value
+
+        else:
+            _da_file = self.convert_time_to_lead(_da_file, target=target)
+
+        return _da_file
+
+    def _get_seldates(self, _date, target):
+        """
+        Get the valid dates (YYYYMMDD) to be selected for a given start date
+        :param _date: start date as YYYYMMDD
+        :param target: target days
+        :return: list of valid dates
+        """
+        _dtdate = [utils.string_to_datetime(_date)]
+        _dtseldates = utils.create_list_target_verif(target, _dtdate)
+        _seldates = [utils.datetime_to_string(dtdate) for dtdate in _dtseldates]
+        if sorted(_seldates) != _seldates:
+            raise ValueError('Target needs to be sorted')
+        return _seldates
+
+    def _get_fc_files(self, fcset_entry, _date, grid):
+        """
+        Get all cache files for one start date of a forecast set
+        :param fcset_entry: one entry of the forecast sets created in _init_fc
+        :param _date: start date as YYYYMMDD
+        :param grid: grid name used in the filename
+        :return: list of filenames (one per member or one per ensemble block)
+        """
+        if self.cache_layout == 'member':
+            filename = self._filenaming_convention('fc')
+            return [f"{fcset_entry['cachedir']}/{filename.format(_date, _member, self.params, grid)}"
+                    for _member in range(int(fcset_entry['enssize']))]
+
+        filename = self._ensemble_filenaming_convention()
+        return [f"{fcset_entry['cachedir']}/{filename.format(_date, _block, self.params, grid)}"
+                for _block in fcset_entry['ensblocks']]
+
+    def _open_fc_file(self, _file, _seldate, target):
+        """
+        Open one forecast cache file lazily and select target time
+        :param _file: filename
+        :param _seldate: valid dates to be selected
+        :param target: target days
+        :return: xarray Dataset
+        """
+        _da_file = self._load_file(_file, _seldate).rename(self.params)
+        _ds_file = self._select_target_time(_da_file, target).to_dataset()
+        if not self.use_dask:
+            _ds_file = _ds_file.load()
+        return _ds_file
+
+    def _parallel_map(self, func, items):
+        """
+        Apply function (usually reading a file) to all items. Uses a thread pool
+        if read_workers > 1. The order of the results is the same as of items
+        :param func: function with one argument
+        :param items: list of arguments
+        :return: list of results
+        """
+        if self.read_workers > 1 and len(items) > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.read_workers) as pool:
+                return list(pool.map(func, items))
+        return [func(item) for item in items]
+
+    def _load_fc_set(self, fcset_entry, grid, target):
+        """
+        Load all forecast files of one forecast set at once. All filenames are
+        determined up front and combined into one lazily indexed multi-file dataset,
+        which results in one dask graph for the complete set
+        :param fcset_entry: one entry of the forecast sets created in _init_fc
+        :param grid: grid name used in the filename
+        :param target: target days
+        :return: xarray DataArray with dimensions (date, member, time, yc, xc)
+        """
+        _fcdates = fcset_entry['sdates']
+        _members = range(int(fcset_entry['enssize']))
+
+        _files = [self._get_fc_files(fcset_entry, _date, grid) for _date in _fcdates]
+        _seldates = [self._get_seldates(_date, target) for _date in _fcdates]
+
+        # open (and load if dask is not used) all files at once, the nested
+        # list structure (date, member) is restored afterwards
+        _items = [(_file, _seldate) for _files_date, _seldate in zip(_files, _seldates)
+                  for _file in _files_date]
+        _opened = self._parallel_map(lambda _item: self._open_fc_file(*_item, target), _items)
+        _datasets = []
+        for _files_date in _files:
+            _datasets.append(_opened[:len(_files_date)])
+            _opened = _opened[len(_files_date):]
+
+        # files of the member layout are concatenated along a new member dimension,
+        # consolidated ensemble files along their existing member dimension
+        _ds = xr.combine_nested(_datasets, concat_dim=['date', 'member'], data_vars='all',
+                                coords='minimal', compat='override')
+        _da = _ds[self.params].transpose('date', 'member', ...)
+        if self.cache_layout == 'member':
+            _da = _da.assign_coords(member=list(_members))
+        else:
+            _da = _da.sel(member=list(_members))
+        _da = _da.assign_coords(date=range(len(_fcdates)))
+
+        if not self.use_dask:
+            _da = _da.load()
+
+        return _da
+
+    def _reduce_fc_set(self, fcset_entry, grid, target, average_dim):
+        """
+        Load the forecast files of one forecast set one after the other and average
+        over members (and dates) while reading, so that only a few files are kept in
+        memory. As in _load_data the member mean of each date is computed first and
+        then the mean over all dates, missing values are ignored
+        :param fcset_entry: one entry of the forecast sets created in _init_fc
+        :param grid: grid name used in the filename
+        :param target: target days
+        :param average_dim: list of dimensions to average (needs to contain member)
+        :return: xarray DataArray with dimensions (date, time, yc, xc) or (time, yc, xc)
+        """
+        _fcdates = fcset_entry['sdates']
+        _members = list(range(int(fcset_entry['enssize'])))
+
+        _da_ref = None
+        _date_mean = mutils.RunningMean()
+        _date_list = []
+        for _date in _fcdates:
+            _seldate = self._get_seldates(_date, target)
+            _files = self._get_fc_files(fcset_entry, _date, grid)
+
+            _member_mean = mutils.RunningMean()
+            _nmembers = 0
+            # with read_workers > 1 at most read_workers files are read at the same time
+            _nbatch = max(self.read_workers, 1)
+            for _fi in range(0, len(_files), _nbatch):
+                _das = self._parallel_map(lambda _file: self._open_fc_file(_file, _seldate, target)[self.params],
+                                          _files[_fi:_fi + _nbatch])
+                for _da_file in _das:
+                    if 'member' in _da_file.dims:
+                        _da_file = _da_file.isel(member=np.flatnonzero(np.isin(_da_file['member'].values,
+                                                                               _members)))
+                        _da_file = _da_file.transpose('member', ...)
+                        _member_mean.add(_da_file.values, axis=0)
+                        _nmembers += _da_file.sizes['member']
+                        _da_file = _da_file.isel(member=0, drop=True)
+                    else:
+                        _member_mean.add(_da_file.values)
+                        _nmembers += 1
+
+                    if _da_ref is None:
+                        _da_ref = _da_file
+
+            if _nmembers != len(_members):
+                raise ValueError(f'Found {_nmembers} instead of {len(_members)} members for {_date}')
+
+            if 'date' in average_dim:
+                _date_mean.add(_member_mean.mean())
+            else:
+                _date_list.append(_member_mean.mean())
+
+        if 'date' in average_dim:
+            return _da_ref.copy(data=_date_mean.mean())
+
+        _da = xr.DataArray(np.stack(_date_list), dims=('date',) + _da_ref.dims,
+                           coords={'date': range(len(_fcdates))},
+                           attrs=_da_ref.attrs, name=_da_ref.name)
+        return _da.assign_coords(_da_ref.coords)
+
+    def _needs_time_postprocessing(self, target):
+        """
+        Check if temporal averaging needs to be applied to each forecast/start date
+        (otherwise only time is converted to lead time)
+        :param target: target days
+        :return: bool
+        """
+        if target == 'i:0':
+            return False
+        if self.temporal_average_timescale == 'days' and self.temporal_average_type == 'data':
+            return True
+        return self.temporal_average_timescale == 'months'
+
+    def _load_obs_days(self, fcset, target):
+        """
+        Load each distinct valid day needed for all start dates of the forecast sets once
+        into one contiguous (valid_time, yc, xc) array. Missing days are set to NaN.
+        An additional NaN field is appended at the end which can be used to fill missing dates
+        :param fcset: forecast sets created in _init_fc
+        :param target: target days
+        :return: dictionary with data array, index of each valid date in data and
+        reference DataArray (coordinates and attributes) or None if no observations are found
+        for one of the start dates
+        """
+        filename = self._filenaming_convention('verif')
+
+        _valid_dates = sorted({_seldate for fcname in fcset
+                               for _date in fcset[fcname]['sdates']
+                               for _seldate in self._get_seldates(_date, target)})
+
+        def _read_day(_seldate):
+            _filename = f"{self.obscachedir}/" \
+                        f"{filename.format(_seldate, self.params, self.grid)}"
+
+            if not os.path.isfile(_filename):
+                return None
+            return self._load_file(_filename, cache=True).isel(time=0, drop=True).load()
+
+        _data = None
+        _da_ref = None
+        _found = np.zeros(len(_valid_dates) + 1, dtype=bool)
+        for _vi, (_seldate, _da_file) in enumerate(zip(_valid_dates,
+                                                       self._parallel_map(_read_day, _valid_dates))):
+            if _da_file is None:
+                utils.print_info(f'No verification data found {_seldate}')
+                continue
+
+            if _data is None:
+                _da_ref = _da_file
+                _data = np.full((len(_valid_dates) + 1,) + _da_file.shape, np.nan,
+                                dtype=np.result_type(_da_file.dtype, np.float32))
+            _data[_vi] = _da_file.values
+            _found[_vi] = True
+
+        _index = {_seldate: _vi for _vi, _seldate in enumerate(_valid_dates)}
+        for fcname in fcset:
+            for _date in fcset[fcname]['sdates']:
+                _found_date = _found[[_index[d] for d in self._get_seldates(_date, target)]]
+                if not _found_date.any():
+                    utils.print_info(f'No verification data found for {_date}')
+                    return None
+                if not _found_date.all():
+                    utils.print_info(f'Some verification data missing for {_date}')
+
+        return {'data': _data, 'index': _index, 'ref': _da_ref}
+
+    def _gather_obs_cube(self, _obs, fcset, target):
+        """
+        Create verification cube for all forecast sets by gathering the respective
+        valid days from the array created in _load_obs_days
+        :param _obs: dictionary created in _load_obs_days
+        :param fcset: forecast sets created in _init_fc
+        :param target: target days
+        :return: xarray DataArray with dimensions (inidate, date, member, time, yc, xc)
+        """
+        _inits = list(fcset)
+        _ndates = max(len(fcset[fcname]['sdates']) for fcname in _inits)
+        _leads = utils.create_list_target_verif(target, as_list=True)
+
+        # forecast sets with less dates are filled with the NaN field at the end of the array
+        _missing = len(_obs['data']) - 1
+        _idx = np.full((len(_inits), _ndates, len(_leads)), _missing)
+        for _ii, fcname in enumerate(_inits):
+            for _di, _date in enumerate(fcset[fcname]['sdates']):
+                _idx[_ii, _di] = [_obs['index'][d] for d in self._get_seldates(_date, target)]
+
+        _da = xr.DataArray(_obs['data'][_idx][:, :, np.newaxis],
+                           dims=('inidate', 'date', 'member', 'time') + _obs['ref'].dims,
+                           coords={'inidate': _inits, 'date': range(_ndates),
+                                   'member': range(1), 'time': _leads},
+                           attrs=_obs['ref'].attrs, name=_obs['ref'].name)
+        return _da.assign_coords(_obs['ref'].coords)
+
     def _load_data(self, fcset, datatype, grid=None,
                    average_dim=None, target=None):
         """ load forecast or verification data
@@ -425,137 +772,78 @@ class BaseMetric(dataobjects.DataObject):
         if grid is None:
             grid = self.grid
 
-        filename = self._filenaming_convention(datatype)
+        if datatype == 'verif':
+            _obs = self._load_obs_days(fcset, target)
+            if _obs is None:
+                return None
 
+            if not self._needs_time_postprocessing(target):
+                da_init = self._gather_obs_cube(_obs, fcset, target)
+                for _dim in ['member', 'date', 'inidate']:
+                    if _dim in average_dim:
+                        da_init = da_init.mean(dim=_dim)
+                return da_init
 
+        # averages over members, dates and start dates are computed while reading
+        # (running sums/counts) rather than from the complete concatenated data
         _all_list = []
         _inits = []
+        _init_mean = mutils.RunningMean()
         for fcname in fcset:
             _inits.append(fcname)
-            _da_date_list = []
             _fcdates = fcset[fcname]['sdates']
-            for _date in _fcdates:
-                _dtdate = [utils.string_to_datetime(_date)]
-                _dtseldates = utils.create_list_target_verif(target, _dtdate)
-                _seldates = [utils.datetime_to_string(dtdate) for dtdate in _dtseldates]
-                if sorted(_seldates) != _seldates:
-                    raise ValueError('Target needs to be sorted')
 
+            if datatype == 'fc' and 'member' in average_dim:
+                da_fc = self._reduce_fc_set(fcset[fcname], grid, target, average_dim)
+            elif datatype == 'fc':
+                da_fc = self._load_fc_set(fcset[fcname], grid, target)
 
-                if datatype == 'fc':
-                    _members = range(int(fcset[fcname]['enssize']))
-                else:
-                    _members = range(1)
-
-                _da_ensmem_list = []
-                for _member in _members:
-
-                    if datatype == 'verif':
-                        _da_seldate_list = []
-                        _missing_si = []
-                        _existing_si = []
-                        for _si, _seldate in enumerate(_seldates):
-                            _filename = f"{self.obscachedir}/" \
-                                        f"{filename.format(_seldate, self.params, self.grid)}"
-
-                            if os.path.isfile(_filename):
-                                _da_file = self._load_file(_filename)
-                                _existing_si.append(_si)
-                                _da_seldate_list.append(_da_file)
-                            else:
-                                utils.print_info(f'No verification data found {_seldate} {_si}')
-                                _missing_si.append(_si)
-
-
-                        if not _da_seldate_list:
-                            utils.print_info(f'No verification data found for {_date}')
-                            return None
-                        else:
-                            if _missing_si:
-                                utils.print_info(f'Some verification data missing for {_date}')
-                                for _si in _missing_si:
-                                    _da_file_new = xr.full_like(_da_seldate_list[_existing_si[0]], np.nan)
-                                    _da_file_new['time'] = [pd.to_datetime(_seldates[_si]).to_numpy()]
-                                    _da_seldate_list.insert(_si, _da_file_new.copy())
-
-                            _da_file = xr.concat(_da_seldate_list, dim='time')
-
-                    elif datatype == 'fc':
-                        _filename = f"{fcset[fcname]['cachedir']}/" \
-                                    f"{filename.format(_date, _member, self.params, grid)}"
-                        # print(_filename)
-                        _da_file = self._load_file(_filename, _seldates)
-
-                    # _da_file = self.convert_time_to_lead(_da_file, target=target)
-
-                    if target != 'i:0':
-
-                        if self.temporal_average_timescale == 'days' and self.temporal_average_type == 'data':
-                            _da_file = self.convert_time_to_lead(_da_file, target=target)
-                            _date_da = np.arange(_da_file.time.values[0],
-                                              _da_file.time.values[-1]+1)
-                            start = 0
-                            if _date_da[0] > 0:
-                                start = int(self.temporal_average_value)
-
-                            time_bounds = mutils.np_arange_include_upper(start, _date_da[-1] + 1, int(self.temporal_average_value))
-                            _da_file = _da_file.sel(time=slice(time_bounds[0],time_bounds[-1]))
-                            _da_file = _da_file.rolling(time=int(self.temporal_average_value)).mean().sel(time=slice(int(self.temporal_average_value) + _da_file.time.values[0] - 1,
-                                                                                                   None, int(self.temporal_average_value)))
-                        elif self.temporal_average_timescale == 'months':
-                            dates_all = _da_file.time.dt.strftime('%Y%m').values
-                            dates_unique = list(sorted(set(dates_all)))
-                            month_unique = [int(d[4:]) for d in dates_unique]
-                            dates_len = [sum(dates_all == d) for d in dates_unique]
-                            dates_monlen = [calendar.monthrange(int(d[:4]), int(d[4:]))[1] for d in dates_unique]
-                            dates_complete = [True if num == monlen else False for num, monlen in
-                                              zip(dates_len, dates_monlen)]
-
-                            if max(self.temporal_average_value) > len(dates_complete):
-                                raise RuntimeError('Selected month not in data')
-
-                            check_if_complete = [dates_complete[mon] for mon in self.temporal_average_value]
-
-                            if not all(check_if_complete):
-                                raise RuntimeError('Data for selected month not complete')
-                            months_select = [month_unique[mon] for mon in self.temporal_average_value]
-                            _da_file = _da_file.isel(time=_da_file.time.dt.month.isin(months_select))
-                            # remove 29th if in dataset
-                            _da_file = _da_file.sel(time=~((_da_file.time.dt.month == 2) & (_da_file.time.dt.day == 29)))
-
-                            if self.temporal_average_type == 'data':
-                                # averaging over months will be done here if performed over data
-                                _da_file = _da_file.resample(time='1ME').mean()
-                                _da_file['time'] = self.temporal_average_value
-
-                        else:
-                            _da_file = self.convert_time_to_lead(_da_file, target=target)
-
-                    else:
-                        _da_file = self.convert_time_to_lead(_da_file, target=target)
-
-                    _da_ensmem_list.append(_da_file)
-                    _ensdim = xr.DataArray(_members, dims='member', name='member')
-                _da_date = xr.concat(_da_ensmem_list, dim=_ensdim)
-
-                if 'member' in average_dim:
-                    _da_date = _da_date.mean(dim='member')#.compute()
-                    #_da_date = _da_date.load()
-                _da_date_list.append(_da_date)
-
+            else:
+                _da_date_list = []
+                for _date in _fcdates:
+                    _seldates = self._get_seldates(_date, target)
+                    _da_file = xr.DataArray(_obs['data'][[_obs['index'][d] for d in _seldates]],
+                                            dims=('time',) + _obs['ref'].dims,
+                                            coords={'time': pd.to_datetime(_seldates).to_numpy()},
+                                            attrs=_obs['ref'].attrs, name=_obs['ref'].name)
+                    _da_file = _da_file.assign_coords(_obs['ref'].coords)
+                    _da_file = self._select_target_time(_da_file, target)
+
+                    _ensdim = xr.DataArray(range(1), dims='member', name='member')
+                    _da_date = xr.concat([_da_file], dim=_ensdim)
+
+                    if 'member' in average_dim:
+                        _da_date = _da_date.mean(dim='member')
+                    _da_date_list.append(_da_date)
+
+                _date_dim = xr.DataArray(range(len(_fcdates)), dims='date', name='date')
+                da_fc = xr.concat(_da_date_list, dim=_date_dim)
 
-            _date_dim = xr.DataArray(range(len(_fcdates)), dims='date', name='date')
-            da_fc = xr.concat(_da_date_list, dim=_date_dim)
             if 'date' in average_dim:
-                da_fc = da_fc.mean(dim='date')
-                _all_list.append(da_fc)
+                if 'date' in da_fc.dims:
+                    da_fc = da_fc.mean(dim='date')
             else:
-                _all_list.append(da_fc.sortby(da_fc.date))
+                da_fc = da_fc.sortby(da_fc.date)
+
+            if 'inidate' in average_dim:
+                # forecast sets with less dates/members are treated as missing for the remaining ones
+                _init_mean.add(da_fc.values)
+                if not _all_list:
+                    _all_list = [da_fc]
+            else:
+                _all_list.append(da_fc)
+
+        if 'inidate' in average_dim:
+            _da_ref = _all_list[0]
+            da_init = xr.DataArray(_init_mean.mean(), dims=_da_ref.dims,
+                                   attrs=_da_ref.attrs, name=_da_ref.name)
+            _padded_dims = [_dim for _dim in ['date', 'member'] if _dim in _da_ref.dims]
+            da_init = da_init.assign_coords({_dim: range(da_init.sizes[_dim]) for _dim in _padded_dims})
+            return da_init.assign_coords({_name: _coord for _name, _coord in _da_ref.coords.items()
+                                          if not set(_coord.dims) & set(_padded_dims)})
 
         _init_dim = xr.DataArray(_inits, dims='inidate', name='inidate')
         da_init = xr.concat(_all_list, dim=_init_dim)
-        if 'inidate' in average_dim:
-            da_init = da_init.mean(dim='inidate')
 
         return da_init
 
@@ -564,33 +852,86 @@ class BaseMetric(dataobjects.DataObject):
 
 
 
-    def load_fc_data(self, name, grid=None, average_dim=None):
+    @staticmethod
+    def data_signature(conf, name):
+        """
+        Describe the data requirements of a plotid (verification/calibration forecasts,
+        target and calibration) using the configuration only, i.e. without creating the metric.
+        Metrics with the same signature can share loaded data
+        :param conf: configuration object
+        :param name: plotid
+        :return: string
+        """
+        return repr(sorted((_key, _value) for _key, _value in vars(conf.plotsets[name]).items()
+                           if _key == 'target' or _key.startswith(('verif_', 'calib_'))))
+
+    def _load_key(self, datatype, fcset, grid, average_dim, target):
+        """
+        Key of loaded data in SHARED_DATA containing all settings used in _load_data
+        :return: tuple
+        """
+        return (datatype, repr(fcset), grid, repr(average_dim), target,
+                self.params, self.grid, self.verif_name, self.obscachedir, self.cache_layout,
+                self.use_dask, self.target, self.temporal_average_type,
+                self.temporal_average_timescale, repr(self.temporal_average_value),
+                repr(self.spatial_window))
+
+    def _shared_load(self, key, load_function):
+        """
+        Load data or take it from SHARED_DATA if it has been loaded already by another metric
+        :param key: key created with _load_key
+        :param load_function: function without arguments loading the data
+        :return: xarray DataArray (or None)
+        """
+        if key in SHARED_DATA:
+            utils.print_info('Using data loaded for previous metric')
+            return SHARED_DATA.get(key)
+
+        _da = load_function()
+        if SHARED_DATA.enabled and _da is not None and SHARED_DATA.fits(_da.nbytes):
+            # keep data in memory (within the memory budget), so that files are only read once.
+            # Larger data is shared lazily and read again by each metric
+            _da = _da.persist()
+            SHARED_DATA.put(key, _da, nbytes=_da.nbytes)
+        else:
+            SHARED_DATA.put(key, _da)
+        return _da
+
+    def load_fc_data(self, name, grid=None, average_dim=None, fcset=None):
         """
         load forecast data
         :param name: calib or verif
         :param grid: 'native' or None
         :param average_dim: list of dimensions to average when loading data
+        :param fcset: forecast sets to be loaded (default are all sets of name)
         :return: xarray dataArray
         """
         utils.print_info(f"READING FC DATA FOR {name}")
         average_dim = [average_dim] if not(isinstance(average_dim, list)) else average_dim
-        return self._load_data(getattr(self, f'fc{name}sets'), datatype='fc', grid=grid,
-                               average_dim=average_dim)
+        if fcset is None:
+            fcset = getattr(self, f'fc{name}sets')
+        return self._shared_load(self._load_key('fc', fcset, grid, average_dim, None),
+                                 lambda: self._load_data(fcset, datatype='fc',
+                                                         grid=grid, average_dim=average_dim))
 
-    def load_verif_data(self, name, average_dim=None, target=None):
+    def load_verif_data(self, name, average_dim=None, target=None, fcset=None):
         """
         load verification data
         :param name: calib or verif
         :param average_dim: list of dimensions to average when loading data
         :param target: target days to be selected (usually determined by neamlist), but can be
         set to 'i:0' for persistence
+        :param fcset: forecast sets to be loaded (default are all sets of name)
         :return: xarray dataArray
         """
         utils.print_info(f"READING OBSERVATION DATA FOR {name}")
         average_dim = [average_dim] if not (isinstance(average_dim, list)) else average_dim
+        if fcset is None:
+            fcset = getattr(self, f'fc{name}sets')
 
-        return self._load_data(getattr(self,f'fc{name}sets'), datatype='verif',
-                               average_dim=average_dim, target=target)
+        return self._shared_load(self._load_key('verif', fcset, None, average_dim, target),
+                                 lambda: self._load_data(fcset, datatype='verif',
+                                                         average_dim=average_dim, target=target))
 
 
 
@@ -663,25 +1004,55 @@ class BaseMetric(dataobjects.DataObject):
         return _da
 
 
-    def _load_file(self, _file,_seldate=None):
+    def _load_file(self, _file,_seldate=None, cache=False):
         """
         load single xarray data file and select specific timestep if needed
         Use dask if selected
         :param _file: filename
         :param _seldate: timestep(s) to load
+        :param cache: keep decoded file in the in-process cache (OBS_CACHE)
         :return: xarray DataArray
         """
 
+        if cache and OBS_CACHE.max_bytes > 0:
+            _key = (os.path.abspath(_file), self.grid, os.stat(_file).st_mtime_ns, repr(self.spatial_window))
+            _da_file = OBS_CACHE.get(_key)
+            if _da_file is None:
+                with xr.open_dataarray(_file) as _da_open:
+                    if self.spatial_window:
+                        _da_open = _da_open.isel(self.spatial_window)
+                    _da_file = _da_open.load()
+                OBS_CACHE.put(_key, _da_file)
+
+            # shallow copy, so that cached coordinates and attributes are not modified
+            _da_file = _da_file.copy(deep=False)
+            if _seldate:
+                _da_file = _da_file.sel(time=_da_file.time.dt.strftime("%Y%m%d").isin(_seldate))
+            return _da_file
+
+
+        _kwargs = {}
+        if _file.endswith('.zarr'):
+            _kwargs['engine'] = 'zarr'
 
         if self.use_dask:
             # print(_file)
-            _da_file = xr.open_dataarray(_file) #, chunks={'time':20) #chunks='auto')
-            nsteps = len(_da_file['time'])
-            _da_file = _da_file.chunk(chunks={'time': nsteps})
+            _da_file = xr.open_dataarray(_file, **_kwargs) #, chunks={'time':20) #chunks='auto')
+            if self.spatial_window:
+                # only the window is read from the (lazily indexed) file
+                _da_file = _da_file.isel(self.spatial_window)
+            if 'member' in _da_file.dims:
+                # consolidated ensemble files are chunked according to the chunks on disk
+                _da_file = _da_file.chunk(_da_file.encoding.get('preferred_chunks', {}))
+            else:
+                nsteps = len(_da_file['time'])
+                _da_file = _da_file.chunk(chunks={'time': nsteps})
             #_da_file = xr.open_dataarray(_file, chunks='auto')
             #_da_file = xr.open_dataarray(_file, chunks={'time':5})
         else:
-            _da_file = xr.open_dataarray(_file)
+            _da_file = xr.open_dataarray(_file, **_kwargs)
+            if self.spatial_window:
+                _da_file = _da_file.isel(self.spatial_window)
 
         if _seldate:
             _da_file = _da_file.sel(time=_da_file.time.dt.strftime("%Y%m%d").isin(_seldate))
@@ -689,18 +1060,20 @@ class BaseMetric(dataobjects.DataObject):
         return _da_file
 
 
-    def calc_area_statistics(self, datalist, ds_mask, statistic='mean'):
+    def _region_weights(self, ds_mask):
         """
-        Calculate area statistics (mean/sum) for verif and fc using a combined land-sea-mask from both datasets
-        :param datalist: list of xarray objects for verif and fc
+        Region weights (RegionWeights) for the land-sea mask and the region of the metric.
+        For NSIDC regions the weights of all regions are computed at once. Weights are
+        computed once for each grid, land-sea mask and region definition
         :param ds_mask: combined land-sea-mask from fc and verif (using mask_lsm function)
-        :param statistic: derive mean or sum
-        :return: list of xarray objects (verif and fc) for which statistic has been applied to
+        :return: RegionWeights object, region masks and cell area
         """
+        _key = (self.verif_name, self.region_extent, self.etcdir if self.nsidc_region else None,
+                hashlib.sha1(np.isnan(ds_mask.transpose('yc', 'xc').values).tobytes()).hexdigest(),
+                hashlib.sha1(ds_mask['xc'].values.tobytes() + ds_mask['yc'].values.tobytes()).hexdigest())
+        if _key in REGION_WEIGHTS:
+            return REGION_WEIGHTS[_key]
 
-        utils.print_info('Deriving statistic over area')
-
-        # mask region of interest if selected
         if self.region_extent:
             _region_bounds = utils.csv_to_list(self.region_extent)
             _region_bounds = [float(r) for r in _region_bounds]
@@ -709,32 +1082,29 @@ class BaseMetric(dataobjects.DataObject):
             lat1 = _region_bounds[2]
             lat2 = _region_bounds[3]
 
-            datalist = [mutils.area_cut(d, lon1,lon2,lat1,lat2) for d in datalist]
-            ds_mask_reg = mutils.area_cut(ds_mask, lon1,lon2,lat1,lat2)
+            _mask_key = (self.verif_name, self.region_extent, _key[-1])
+            if _mask_key not in REGION_MASKS:
+                REGION_MASKS[_mask_key] = mutils.region_box_mask(ds_mask, lon1, lon2, lat1, lat2)
+            da_regions = REGION_MASKS[_mask_key].expand_dims(region=['region_extent'])
         elif self.nsidc_region:
-
-            utils.print_info('Selecting NSIDC region')
             ifile = f"{self.etcdir}/nsidc_{self.verif_name.replace('-grid','')}.nc"
             try:
                 ds_nsidc = xr.open_dataarray(ifile)
             except:
                 raise FileNotFoundError(f'NSIDC region file {ifile} not found ')
 
-            region_number = mutils.get_nsidc_region(ds_nsidc, self.nsidc_region)
-            ds_mask_reg = xr.where(ds_nsidc == region_number,ds_mask,float('nan'))
-            ds_mask_reg = ds_mask_reg.drop([i for i in ds_mask_reg.coords if i not in ds_mask_reg.dims])
-            datalist = [d.where(~np.isnan(ds_mask_reg)) for d in datalist]
-
+            # one mask for each region number
+            _numbers = xr.DataArray(np.asarray(ds_nsidc.attrs['flag_values']).astype(int), dims='region')
+            da_regions = (ds_nsidc == _numbers.assign_coords(region=_numbers.values))
+            da_regions = da_regions.drop_vars([i for i in da_regions.coords if i not in da_regions.dims])
+            da_regions = da_regions.reindex_like(ds_mask, fill_value=False)
+            da_regions.attrs = ds_nsidc.attrs
         else:
-            ds_mask_reg = ds_mask
-            datalist = [d.where(~np.isnan(ds_mask_reg)) for d in datalist]
-
-        datalist_mask = datalist
-
+            da_regions = xr.ones_like(ds_mask, dtype=bool).expand_dims(region=['all'])
 
         # CELL AREA
-        xdiff = np.unique(np.diff(datalist_mask[0]['xc'].values))
-        ydiff = np.unique(np.diff(datalist_mask[0]['yc'].values))
+        xdiff = np.unique(np.diff(ds_mask['xc'].values))
+        ydiff = np.unique(np.diff(ds_mask['yc'].values))
         if len(xdiff) > 1 or len(ydiff) > 1:
             raise ValueError('XC or YC coordinates are not evenly spaced')
 
@@ -742,21 +1112,54 @@ class BaseMetric(dataobjects.DataObject):
         ydiff = np.abs(ydiff[0] / 1000)
         cell_area = xdiff * ydiff
 
-        if statistic == 'mean':
-            datalist_out = [d.mean(dim=('xc', 'yc'), skipna=True) for d in datalist_mask]
-            if self.area_statistic_unit == 'total':
-                datalist_out = [d*cell_area for d in datalist_out]
-        elif statistic == 'sum':
-            datalist_out = [d.sum(dim=('xc', 'yc'), skipna=True, min_count=1)*cell_area for d in datalist_mask]
-        elif statistic == 'median':
-            datalist_out = [d.median(dim=('xc', 'yc'), skipna=True) for d in datalist_mask]
-        else:
-            raise ValueError(f'statistic can be either mean or sum not {statistic}')
+        REGION_WEIGHTS[_key] = (mutils.RegionWeights(da_regions, ds_mask, cell_area), da_regions, cell_area)
+        return REGION_WEIGHTS[_key]
 
+    def _region(self, da_regions):
+        """
+        Region used for area statistics of the metric
+        :param da_regions: region masks created in _region_weights
+        :return: name or NSIDC number of region
+        """
+        if self.region_extent:
+            return 'region_extent'
+        if self.nsidc_region:
+            return mutils.get_nsidc_region(da_regions, self.nsidc_region)
+        return 'all'
 
+    def _area_statistics(self, datalist, ds_mask, statistic, verbose):
+        """
+        Area statistics (mean/sum/median) of list of xarray objects (None entries are kept)
+        :return: list of xarray objects and land-sea mask of region
+        """
+        if verbose:
+            utils.print_info('Deriving statistic over area')
+            if self.nsidc_region:
+                utils.print_info('Selecting NSIDC region')
+
+        region_weights, da_regions, cell_area = self._region_weights(ds_mask)
+        region = self._region(da_regions)
+        ds_mask_reg = ds_mask.where(da_regions.sel(region=region, drop=True))
+
+        datalist_out = [region_weights.reduce(d, statistic, regions=[region]).isel(region=0, drop=True)
+                        if d is not None else d for d in datalist]
+        # sums are area weighted already
+        if statistic == 'mean' and self.area_statistic_unit == 'total':
+            datalist_out = [d*cell_area if d is not None else d for d in datalist_out]
 
         return datalist_out, ds_mask_reg.rename('lsm')
 
+    def calc_area_statistics(self, datalist, ds_mask, statistic='mean', verbose=True):
+        """
+        Calculate area statistics (mean/sum) for verif and fc using a combined land-sea-mask from both datasets
+        :param datalist: list of xarray objects for verif and fc
+        :param ds_mask: combined land-sea-mask from fc and verif (using mask_lsm function)
+        :param statistic: derive mean or sum
+        :param verbose: print info (switched off if called for each date)
+        :return: list of xarray objects (verif and fc) for which statistic has been applied to
+        """
+        return self._area_statistics(datalist, ds_mask, statistic, verbose)
+
     def calc_area_statistics_dict(self, dict_data, ds_mask, statistic='mean'):
         """
         Calculate area statistics (mean/sum) for verif and fc using a combined land-sea-mask from both datasets
@@ -765,84 +1168,82 @@ class BaseMetric(dataobjects.DataObject):
         :param statistic: derive mean or sum
         :return: list of xarray objects (verif and fc) for which statistic has been applied to
         """
+        datalist_out, ds_mask_reg = self._area_statistics(list(dict_data.values()), ds_mask, statistic, True)
+        return dict(zip(dict_data, datalist_out)), ds_mask_reg
 
-        utils.print_info('Deriving statistic over area')
-
-        # mask region of interest if selected
-        if self.region_extent:
-            _region_bounds = utils.csv_to_list(self.region_extent)
-            _region_bounds = [float(r) for r in _region_bounds]
-            lon1 = _region_bounds[0]
-            lon2 = _region_bounds[1]
-            lat1 = _region_bounds[2]
-            lat2 = _region_bounds[3]
-
-            dict_data = {k: (mutils.area_cut(v, lon1,lon2,lat1,lat2) if v is not None else v) for k, v in dict_data.items()}
-            ds_mask_reg = mutils.area_cut(ds_mask, lon1,lon2,lat1,lat2)
-
-        elif self.nsidc_region:
-
-            utils.print_info('Selecting NSIDC region')
-            ifile = f"{self.etcdir}/nsidc_{self.verif_name.replace('-grid','')}.nc"
-            try:
-                ds_nsidc = xr.open_dataarray(ifile)
-            except:
-                raise FileNotFoundError(f'NSIDC region file {ifile} not found ')
-
-            region_number = mutils.get_nsidc_region(ds_nsidc, self.nsidc_region)
-            ds_mask_reg = xr.where(ds_nsidc == region_number,ds_mask,float('nan'))
-            ds_mask_reg = ds_mask_reg.drop([i for i in ds_mask_reg.coords if i not in ds_mask_reg.dims])
-            dict_data = {k: (v.where(~np.isnan(ds_mask_reg)) if v is not None else v) for k, v in
-                         dict_data.items()}
-
-        else:
-            ds_mask_reg = ds_mask
-            dict_data = {k: (v.where(~np.isnan(ds_mask_reg)) if v is not None else v) for k, v in
-                         dict_data.items()}
-
-
-
-        # CELL AREA
-        xdiff = np.unique(np.diff(dict_data['da_fc_verif']['xc'].values))
-        ydiff = np.unique(np.diff(dict_data['da_fc_verif']['yc'].values))
-        if len(xdiff) > 1 or len(ydiff) > 1:
-            raise ValueError('XC or YC coordinates are not evenly spaced')
-
-        xdiff = np.abs(xdiff[0] / 1000)
-        ydiff = np.abs(ydiff[0] / 1000)
-        cell_area = xdiff * ydiff
-
-        if statistic == 'mean':
-            dict_data_out = {k: (v.mean(dim=('xc', 'yc'), skipna=True) if v is not None else v) for k, v in
-                         dict_data.items()}
-            if self.area_statistic_unit == 'total':
-                dict_data_out = {k: (v*cell_area if v is not None else v) for k, v in
-                         dict_data.items()}
-        elif statistic == 'sum':
-            dict_data_out = {k: (v.sum(dim=('xc', 'yc'), skipna=True, min_count=1)*cell_area if v is not None else v) for k, v in
-                             dict_data.items()}
-        elif statistic == 'median':
-            dict_data_out = {k: (v.median(dim=('xc', 'yc'), skipna=True) if v is not None else v)
-                             for k, v in
-                             dict_data.items()}
-        else:
-            raise ValueError(f'statistic can be either mean or sum not {statistic}')
+    def _get_spatial_window(self):
+        """
+        Index window (yc, xc) enclosing the region used for area statistics. Everything outside
+        the region is masked anyway, so only this window is read from the cache files.
+        No window is used if data outside the region is needed (edge detection) or
+        calibration files are written
+        :return: dictionary with slices for yc and xc or None
+        """
+        if self.area_statistic_kind is None or not (self.region_extent or self.nsidc_region):
+            return None
+        if 'edge' in self.plottype or \
+                (self.calib and self.calib_exists == 'no' and self.calibrationdir is not None):
+            return None
 
+        # grid coordinates are taken from the first forecast file
+        _fcset = next(iter(self.fcverifsets.values()))
+        _files = [_file for _file in self._get_fc_files(_fcset, _fcset['sdates'][0], self.grid)
+                  if os.path.exists(_file)]
+        if not _files:
+            return None
 
+        _kwargs = {'engine': 'zarr'} if _files[0].endswith('.zarr') else {}
+        with xr.open_dataarray(_files[0], **_kwargs) as _da_grid:
+            _da_grid = _da_grid.isel({_dim: 0 for _dim in _da_grid.dims if _dim not in ['yc', 'xc']})
+            if self.region_extent:
+                _region_bounds = [float(r) for r in utils.csv_to_list(self.region_extent)]
+                _mask = mutils.region_box_mask(_da_grid, *_region_bounds)
+            else:
+                ifile = f"{self.etcdir}/nsidc_{self.verif_name.replace('-grid','')}.nc"
+                with xr.open_dataarray(ifile) as ds_nsidc:
+                    _mask = ds_nsidc == mutils.get_nsidc_region(ds_nsidc, self.nsidc_region)
+                    _mask = _mask.drop_vars([i for i in _mask.coords if i not in _mask.dims])
+                    _mask = _mask.reindex_like(_da_grid, fill_value=False)
+            _mask = _mask.transpose('yc', 'xc').values
+
+        _rows = np.flatnonzero(_mask.any(axis=1))
+        _cols = np.flatnonzero(_mask.any(axis=0))
+        if _rows.size == 0:
+            return None
+        return {'yc': slice(int(_rows[0]), int(_rows[-1]) + 1),
+                'xc': slice(int(_cols[0]), int(_cols[-1]) + 1)}
 
-        return dict_data_out, ds_mask_reg.rename('lsm')
+    def _lsm_filename(self, ds_obs):
+        """
+        Filename of the combined land-sea mask saved in the forecast cache directory.
+        The mask depends on the forecast system/cycle (cache directory), the
+        verification data/grid, the missing values of the observations used and the
+        additional mask
+        :param ds_obs: observations used for the mask
+        :return: filename
+        """
+        _fcset = next(iter(self.fcverifsets.values()))
+        _obs_key = hashlib.sha1(np.packbits(np.isnan(ds_obs.values)).tobytes()).hexdigest()[:12]
+        filename = f"{_fcset['cachedir']}/lsm_{self.params}_{self.verif_name}_{_obs_key}"
+        if self.additional_mask:
+            _stat = os.stat(self.additional_mask)
+            _key = repr((os.path.abspath(self.additional_mask), _stat.st_size, _stat.st_mtime_ns))
+            filename += f'_{hashlib.sha1(_key.encode()).hexdigest()[:12]}'
+        if self.spatial_window:
+            filename += f"_{self.spatial_window['yc'].start}-{self.spatial_window['yc'].stop}" \
+                        f"_{self.spatial_window['xc'].start}-{self.spatial_window['xc'].stop}"
+        return f'{filename}.nc'
 
     def mask_lsm(self, ds_obs, ds_fc):
-        """ Create land-sea mask from two datasets (usually observations and fc)
-        :param datalist: list of dataArrays (first two will be used to generate combined lsm)
-        :return: list masked dataArrays from datalist
+        """ Create land-sea mask from two datasets (usually observations and fc). The mask is
+        saved in the forecast cache directory and read from there for all following metrics
+        :param ds_obs: observations
+        :param ds_fc: forecast
+        :return: combined land-sea mask and observations of one time step (with attributes for plotting)
         """
         alldims = ['member', 'date', 'inidate']
 
-        # remove unnecessary dimensions
-        fc_dims = {d:0 for d in alldims if d in ds_fc.dims}
-        fc_dims['time'] = [0]
-        ds_fc = ds_fc.isel(fc_dims)
+        # observations of the first time step with valid data
         obs_dims = {d: 0 for d in alldims if d in ds_obs.dims}
         for t in range(len(ds_obs['time'].values)):
             if not np.isnan(ds_obs.isel(obs_dims).isel(time=t).values).all():
@@ -850,6 +1251,16 @@ class BaseMetric(dataobjects.DataObject):
                 break
         ds_obs = ds_obs.isel(obs_dims)
 
+        _filename = self._lsm_filename(ds_obs)
+        if os.path.isfile(_filename):
+            utils.print_info(f'Reading land-sea mask {_filename}')
+            return xr.load_dataarray(_filename), ds_obs
+
+        # remove unnecessary dimensions
+        fc_dims = {d:0 for d in alldims if d in ds_fc.dims}
+        fc_dims['time'] = [0]
+        ds_fc = ds_fc.isel(fc_dims)
+
         ds_mask = mutils.create_combined_mask(ds_obs,
                                              ds_fc)
 
@@ -860,7 +1271,21 @@ class BaseMetric(dataobjects.DataObject):
 
             ds_mask = ds_mask.where(~np.isnan(ds_additional_mask.squeeze()))
 
-        return ds_mask.rename('lsm-full'), ds_obs
+        ds_mask = ds_mask.rename('lsm-full').compute()
+
+        # write to temporary file first, so that other jobs never read incomplete files
+        _tmpfilename = f'{_filename}.{os.getpid()}.tmp'
+        try:
+            ds_mask.to_netcdf(_tmpfilename)
+            os.replace(_tmpfilename, _filename)
+            self.manifest(os.path.dirname(_filename)).record(_filename, ds_mask)
+            utils.print_info(f'Saving land-sea mask to {_filename}')
+        except OSError:
+            utils.print_info(f'Land-sea mask could not be saved to {_filename}')
+            if os.path.isfile(_tmpfilename):
+                os.remove(_tmpfilename)
+
+        return ds_mask, ds_obs
 
 
     def process_data_for_metric(self, average_dims,
@@ -880,6 +1305,37 @@ class BaseMetric(dataobjects.DataObject):
                 raise ValueError('Calibration using persistence only works when first timestep for forecast is in target')
 
 
+        self.spatial_window = self._get_spatial_window()
+
+        # all attributes of the metric affecting the processed data are part of the key
+        _key = (repr(sorted((k, v) for k, v in self.__dict__.items()
+                            if k not in self.presentation_attributes)),
+                'edge' in self.plottype, repr(average_dims), persistence, sice_threshold)
+        if _key in SHARED_DATA:
+            utils.print_info('Using data processed for previous metric')
+            dict_out, verdata_missing = SHARED_DATA.get(_key)
+            if verdata_missing and self.add_verdata == 'yes':
+                utils.print_info('No verification data found --> add_verdata set to no')
+                self.add_verdata = 'no'
+            return dict_out
+
+        _cachedir = None
+        if self.processed_cache == 'yes' and (self.plottype == 'calc_calib' or
+                                              (self.calib and self.calib_exists == 'no'
+                                               and self.calibrationdir is not None)):
+            # calibration files are written while processing the data
+            utils.print_info('Calibration file is written --> processed cache not used')
+        elif self.processed_cache == 'yes':
+            _cachedir = self._processed_cache_dir(_key)
+            _cached = self._read_processed_cache(_cachedir)
+            if _cached is not None:
+                dict_out, verdata_missing = _cached
+                if verdata_missing and self.add_verdata == 'yes':
+                    utils.print_info('No verification data found --> add_verdata set to no')
+                    self.add_verdata = 'no'
+                SHARED_DATA.put(_key, (dict_out, verdata_missing))
+                return dict_out
+
         dict_out = {}
         dict_data = {}
         # read verdata/fc data for verif
@@ -888,7 +1344,8 @@ class BaseMetric(dataobjects.DataObject):
         da_verdata_verif_raw = self.load_verif_data('verif',
                                                 average_dim=average_dims)
 
-        if da_verdata_verif_raw is None:
+        verdata_missing = da_verdata_verif_raw is None
+        if verdata_missing:
             da_verdata_verif_raw = self._load_verif_dummy(average_dim=average_dims)
             if self.add_verdata == 'yes':
                 utils.print_info('No verification data found --> add_verdata set to no')
@@ -899,14 +1356,21 @@ class BaseMetric(dataobjects.DataObject):
 
 
         # read verdata/fc data for calib
+        calib_files = []
+        dict_data['da_fc_calib'] = None
+        dict_data['da_verdata_calib'] = None
         if self.calib and self.calib_exists == 'no' and self.calib_method != 'persistence':
-            da_fc_calib = self.load_fc_data('calib', average_dim=average_dims)
-            da_verdata_calib = self.load_verif_data('calib', average_dim=['member'])
-            dict_data['da_fc_calib'] = da_fc_calib
-            dict_data['da_verdata_calib'] = da_verdata_calib
-        else:
-            dict_data['da_fc_calib'] = None
-            dict_data['da_verdata_calib'] = None
+            fccalibsets = self.fccalibsets
+            if self.calib_update == 'yes':
+                # start dates already contained in calibration files are not loaded again
+                calib_files, _sdates = self._find_calibration_statistics()
+                fccalibsets = self._remove_sdates(fccalibsets, _sdates)
+
+            if fccalibsets:
+                dict_data['da_fc_calib'] = self.load_fc_data('calib', average_dim=average_dims,
+                                                             fcset=fccalibsets)
+                dict_data['da_verdata_calib'] = self.load_verif_data('calib', average_dim=['member'],
+                                                                     fcset=fccalibsets)
 
 
 
@@ -919,13 +1383,16 @@ class BaseMetric(dataobjects.DataObject):
         else:
             dict_data['da_verdata_persistence'] = None
 
+        if OBS_CACHE.max_bytes > 0:
+            utils.print_info(f'Observation cache: {OBS_CACHE}')
+
 
 
         # 1. calibrate if desired
         if self.calib and self.calib_method != 'score':
             da_fc_verif_bc = self.calibrate(dict_data['da_verdata_calib'], dict_data['da_fc_calib'],
                                             dict_data['da_fc_verif'], dict_data['da_verdata_persistence'],
-                                            method=self.calib_method)
+                                            method=self.calib_method, calib_files=calib_files)
             dict_data['da_fc_verif_bc'] = da_fc_verif_bc
 
         lsm_full, da_coords = self.mask_lsm(da_verdata_verif_raw, da_fc_verif)
@@ -943,11 +1410,15 @@ class BaseMetric(dataobjects.DataObject):
                          dict_data.items()}
 
         if 'edge' in self.plottype:
-            raise ValueError('EDGE NOT IMPLEMENTED YET')
-            # utils.print_info('Edge detection algorithm')
-            # da_verdata_verif_ice_edge = mutils.detect_edge(da_verdata_verif)
-            # da_verdata_verif_ice_ext_edge = mutils.detect_extended_edge(da_verdata_verif_ice_edge)
-            # datalist = [d.where(da_verdata_verif_ice_ext_edge == 1) for d in datalist]
+            utils.print_info('Edge detection algorithm')
+            # restrict verification to the grid cells close to the observed ice edge
+            # (persistence scores are restricted as well as they use the observations)
+            da_edge_band = mutils.edge_band_mask(dict_data['da_verdata_verif'])
+            if 'member' in da_edge_band.dims:
+                da_edge_band = da_edge_band.isel(member=0, drop=True)
+            for _name in ['da_fc_verif', 'da_fc_verif_bc', 'da_verdata_verif']:
+                if dict_data.get(_name) is not None:
+                    dict_data[_name] = dict_data[_name].where(da_edge_band)
 
         # area average if  desired
         if self.area_statistic_kind == 'data':
@@ -961,16 +1432,163 @@ class BaseMetric(dataobjects.DataObject):
         # return this array as it definitely still has all attributes needed for plotting
         dict_out['da_coords'] = da_coords
 
+        if _cachedir is not None:
+            dict_out = self._write_processed_cache(_cachedir, dict_out, verdata_missing)
+
+        SHARED_DATA.put(_key, (dict_out, verdata_missing))
+        return dict_out
+
+    def _source_files(self):
+        """
+        All files the processed data is computed from (forecast and observation cache files,
+        additional mask and precomputed calibration file)
+        :return: sorted list of filenames
+        """
+        filename_verif = self._filenaming_convention('verif')
+        _files = set()
+        _fcsets = [self.fcverifsets]
+        if self.calib and self.calib_exists == 'no' and self.calib_method != 'persistence':
+            _fcsets.append(self.fccalibsets)
+
+        for fcset in _fcsets:
+            for fcname in fcset:
+                for _date in fcset[fcname]['sdates']:
+                    _files.update(self._get_fc_files(fcset[fcname], _date, self.grid))
+                    # start date is needed for persistence
+                    for _seldate in [_date] + self._get_seldates(_date, self.target):
+                        _files.add(f"{self.obscachedir}/{filename_verif.format(_seldate, self.params, self.grid)}")
+
+        if self.additional_mask:
+            _files.add(self.additional_mask)
+        if self.calib and (self.calib_exists == 'yes' or self.calib_update == 'yes'):
+            _files.update(glob.glob(f'{self.calibrationdir}/{self._calibration_filename(pattern=True)}'))
+        return sorted(_files)
+
+    def _processed_cache_dir(self, key):
+        """
+        Directory of processed data in metricdir. The name is a hash of the key of
+        process_data_for_metric and of size and modification time of all source files,
+        so that data is recomputed as soon as one of the files changes
+        :param key: key created in process_data_for_metric
+        :return: directory name
+        """
+        _hash = hashlib.sha1(repr(key).encode())
+        for _file in self._source_files():
+            if os.path.exists(_file):
+                _stat = os.stat(_file)
+                _hash.update(f'{_file}:{_stat.st_size}:{_stat.st_mtime_ns}'.encode())
+            else:
+                _hash.update(f'{_file}:missing'.encode())
+        return f'{self.metricdir}/processed_cache/{_hash.hexdigest()}'
+
+    def _read_processed_cache(self, cachedir):
+        """
+        Read processed data written by _write_processed_cache
+        :param cachedir: directory created by _processed_cache_dir
+        :return: tuple of dictionary of processed data and verdata_missing flag or None if
+        directory does not exist
+        """
+        if not os.path.isfile(f'{cachedir}/content.json'):
+            return None
+
+        utils.print_info(f'Reading processed data from {cachedir}')
+        with open(f'{cachedir}/content.json', encoding='utf-8') as _fp:
+            _content = json.load(_fp)
+
+        dict_out = {}
+        for _name in _content['variables']:
+            if _name in _content['none']:
+                dict_out[_name] = None
+            elif self.use_dask:
+                dict_out[_name] = xr.open_dataarray(f'{cachedir}/{_name}.nc', chunks={})
+            else:
+                with xr.open_dataarray(f'{cachedir}/{_name}.nc') as _da:
+                    dict_out[_name] = _da.load()
+        return dict_out, _content['verdata_missing']
+
+    def _write_processed_cache(self, cachedir, dict_out, verdata_missing):
+        """
+        Write processed data to cachedir (one file per entry). Files are written to a temporary
+        directory first, which is renamed afterwards, so that other processes only see complete data
+        :param cachedir: directory created by _processed_cache_dir
+        :param dict_out: dictionary of processed data
+        :param verdata_missing: True if no verification data has been found
+        :return: dict_out (read from the written files if dask is used, so that data
+        is computed only once)
+        """
+        utils.print_info(f'Saving processed data to {cachedir}')
+        _tmpdir = f'{cachedir}.{os.getpid()}.tmp'
+        utils.make_dir(_tmpdir)
+
+        for _name, _da in dict_out.items():
+            if _da is not None:
+                _da.drop_encoding().to_netcdf(f'{_tmpdir}/{_name}.nc')
+
+        _content = {'variables': list(dict_out),
+                    'none': [_name for _name, _da in dict_out.items() if _da is None],
+                    'verdata_missing': verdata_missing}
+        with open(f'{_tmpdir}/content.json', 'w', encoding='utf-8') as _fp:
+            json.dump(_content, _fp)
+
+        try:
+            os.rename(_tmpdir, cachedir)
+        except OSError:
+            # written by another process in the meantime
+            shutil.rmtree(_tmpdir)
+
+        if self.use_dask:
+            return self._read_processed_cache(cachedir)[0]
         return dict_out
 
 
-    def calibrate(self, da_verdata_calib, da_fc_calib, da_fc_verif, da_pers, method=None):
+    def accumulate_scores(self, processed_data_dict, scores, area_sum=None):
+        """
+        Accumulate the sums needed for the scores in one pass over all (inidate, date)
+        slabs of the processed forecast, observation and persistence data
+        :param processed_data_dict: dictionary created in process_data_for_metric
+        :param scores: list of quantities to accumulate (see mutils.ScoreAccumulator)
+        :param area_sum: function applied to gridded data of each slab (needed for iiee)
+        :return: mutils.ScoreAccumulator
+        """
+        if self.calib:
+            da_fc = processed_data_dict['da_fc_verif_bc']
+        else:
+            da_fc = processed_data_dict['da_fc_verif']
+        da_obs = processed_data_dict['da_verdata_verif']
+        da_pers = processed_data_dict['da_verdata_persistence']
+
+        # dimensions averaged while loading are added again with length 1
+        _alldims = ['inidate', 'date', 'member']
+        da_fc = da_fc.expand_dims([d for d in _alldims if d not in da_fc.dims]).transpose(*_alldims, ...)
+        _dims = [d for d in da_fc.dims if d != 'member']
+        da_obs = da_obs.expand_dims([d for d in _alldims if d not in da_obs.dims])
+        da_obs = da_obs.isel(member=0, drop=True).transpose(*_dims)
+        if da_pers is not None:
+            da_pers = da_pers.expand_dims([d for d in _alldims[:2] if d not in da_pers.dims])
+            da_pers = da_pers.transpose(*[d for d in _dims if d != 'time'])
+
+        utils.print_info(f"Accumulating {', '.join(scores)}")
+        _acc = mutils.ScoreAccumulator(scores, area_sum=area_sum)
+        for _ii in range(da_fc.sizes['inidate']):
+            # data (also dask graphs, e.g. calibration) are computed for one forecast set at a time
+            _fc = da_fc.isel(inidate=_ii, drop=True).load()
+            _obs = da_obs.isel(inidate=_ii, drop=True).load()
+            _pers = da_pers.isel(inidate=_ii, drop=True).load() if da_pers is not None else None
+            for _di in range(da_fc.sizes['date']):
+                _acc.add(_fc.isel(date=_di, drop=True), _obs.isel(date=_di, drop=True),
+                         _pers.isel(date=_di, drop=True) if _pers is not None else None)
+
+        return _acc
+
+    def calibrate(self, da_verdata_calib, da_fc_calib, da_fc_verif, da_pers, method=None, calib_files=None):
         """
         Apply calibration to forecast to be verified
         :param da_verdata_calib: calibration observation data
         :param da_fc_calib: calibration forecast data
         :param da_fc_verif: forecast data to be calibrated
         :param method: method used for calibration
+        :param calib_files: calibration files with statistics of start dates which are not
+        contained in the calibration data (calib_update)
         :return: calibrated forecast
         """
         utils.print_info(f'Calibrating using method: {method}')
@@ -982,99 +1600,236 @@ class BaseMetric(dataobjects.DataObject):
 
 
         if self.calib_exists == 'yes':
-            correction = self.get_save_calibration_file().to_dataarray().squeeze()
-
-            target_list = utils.create_list_target_verif(self.target, _dates=None, as_list=True)
-
-            if np.max(target_list) > correction.time.values.max():
-                raise RuntimeError("Calibration file does not include all necessary timesteps")
-
-            correction = correction.isel(time=correction.time.isin(target_list))
-            if len(correction.time.values) != len(da_fc_verif.time.values):
-                raise RuntimeError("Calibration file and forecast file do not have the same number of timesteps")
-
-            fc_verif_bc = da_fc_verif - correction
+            ds_calib = self._select_calibration_times(self._read_calibration_statistics(), da_fc_verif)
 
-            return fc_verif_bc.clip(0, 1)
+            if 'calib_sdates' not in ds_calib.attrs:
+                # calibration files without statistics contain the correction only
+                correction = ds_calib.to_dataarray().squeeze()
+                fc_verif_bc = da_fc_verif - correction
+                return fc_verif_bc.clip(0, 1)
+            ds_stats = ds_calib
 
-        if method == 'persistence':
+        elif method == 'persistence':
             correction = da_fc_verif.isel(time=0) - da_pers
             fc_verif_bc = da_fc_verif - correction
             return fc_verif_bc.clip(0,1)
 
-        if method in ('mean' , 'anom'):
-            # mask all occasions where no verdata data exists
-            da_fc_calib = da_fc_calib.where(~np.isnan(da_verdata_calib))
-
-            for dim in ['inidate', 'date','member']:
-                if dim in da_fc_calib.dims:
-                    da_fc_calib = da_fc_calib.mean(dim=dim)
-                if dim in da_verdata_calib.dims:
-                    da_verdata_calib = da_verdata_calib.mean(dim=dim)
+        else:
+            ds_stats = self._calibration_statistics(da_verdata_calib, da_fc_calib, method,
+                                                    calib_files or [])
+            ds_stats = self._select_calibration_times(ds_stats, da_fc_verif)
 
+        if method in ('mean' , 'anom'):
             if method == 'mean':
                 utils.print_info('Calibration mean')
-                correction = da_fc_calib - da_verdata_calib
-                fc_verif_bc = da_fc_verif - correction
-            elif method == 'anom':
+            else:
                 utils.print_info('Calibration anomalies')
-                correction = da_fc_calib
-                fc_verif_bc = da_fc_verif - correction
-
-            self.get_save_calibration_file(correction)
-
+            correction = mutils.calibration_correction(ds_stats, method)
+            fc_verif_bc = da_fc_verif - correction.astype(da_fc_verif.dtype)
             return fc_verif_bc.clip(0,1)
 
 
         if method == 'mean+trend':
             utils.print_info('Calibration mean+trend')
-            # mask all occasions where no verdata data exists
-            da_fc_calib = da_fc_calib.where(~np.isnan(da_verdata_calib))
+            da_slope, da_intercept = mutils.linreg_from_statistics(ds_stats)
 
-            for dim in ['inidate', 'member']:
-                if dim in da_fc_calib.dims:
-                    da_fc_calib = da_fc_calib.mean(dim=dim)
-                if dim in da_verdata_calib.dims:
-                    da_verdata_calib = da_verdata_calib.mean(dim=dim)
+            years_calib = np.arange(int(self.calib_fromyear[0]), int(self.calib_toyear[0]) + 100)
 
-            bias_calib = da_fc_calib - da_verdata_calib
 
-            if 'xc' not in bias_calib.dims:
-                bias_calib = bias_calib.expand_dims(['xc', 'yc'])
+            if self.verif_fromyear[0] is not None:
+                years_verif = np.arange(int(self.verif_fromyear[0]), int(self.verif_toyear[0])+1)
+            else:
+                verif_year = self.verif_dates[0][:4]
+                years_verif = np.arange(int(verif_year), int(verif_year) + 1)
+            years_verif = years_verif[np.isin(years_verif, years_calib)]
+            da_years = xr.DataArray(years_verif, dims='date', coords={'date': da_fc_verif['date']})
 
+            correction = da_slope*da_years + da_intercept
+            fc_verif_bc = da_fc_verif - correction.astype(da_fc_verif.dtype)
+            fc_verif_bc = fc_verif_bc.squeeze()
 
-            da_slope, da_intercept, da_pvalue = mutils.compute_linreg(bias_calib)
+            return fc_verif_bc.clip(0,1)
 
+    def _select_calibration_times(self, ds_calib, da_fc_verif):
+        """
+        Select the lead times of the target from calibration statistics/correction
+        :param ds_calib: xarray Dataset with calibration statistics or correction
+        :param da_fc_verif: forecast data to be calibrated
+        :return: xarray Dataset with the lead times of the forecast
+        """
+        target_list = utils.create_list_target_verif(self.target, _dates=None, as_list=True)
 
-            years_calib = np.arange(int(self.calib_fromyear[0]), int(self.calib_toyear[0]) + 100)
+        if not np.isin(target_list, ds_calib.time.values).all():
+            raise RuntimeError("Calibration data does not include all necessary timesteps")
 
+        ds_calib = ds_calib.isel(time=ds_calib.time.isin(target_list))
+        if len(ds_calib.time.values) != len(da_fc_verif.time.values):
+            raise RuntimeError("Calibration data and forecast file do not have the same number of timesteps")
+        return ds_calib
 
-            if self.verif_fromyear[0] is not None:
-                years_verif = np.arange(int(self.verif_fromyear[0]), int(self.verif_toyear[0])+1)
+    def _calibration_statistics(self, da_verdata_calib, da_fc_calib, method, calib_files):
+        """
+        Compute the statistics of the calibration data, add the statistics of existing
+        calibration files (start dates not contained in the calibration data) and save them
+        :param da_verdata_calib: calibration observation data (None if all start dates are in calib_files)
+        :param da_fc_calib: calibration forecast data (None if all start dates are in calib_files)
+        :param method: mean, anom or mean+trend
+        :param calib_files: calibration files with statistics for subsets of the start dates
+        :return: xarray Dataset with statistics
+        """
+        _datasets = [self._load_calibration_statistics(_file) for _file in calib_files]
+        _sdates = set()
+        for _ds in _datasets:
+            _sdates.update(_ds.attrs['calib_sdates'].split(','))
+
+        if da_fc_calib is not None:
+            if method == 'mean+trend':
+                # mask all occasions where no verdata data exists
+                da_fc_calib = da_fc_calib.where(~np.isnan(da_verdata_calib))
+                for dim in ['inidate', 'member']:
+                    if dim in da_fc_calib.dims:
+                        da_fc_calib = da_fc_calib.mean(dim=dim)
+                    if dim in da_verdata_calib.dims:
+                        da_verdata_calib = da_verdata_calib.mean(dim=dim)
+                bias_calib = da_fc_calib - da_verdata_calib
+                years = int(self.calib_fromyear[0]) + bias_calib['date'].values
+                ds_new = mutils.trend_statistics(bias_calib, years)
             else:
-                verif_year = self.verif_dates[0][:4]
-                years_verif = np.arange(int(verif_year), int(verif_year) + 1)
-            years_verif_int = np.intersect1d(years_verif, years_calib, return_indices=True)[2]
+                ds_new = mutils.calibration_statistics(da_fc_calib, da_verdata_calib)
+            _datasets.append(ds_new)
+            _sdates.update(self._calibration_sdates())
 
-            orgdates = da_fc_verif['date'].values[:]
-            da_fc_verif['date'] = years_verif_int
+        if calib_files:
+            utils.print_info(f'Using calibration statistics of {len(calib_files)} existing files')
 
+        ds_stats = mutils.merge_calibration_statistics(_datasets).compute()
+        ds_stats.attrs = {'calib_sdates': ','.join(sorted(_sdates))}
 
-            correction = da_slope*da_fc_verif['date'] + da_intercept
-            fc_verif_bc = da_fc_verif - correction
-            fc_verif_bc['date'] = orgdates
-            fc_verif_bc = fc_verif_bc.squeeze()
+        # nothing to save if the statistics are read from the calibration file itself
+        if da_fc_calib is not None or \
+                [os.path.basename(_file) for _file in calib_files] != [self._calibration_filename()]:
+            self._save_calibration_statistics(ds_stats, method)
+        return ds_stats
 
-            return fc_verif_bc.clip(0,1)
+    def _save_calibration_statistics(self, ds_stats, method):
+        """
+        Save calibration file. Besides the correction (or slope and intercept for mean+trend)
+        the file contains the statistics in group CALIB_STATISTICS_GROUP, so that readers
+        expecting the correction only can still use the file
+        :param ds_stats: xarray Dataset with statistics
+        :param method: mean, anom or mean+trend
+        """
+        if method == 'mean+trend':
+            da_slope, da_intercept = mutils.linreg_from_statistics(ds_stats)
+            ds_calib = xr.Dataset({'slope': da_slope, 'intercept': da_intercept})
+        else:
+            ds_calib = mutils.calibration_correction(ds_stats, method).to_dataset(name=self.params)
+        ds_calib.attrs = ds_stats.attrs
+        self.get_save_calibration_file(ds_calib, ds_stats=ds_stats)
 
-    def get_save_calibration_file(self, ds=None):
+    @staticmethod
+    def _load_calibration_statistics(filename):
         """
-        Retrieve or save calibration file of metric
-        :param ds: if None then load existing calibration file else
-        save file
-        :return: xarray with calibration if ds is None
+        Read the statistics of a calibration file written by _save_calibration_statistics
+        (files containing the attribute calib_sdates)
+        :param filename: calibration file
+        :return: xarray Dataset with statistics
+        """
+        return xr.load_dataset(filename, group=CALIB_STATISTICS_GROUP)
+
+    def _calibration_sdates(self):
+        """ All start dates (YYYYMMDD) used for calibration """
+        if hasattr(self, 'fccalibsets'):
+            return [_date for fcname in self.fccalibsets for _date in self.fccalibsets[fcname]['sdates']]
+
+        if len(self.calib_dates[0]) == 8:
+            return list(self.calib_dates)
+
+        _sdates = []
+        for _date, _fromyear, _toyear in zip(self.calib_dates, self.calib_fromyear, self.calib_toyear):
+            for _year in range(int(_fromyear), int(_toyear) + 1):
+                # dates which are not defined, e.g. 29.2 for non-leap years, are skipped
+                try:
+                    _sdates.append(dt.datetime.strptime(f'{_year}{_date}', '%Y%m%d').strftime('%Y%m%d'))
+                except ValueError:
+                    pass
+        return _sdates
+
+    @staticmethod
+    def _remove_sdates(fcsets, sdates):
+        """
+        Remove start dates from forecast sets
+        :param fcsets: forecast sets created in _init_fc
+        :param sdates: start dates to be removed
+        :return: forecast sets (without sets which have no start dates left)
+        """
+        _fcsets = {}
+        for fcname in fcsets:
+            _remaining = [_date for _date in fcsets[fcname]['sdates'] if _date not in sdates]
+            if _remaining:
+                _fcsets[fcname] = {**fcsets[fcname], 'sdates': _remaining}
+        return _fcsets
+
+    def _find_calibration_statistics(self):
         """
+        Find calibration files in calibrationdir with statistics for subsets of the calibration
+        start dates. Files are selected starting with the largest number of start dates, files
+        with start dates contained in an already selected file are skipped
+        :return: list of filenames and set of start dates contained in these files
+        """
+        _sdates = set(self._calibration_sdates())
+        _candidates = []
+        for _file in sorted(glob.glob(f'{self.calibrationdir}/{self._calibration_filename(pattern=True)}')):
+            with xr.open_dataset(_file) as _ds:
+                _file_sdates = _ds.attrs.get('calib_sdates')
+            # files written by older versions contain the correction only
+            if _file_sdates is None:
+                continue
+            _file_sdates = set(_file_sdates.split(','))
+            if _file_sdates <= _sdates:
+                _candidates.append((_file, _file_sdates))
+
+        _files = []
+        _covered = set()
+        for _file, _file_sdates in sorted(_candidates, key=lambda _c: len(_c[1]), reverse=True):
+            if not _file_sdates & _covered:
+                _files.append(_file)
+                _covered.update(_file_sdates)
+        return _files, _covered
+
+    def _read_calibration_statistics(self):
+        """
+        Read pre-computed calibration file. If it does not exist the statistics are merged
+        from calibration files of subsets of the calibration start dates (if these contain
+        all start dates)
+        :return: xarray Dataset
+        """
+        filename = f'{self.calibrationdir}/{self._calibration_filename()}'
+        if os.path.isfile(filename) or self.calib_method not in ['mean', 'anom', 'mean+trend']:
+            ds_calib = self.get_save_calibration_file()
+            # files written by older versions contain the correction only
+            if 'calib_sdates' in ds_calib.attrs and self.calib_method in ['mean', 'anom', 'mean+trend']:
+                ds_calib.close()
+                return self._load_calibration_statistics(filename)
+            return ds_calib
 
+        _files, _sdates = self._find_calibration_statistics()
+        if not _files or _sdates != set(self._calibration_sdates()):
+            raise RuntimeError(f'Calibration file {filename} not found')
+
+        utils.print_info(f'Merging calibration statistics of {len(_files)} files')
+        ds_stats = mutils.merge_calibration_statistics([self._load_calibration_statistics(_file)
+                                                        for _file in _files])
+        ds_stats.attrs = {'calib_sdates': ','.join(sorted(_sdates))}
+        return ds_stats
+
+    def _calibration_filename(self, pattern=False):
+        """
+        Filename (without directory) of calibration file of metric
+        :param pattern: if True return glob pattern matching calibration files for all
+        calibration dates/years
+        :return: filename
+        """
         if self.calib_method == 'score':
             filename = f'{self.plottype}_{self.verif_source[0]}_'
         else:
@@ -1085,12 +1840,26 @@ class BaseMetric(dataobjects.DataObject):
 
         filename += (f'{self.verif_expname[0]}_{self.verif_fcsystem[0]}_{self.calib_enssize[0]}_{self.calib_mode[0]}_'
                      f'{self.calib_method}_')
-        calib_dates = '-'.join(self.calib_dates)
-        filename += f'{calib_dates}_'
-        if self.calib_fromyear[0] is not None:
-            filename += f'{self.calib_fromyear[0]}-{self.calib_toyear[0]}'
+        if pattern:
+            filename += '*'
+        else:
+            calib_dates = '-'.join(self.calib_dates)
+            filename += f'{calib_dates}_'
+            if self.calib_fromyear[0] is not None:
+                filename += f'{self.calib_fromyear[0]}-{self.calib_toyear[0]}'
 
         filename += f'_{self.verif_name}.nc'
+        return filename
+
+    def get_save_calibration_file(self, ds=None, ds_stats=None):
+        """
+        Retrieve or save calibration file of metric
+        :param ds: if None then load existing calibration file else
+        save file
+        :param ds_stats: calibration statistics saved in group CALIB_STATISTICS_GROUP
+        :return: xarray with calibration if ds is None
+        """
+        filename = self._calibration_filename()
 
         if ds is None:
             utils.print_info('Reading pre-calculated calibration file')
@@ -1102,5 +1871,10 @@ class BaseMetric(dataobjects.DataObject):
         else:
             if self.calibrationdir is not None:
                 outfilename = self.calibrationdir + '/' + filename
-                ds.compute().to_netcdf(outfilename)
+                # write to temporary file first, so that other jobs never read incomplete files
+                tmpfilename = f'{outfilename}.{os.getpid()}.tmp'
+                ds.compute().to_netcdf(tmpfilename)
+                if ds_stats is not None:
+                    ds_stats.compute().to_netcdf(tmpfilename, mode='a', group=CALIB_STATISTICS_GROUP)
+                os.replace(tmpfilename, outfilename)
                 utils.print_info(f'Saving calibration file to {outfilename}')
@@ -1,10 +1,449 @@
 """ Utils needed specifically in metric routines """
 
+import collections
+import threading
 import numpy as np
 import xarray as xr
+from scipy import ndimage
+from scipy import sparse
 from scipy import stats
 import utils
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
+class DataCache:
+    """
+    In-memory least-recently-used cache of decoded xarray objects.
+    The total size of all entries is bounded by a memory budget.
+    The cache can be shared between threads
+    """
+
+    def __init__(self, max_bytes=0):
+        """
+        :param max_bytes: memory budget in bytes (0 disables the cache)
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return f'{len(self)} entries ({self.nbytes / 1024**2:.1f} of ' \
+               f'{self.max_bytes / 1024**2:.1f} MB), {self.hits} hits, {self.misses} misses'
+
+    def get(self, key):
+        """
+        Return cached object and mark it as most recently used
+        :param key: hashable key
+        :return: cached object or None if not in cache
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, data):
+        """
+        Add object to cache and evict least recently used entries if memory budget is exceeded
+        :param key: hashable key
+        :param data: xarray object (objects larger than the budget are not cached)
+        """
+        if data.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key).nbytes
+            self._entries[key] = data
+            self.nbytes += data.nbytes
+            while self.nbytes > self.max_bytes:
+                _, _data = self._entries.popitem(last=False)
+                self.nbytes -= _data.nbytes
+
+    def clear(self):
+        """ Remove all entries and reset counters """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+class SharedData:
+    """
+    In-process store of data shared between metrics with identical data requirements
+    (used when plotting several plotids in one process). Disabled by default.
+    Entries are returned as shallow copies, so metrics can not modify stored data.
+    The data held in memory (i.e. not dask-backed) is bounded by a memory budget,
+    objects exceeding the budget are not stored
+    """
+
+    def __init__(self, max_bytes=0):
+        """
+        :param max_bytes: memory budget in bytes
+        """
+        self.enabled = False
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = {}
+
+    def __contains__(self, key):
+        return self.enabled and key in self._entries
+
+    @staticmethod
+    def _copy(data):
+        """ Shallow copy of xarray objects (also within tuples/dictionaries) """
+        if isinstance(data, dict):
+            return {k: SharedData._copy(v) for k, v in data.items()}
+        if isinstance(data, tuple):
+            return tuple(SharedData._copy(v) for v in data)
+        if isinstance(data, (xr.DataArray, xr.Dataset)):
+            return data.copy(deep=False)
+        return data
+
+    @staticmethod
+    def memory_bytes(data):
+        """
+        Size of the data held in memory (dask-backed xarray objects are not counted)
+        :param data: xarray object, dictionary or tuple of those
+        :return: size in bytes
+        """
+        if isinstance(data, dict):
+            return sum(SharedData.memory_bytes(v) for v in data.values())
+        if isinstance(data, tuple):
+            return sum(SharedData.memory_bytes(v) for v in data)
+        if isinstance(data, xr.DataArray):
+            return data.nbytes if data.chunks is None else 0
+        if isinstance(data, xr.Dataset):
+            return sum(SharedData.memory_bytes(v) for v in data.data_vars.values())
+        return 0
+
+    def fits(self, nbytes):
+        """
+        Check if data of size nbytes can be kept in memory within the budget
+        :param nbytes: size in bytes
+        :return: bool
+        """
+        return self.nbytes + nbytes <= self.max_bytes
+
+    def get(self, key):
+        """
+        Return stored object
+        :param key: hashable key
+        :return: shallow copy of stored object
+        """
+        return self._copy(self._entries[key])
+
+    def put(self, key, data, nbytes=None):
+        """
+        Store object if sharing is enabled and it fits into the memory budget
+        :param key: hashable key
+        :param data: xarray object, dictionary or tuple of those
+        :param nbytes: size held in memory (e.g. of persisted dask arrays), derived from data if None
+        """
+        if not self.enabled:
+            return
+        _nbytes = self.memory_bytes(data) if nbytes is None else nbytes
+        if not self.fits(_nbytes):
+            return
+        self._entries[key] = self._copy(data)
+        self.nbytes += _nbytes
+
+    def clear(self):
+        """ Remove all entries """
+        self._entries.clear()
+        self.nbytes = 0
+
+
+class RunningMean:
+    """
+    NaN-aware running mean of numpy arrays. Only the sum and the number of
+    valid values are kept, so arrays can be added one after the other.
+    Arrays may differ in the length of their dimensions (e.g. number of dates),
+    missing entries at the end are treated like NaN
+    """
+
+    def __init__(self):
+        self.sum = None
+        self.count = None
+        self.dtype = None
+
+    def add(self, values, axis=None):
+        """
+        Add array to running mean
+        :param values: numpy array
+        :param axis: axis of values which is summed before adding (e.g. member dimension)
+        """
+        values = np.asarray(values)
+        if self.dtype is None:
+            self.dtype = values.dtype if np.issubdtype(values.dtype, np.floating) else np.float64
+
+        _valid = ~np.isnan(values)
+        _sum = np.where(_valid, values, 0).astype(np.float64)
+        _count = _valid.astype(np.int32)
+        if axis is not None:
+            _sum = _sum.sum(axis=axis)
+            _count = _count.sum(axis=axis)
+
+        if self.sum is None:
+            self.sum = _sum
+            self.count = _count
+            return
+
+        if any(_n > _m for _n, _m in zip(_sum.shape, self.sum.shape)):
+            _pad = [(0, max(_n - _m, 0)) for _n, _m in zip(_sum.shape, self.sum.shape)]
+            self.sum = np.pad(self.sum, _pad)
+            self.count = np.pad(self.count, _pad)
+        _slice = tuple(slice(_n) for _n in _sum.shape)
+        self.sum[_slice] += _sum
+        self.count[_slice] += _count
+
+    def mean(self):
+        """
+        Return mean of all added arrays (NaN if no valid value was added)
+        :return: numpy array
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            _mean = np.where(self.count > 0, self.sum / self.count, np.nan)
+        return _mean.astype(self.dtype)
+
+
+class ScoreAccumulator:
+    """
+    Accumulate the sums needed for several scores in one pass over the (inidate, date)
+    slabs of forecast, observations and persistence. Each slab is read once, the
+    ensemble mean is computed once and all requested quantities are updated.
+    All averages over slabs are NaN-aware (as xarray mean with skipna).
+    Available quantities:
+      mean:  pooled mean of forecast (over members and slabs), observations and persistence
+      bias:  error of ensemble mean (and persistence)
+      se:    squared error of ensemble mean (and persistence)
+      var:   ensemble variance (ddof=0)
+      brier: squared error of the probability to exceed threshold (and persistence)
+      iiee:  integrated ice edge error, absolute extent error and misplacement error
+             of ensemble mean (and persistence) using area_sum for each slab
+    """
+    quantities = ['mean', 'bias', 'se', 'var', 'brier', 'iiee']
+
+    def __init__(self, scores, threshold=0.15, area_sum=None):
+        """
+        :param scores: list of quantities to accumulate
+        :param threshold: sea ice threshold used for brier and iiee
+        :param area_sum: function applied to a list of gridded xarray DataArrays
+        (over- and underestimation of each slab) returning a list of area sums (needed for iiee)
+        """
+        for _score in scores:
+            if _score not in self.quantities:
+                raise ValueError(f'Score quantity {_score} not known, must be one of {self.quantities}')
+        if 'iiee' in scores and area_sum is None:
+            raise ValueError('area_sum needs to be set to accumulate iiee')
+
+        self.scores = scores
+        self.threshold = threshold
+        self.area_sum = area_sum
+        self.template = None
+        self.template_area = None
+        self._means = collections.defaultdict(RunningMean)
+
+    def _exceeds(self, values):
+        """ Threshold exceedance (1/0) keeping NaN values """
+        return np.where(np.isnan(values), np.nan, values > self.threshold)
+
+    def add(self, da_fc, da_obs, da_pers=None):
+        """
+        Add one slab
+        :param da_fc: forecast xarray DataArray (member, time, ...)
+        :param da_obs: observation xarray DataArray (time, ...)
+        :param da_pers: persistence xarray DataArray (...) without time dimension or None
+        """
+        if self.template is None:
+            self.template = da_fc.isel(member=0, drop=True)
+            self.template = self.template.assign_coords({_name: _coord for _name, _coord in da_obs.coords.items()
+                                                         if _name not in self.template.coords})
+
+        _fc = da_fc.values
+        _obs = da_obs.values
+        _pers = da_pers.values if da_pers is not None else None
+
+        _valid = ~np.isnan(_fc)
+        _nvalid = _valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            _ensmean = np.where(_nvalid > 0, np.where(_valid, _fc, 0).sum(axis=0) / _nvalid, np.nan)
+        _ensmean = _ensmean.astype(np.result_type(_fc.dtype, np.float32))
+
+        if 'mean' in self.scores:
+            self._means['mean_fc'].add(_fc, axis=0)
+            self._means['mean_obs'].add(_obs)
+            if _pers is not None:
+                self._means['mean_pers'].add(_pers)
+
+        if 'bias' in self.scores:
+            self._means['bias_fc'].add(_ensmean - _obs)
+            if _pers is not None:
+                self._means['bias_pers'].add(_pers - _obs)
+
+        if 'se' in self.scores:
+            self._means['se_fc'].add((_ensmean - _obs) ** 2)
+            if _pers is not None:
+                self._means['se_pers'].add((_pers - _obs) ** 2)
+
+        if 'var' in self.scores:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                _var = np.where(_valid, (_fc - _ensmean) ** 2, 0).sum(axis=0) / _nvalid
+            self._means['var_fc'].add(np.where(_nvalid > 0, _var, np.nan))
+
+        if 'brier' in self.scores:
+            _obs_ice = self._exceeds(_obs)
+            _fc_ice = self._exceeds(_fc)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                _prob = np.where(_nvalid > 0, np.nansum(_fc_ice, axis=0) / _nvalid, np.nan)
+            self._means['brier_fc'].add((_prob - _obs_ice) ** 2)
+            if _pers is not None:
+                self._means['brier_pers'].add((self._exceeds(_pers) - _obs_ice) ** 2)
+
+        if 'iiee' in self.scores:
+            # grid cells without observations are counted as no ice
+            _obs_valid = ~np.isnan(_obs)
+            _obs_ice = _obs > self.threshold
+            _fields = {'fc': _obs_valid & (_ensmean > self.threshold)}
+            if _pers is not None:
+                _fields['pers'] = _obs_valid & (_pers > self.threshold)
+
+            _gridded = []
+            for _ice in _fields.values():
+                _gridded += [self.template.copy(data=(_ice & ~_obs_ice).astype(_obs.dtype)),
+                             self.template.copy(data=(~_ice & _obs_ice).astype(_obs.dtype))]
+            _area = self.area_sum(_gridded)
+            if self.template_area is None:
+                self.template_area = _area[0]
+
+            for _name, _over, _under in zip(_fields, _area[::2], _area[1::2]):
+                _over = _over.values
+                _under = _under.values
+                self._means[f'iiee_{_name}'].add(_over + _under)
+                self._means[f'aee_{_name}'].add(np.fabs(_over - _under))
+                self._means[f'me_{_name}'].add(2 * np.minimum(_over, _under))
+
+    def get(self, name):
+        """
+        Return average of accumulated quantity over all slabs
+        :param name: quantity and data, e.g. se_fc, brier_pers, mean_obs or iiee_fc
+        :return: xarray DataArray
+        """
+        _mean = self._means[name].mean()
+        if name.split('_')[0] in ['iiee', 'aee', 'me']:
+            return self.template_area.copy(data=_mean)
+        if _mean.ndim < self.template.ndim:
+            # persistence has no time dimension
+            return self.template.isel(time=0, drop=True).copy(data=_mean)
+        return self.template.copy(data=_mean)
+
+
+class RegionWeights:
+    """
+    Area statistics of several regions on one grid. The regions are combined with the
+    land-sea mask and the cell area into a sparse weight matrix (n_regions, n_ocean_cells),
+    so that mean and sum of all regions are computed with one sparse matrix product over
+    the flattened ocean cells (only cells within the regions are gathered from the data).
+    Missing values in the data are ignored
+    """
+
+    def __init__(self, region_masks, ds_mask, cell_area):
+        """
+        :param region_masks: boolean xarray DataArray with dimensions (region, yc, xc)
+        :param ds_mask: land-sea mask (1 for ocean, NaN for land) with dimensions (yc, xc)
+        :param cell_area: area of grid cells (scalar or array with dimensions (yc, xc))
+        """
+        _ocean = ~np.isnan(ds_mask.transpose('yc', 'xc').values)
+        _masks = region_masks.transpose('region', 'yc', 'xc').values
+        if _masks.shape[1:] != _ocean.shape:
+            raise ValueError('Region masks and land-sea mask are not on the same grid')
+
+        self.regions = region_masks['region'].values
+        self.ncells = _ocean.size
+        # only ocean cells within at least one region are gathered from the data
+        self.ocean_index = np.flatnonzero(_ocean & _masks.any(axis=0))
+        _area = np.broadcast_to(cell_area, _ocean.shape).ravel()[self.ocean_index]
+        _in_region = _masks.reshape(len(self.regions), -1)[:, self.ocean_index]
+        self.weights = sparse.csr_matrix(np.where(_in_region, _area, 0.))
+
+    def _select(self, regions):
+        """ Rows of the weight matrix for regions (all regions if None) """
+        if regions is None:
+            return np.arange(len(self.regions))
+        return np.asarray([np.flatnonzero(self.regions == _region)[0] for _region in regions])
+
+    def _reduce(self, values, statistic, rows):
+        """
+        Area statistic of numpy array with yc, xc as last two dimensions
+        :return: numpy array with region as last dimension
+        """
+        _shape = values.shape[:-2]
+        _values = values.reshape(-1, self.ncells)[:, self.ocean_index].astype(np.float64)
+        _valid = ~np.isnan(_values)
+        _weights = self.weights[rows]
+
+        if statistic == 'median':
+            _result = np.full((_values.shape[0], len(rows)), np.nan)
+            for _i, _row in enumerate(_weights):
+                if _row.indices.size > 0:
+                    _result[:, _i] = np.nanmedian(_values[:, _row.indices], axis=-1)
+        else:
+            # sums and (area weighted) number of valid values in one product
+            _sums = _weights @ np.concatenate([np.where(_valid, _values, 0), _valid], axis=0).T
+            _total, _count = np.split(_sums.T, 2, axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if statistic == 'mean':
+                    _result = _total / _count
+                else:
+                    _result = np.where(_count > 0, _total, np.nan)
+
+        return _result.reshape(_shape + (len(rows),))
+
+    def reduce(self, da, statistic='mean', regions=None):
+        """
+        Area weighted mean or area sum (or median over grid cells) for several regions
+        :param da: xarray DataArray with dimensions yc and xc
+        :param statistic: mean, sum or median
+        :param regions: list of regions (default are all regions)
+        :return: xarray DataArray with dimension region instead of yc and xc
+        """
+        if statistic not in ['mean', 'sum', 'median']:
+            raise ValueError(f'statistic can be either mean, sum or median not {statistic}')
+
+        _rows = self._select(regions)
+        # sums are weighted with the cell area
+        _dtype = np.result_type(da.dtype, self.weights.dtype if statistic == 'sum' else np.float32)
+        _da = xr.apply_ufunc(lambda _values: self._reduce(_values, statistic, _rows).astype(_dtype),
+                             da, input_core_dims=[['yc', 'xc']], output_core_dims=[['region']],
+                             dask='parallelized', output_dtypes=[_dtype],
+                             dask_gufunc_kwargs={'output_sizes': {'region': len(_rows)},
+                                                 'allow_rechunk': True})
+        _da = _da.assign_coords(region=self.regions[_rows])
+        return _da.drop_vars([_name for _name, _coord in _da.coords.items()
+                              if {'yc', 'xc'} & set(_coord.dims)])
+
+
+def skill_ratio(da_num, da_den):
+    """
+    Ratio of two scores. Zero values are set to 1e-11 to allow division
+    :param da_num: numerator xarray DataArray
+    :param da_den: denominator xarray DataArray
+    :return: xarray DataArray
+    """
+    return xr.where(da_num == 0, 1e-11, da_num) / xr.where(da_den == 0, 1e-11, da_den)
+
+
 def np_arange_include_upper(start, end, step):
     """
     Function calculating range of values including upper end
@@ -51,78 +490,379 @@ def score_averaging(data, temporal_average_timescale, temporal_average_value):
         data_out.append(_da_file)
 
     return data_out
-def xr_regression_vector(y):
+def linregress_nan(y, axis=-1):
+    """
+    Linear regression of y against 0, 1, ..., n-1 along one axis for all other entries
+    at once (closed-form least squares). NaN values are ignored, i.e. the result is the same
+    as scipy.stats.linregress applied to the valid values of each vector
+    :param y: numpy array
+    :param axis: axis along which regression is calculated
+    :return: slope, intercept, two-sided pvalue (t-distribution) and standard error of slope
+    """
+    tiny = 1.0e-20
+    y = np.moveaxis(np.asarray(y, dtype=np.float64), axis, -1)
+    valid = ~np.isnan(y)
+    x = np.arange(y.shape[-1], dtype=np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = valid.sum(axis=-1)
+        xmean = np.where(valid, x, 0).sum(axis=-1) / n
+        ymean = np.where(valid, y, 0).sum(axis=-1) / n
+        dx = np.where(valid, x - xmean[..., np.newaxis], 0)
+        dy = np.where(valid, y - ymean[..., np.newaxis], 0)
+        ssxm = (dx * dx).sum(axis=-1) / n
+        ssxym = (dx * dy).sum(axis=-1) / n
+        ssym = (dy * dy).sum(axis=-1) / n
+
+        r = np.clip(ssxym / np.sqrt(ssxm * ssym), -1, 1)
+        r = np.where((ssxm == 0) | (ssym == 0), np.where(ssxym == 0, np.nan, 0.), r)
+        slope = ssxym / ssxm
+        intercept = ymean - slope * xmean
+
+        df = n - 2
+        t = r * np.sqrt(df / ((1.0 - r + tiny) * (1.0 + r + tiny)))
+        pvalue = 2 * stats.t.sf(np.abs(t), df)
+        stderr = np.sqrt((1 - r ** 2) * ssym / ssxm / df)
+
+    # as in linregress two points are either a perfect fit or constant
+    pvalue = np.where(n == 2, np.where(ssym == 0, 1., 0.), pvalue)
+    stderr = np.where(n == 2, 0., stderr)
+
+    return slope, intercept, pvalue, stderr
+
+
+def compute_linreg(da):
+    """
+    Compute linear regression along date
+    :param da: input sic dataset
+    :return: linear regression slope, intercept and pvalue as dataarrays
+    """
+
+    def _linreg(y):
+        slope, intercept, pvalue, _ = linregress_nan(y)
+        return slope.astype(y.dtype), intercept.astype(y.dtype), pvalue.astype(y.dtype)
+
+    if da.chunks is not None:
+        da = da.chunk({'date': -1})
+
+    da_slope, da_intercept, da_pvalue = xr.apply_ufunc(_linreg, da,
+                                                       input_core_dims=[['date']],
+                                                       output_core_dims=[[], [], []],
+                                                       dask='parallelized',
+                                                       output_dtypes=[da.dtype] * 3)
+
+    # cells without variation (no ice/ice for every year) have no trend
+    da_std = da.std(dim='date')
+    da_slope = xr.where(da_std == 0, 0, da_slope)
+    da_intercept = xr.where(da_std == 0, 1, da_intercept)
+    da_pvalue = xr.where(da_std == 0, 1, da_pvalue)
+
+    return da_slope, da_intercept, da_pvalue
+
+
+def calibration_statistics(da_fc, da_obs):
+    """
+    Sufficient statistics of the mean calibration, i.e. sums and number of valid values
+    of the ensemble mean forecast and the observations over all start dates (inidate/date).
+    Statistics of disjoint sets of start dates can be added
+    :param da_fc: calibration forecast data
+    :param da_obs: calibration observation data
+    :return: xarray Dataset with fc_sum, fc_count, obs_sum and obs_count
+    """
+    # mask all occasions where no observations exist
+    da_fc = da_fc.where(~np.isnan(da_obs))
+
+    ds_stats = xr.Dataset()
+    for _name, _da in [('fc', da_fc), ('obs', da_obs)]:
+        if 'member' in _da.dims:
+            _da = _da.mean(dim='member')
+        _dims = [_dim for _dim in ['inidate', 'date'] if _dim in _da.dims]
+        _da = _da.astype(np.float64)
+        ds_stats[f'{_name}_sum'] = _da.sum(dim=_dims)
+        ds_stats[f'{_name}_count'] = _da.count(dim=_dims)
+    return ds_stats
+
+
+def trend_statistics(da_bias, years):
+    """
+    Sufficient statistics (moments) of the linear regression of the bias against the year.
+    Statistics of disjoint sets of years can be added
+    :param da_bias: bias with dimension date
+    :param years: year of each date
+    :return: xarray Dataset with n, x_sum, xx_sum, y_sum, xy_sum and yy_sum
+    """
+    da_y = da_bias.astype(np.float64)
+    da_valid = da_y.notnull()
+    da_x = xr.DataArray(np.asarray(years, dtype=np.float64), dims='date',
+                        coords={'date': da_bias['date']}).where(da_valid)
+
+    return xr.Dataset({'n': da_valid.sum(dim='date'),
+                       'x_sum': da_x.sum(dim='date'),
+                       'xx_sum': (da_x * da_x).sum(dim='date'),
+                       'y_sum': da_y.sum(dim='date'),
+                       'xy_sum': (da_x * da_y).sum(dim='date'),
+                       'yy_sum': (da_y * da_y).sum(dim='date')})
+
+
+def calibration_correction(ds_stats, method):
+    """
+    Correction subtracted from the forecast for calibration methods mean and anom
+    :param ds_stats: statistics created with calibration_statistics
+    :param method: mean or anom
+    :return: xarray DataArray
+    """
+    correction = ds_stats['fc_sum'] / ds_stats['fc_count']
+    if method == 'mean':
+        correction = correction - ds_stats['obs_sum'] / ds_stats['obs_count']
+    return correction
+
+
+def linreg_from_statistics(ds_stats):
+    """
+    Slope and intercept of linear regression computed from the moments created with
+    trend_statistics. Cells without variation have no trend (as in compute_linreg)
+    :param ds_stats: statistics created with trend_statistics
+    :return: linear regression slope and intercept as dataarrays
+    """
+    da_n = ds_stats['n']
+    da_sxx = ds_stats['xx_sum'] - ds_stats['x_sum'] ** 2 / da_n
+    da_sxy = ds_stats['xy_sum'] - ds_stats['x_sum'] * ds_stats['y_sum'] / da_n
+    da_syy = ds_stats['yy_sum'] - ds_stats['y_sum'] ** 2 / da_n
+
+    da_slope = da_sxy / da_sxx
+    da_intercept = (ds_stats['y_sum'] - da_slope * ds_stats['x_sum']) / da_n
+
+    # the variance is computed from the moments, so constant values are detected up to rounding
+    da_constant = da_syy <= 1e-10 * ds_stats['yy_sum']
+    da_slope = xr.where(da_constant, 0, da_slope)
+    da_intercept = xr.where(da_constant, 1, da_intercept)
+
+    return da_slope, da_intercept
+
+
+def merge_calibration_statistics(datasets):
+    """
+    Merge statistics of disjoint sets of start dates (all variables are sums).
+    All statistics need to be given for the same lead times and grid cells
+    :param datasets: list of xarray Datasets created with calibration_statistics/trend_statistics
+    :return: xarray Dataset
+    """
+    try:
+        datasets = xr.align(*datasets, join='exact')
+    except ValueError as err:
+        raise ValueError('Calibration statistics to be merged have different lead times '
+                         'or grids') from err
+
+    ds_stats = datasets[0]
+    for _ds in datasets[1:]:
+        ds_stats = ds_stats + _ds
+    return ds_stats
+
+
+def remove_small_clusters(array, min_size):
     """
-    Derive linear regression slope and pvalue for a single vector and return as DataArray
-    :param y: xr/np vector to calculate regression slope/pvalue for
-    :return: slope/pvalue as xr DataArray
+    Remove clusters (connected non-zero grid cells, without diagonal neighbours) with less
+    than min_size grid cells from a stack of fields. All fields are labelled at once,
+    the stacked (leading) dimensions do not connect grid cells
+    :param array: numpy array with yc and xc as last two dimensions
+    :param min_size: minimum number of grid cells of a cluster
+    :return: array of same shape and dtype with 1 for grid cells of the remaining clusters else 0
     """
+    fields = np.asarray(array).reshape((-1,) + np.shape(array)[-2:])
+
+    structure = np.zeros((3, 3, 3), dtype=bool)
+    structure[1] = ndimage.generate_binary_structure(2, 1)
+    labelling, _ = ndimage.label(fields, structure=structure)
+
+    cluster_size = np.bincount(labelling.ravel())
+    keep = cluster_size >= min_size
+    keep[0] = False
+
+    return keep[labelling].reshape(np.shape(array)).astype(np.asarray(array).dtype)
+
 
-    x = np.arange(len(y))
-    mask = ~np.isnan(y)
-    if mask.sum() >0:
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x[mask], y[mask])
+def _ice_event_statistics_numpy(values, end_window):
+    """
+    Statistics along the last axis needed for freeze-up/break-up dates (NumPy version).
+    Ice is any valid value != 0
+    :param values: numpy array with time as last dimension
+    :param end_window: number of time steps at the end used for end_ice
+    :return: tuple of first/last time step with ice and booleans all_nan, always_water (max == 0),
+    always_ice (min == 1), initial_ice (first value == 1), end_ice (ice within end_window)
+    """
+    valid = ~np.isnan(values)
+    ice = valid & (values != 0)
+    first = ice.argmax(axis=-1)
+    last = values.shape[-1] - 1 - ice[..., ::-1].argmax(axis=-1)
+    all_nan = ~valid.any(axis=-1)
+    always_water = ~all_nan & (np.where(valid, values, -np.inf).max(axis=-1) == 0)
+    always_ice = ~all_nan & (np.where(valid, values, np.inf).min(axis=-1) == 1)
+    initial_ice = values[..., 0] == 1
+    end_ice = ice[..., -end_window:].any(axis=-1)
+    return first, last, all_nan, always_water, always_ice, initial_ice, end_ice
+
+
+def _ice_event_statistics_loop(values, end_window):
+    """ Same as _ice_event_statistics_numpy for 2-d arrays, with one loop over time per cell (compiled with numba) """
+    ncells, ntime = values.shape
+    first = np.zeros(ncells, dtype=np.int64)
+    last = np.full(ncells, ntime - 1, dtype=np.int64)
+    all_nan = np.ones(ncells, dtype=np.bool_)
+    always_water = np.zeros(ncells, dtype=np.bool_)
+    always_ice = np.zeros(ncells, dtype=np.bool_)
+    initial_ice = np.zeros(ncells, dtype=np.bool_)
+    end_ice = np.zeros(ncells, dtype=np.bool_)
+    for ci in range(ncells):
+        found = False
+        vmax = -np.inf
+        vmin = np.inf
+        for ti in range(ntime):
+            value = values[ci, ti]
+            if np.isnan(value):
+                continue
+            all_nan[ci] = False
+            vmax = max(vmax, value)
+            vmin = min(vmin, value)
+            if value != 0:
+                if not found:
+                    first[ci] = ti
+                    found = True
+                last[ci] = ti
+                if ti >= ntime - end_window:
+                    end_ice[ci] = True
+        always_water[ci] = vmax == 0
+        always_ice[ci] = vmin == 1
+        initial_ice[ci] = values[ci, 0] == 1
+    return first, last, all_nan, always_water, always_ice, initial_ice, end_ice
+
+
+if numba is not None:
+    _ice_event_statistics_loop = numba.njit(cache=True)(_ice_event_statistics_loop)
+
+
+def _ice_event_dates(values, event, end_window):
+    """
+    Day of freeze-up/break-up and masks (see ice_event_dates) for numpy arrays
+    :param values: numpy array with time as last dimension
+    :param event: 'freeze_up' or 'break_up'
+    :param end_window: number of time steps at the end which need to be ice free for break-up
+    :return: day, mask_water and mask_ice as numpy arrays
+    """
+    if numba is not None:
+        _values = np.ascontiguousarray(values.reshape(-1, values.shape[-1]), dtype=np.float64)
+        stats_list = [v.reshape(values.shape[:-1])
+                      for v in _ice_event_statistics_loop(_values, end_window)]
     else:
-        slope = intercept = r_value = p_value = np.nan
+        stats_list = _ice_event_statistics_numpy(values, end_window)
+    first, last, all_nan, always_water, always_ice, initial_ice, end_ice = stats_list
+
+    mask_water = np.where(always_water, np.nan, 1.)
+    if event == 'freeze_up':
+        # first day with ice (day 0 if all values are missing)
+        mask_ice = np.where(initial_ice, np.nan, 1.)
+        day = np.where(all_nan, 0, first)
+        day = np.where(initial_ice, 0, day)
+        day = np.where(always_water, 180, day)
+    elif event == 'break_up':
+        # day after last day with ice
+        mask_ice = np.where(always_ice | end_ice, np.nan, 1.)
+        day = np.where(all_nan, values.shape[-1], last + 1)
+        day = np.where(always_ice | end_ice, 180, day)
+        day = np.where(always_water, 0, day)
+    else:
+        raise ValueError(f'Event {event} not supported')
 
-    data_xr = xr.DataArray([slope, intercept, p_value], dims=['slope/intercept/pvalue'])
-    return data_xr
+    return day.astype(np.int64), mask_water, mask_ice
 
 
-def xr_regression_3d(ds):
+def ice_event_dates(da, event, end_window=7):
     """
-    Apply linear regression to each grid cell and timestep
-    :param ds: xr DataArray with sic data
-    :return: DataArray with linear regression slope and pvalue
+    Calculate freeze-up (first day with ice) or break-up dates (day after last day with ice)
+    for each grid cell in one pass along time. Data are usually already set to 1/0 using a threshold.
+    Cells which are always water are set to 180 (freeze-up) or 0 (break-up), cells which are ice at
+    the first day (freeze-up) or always ice or ice within the last end_window days (break-up)
+    are set to 0 (freeze-up) or 180 (break-up)
+    :param da: xr DataArray with sea ice data exceeding threshold (1 ice, 0 water) and dimension time
+    :param event: 'freeze_up' or 'break_up'
+    :param end_window: number of days at the end which need to be ice free for break-up
+    :return: day of event, mask of members having always water and mask of members
+    having always ice (both nan for these members, else 1)
     """
+    if da.chunks is not None:
+        da = da.chunk({'time': -1})
 
-    ds_out = xr.apply_ufunc(xr_regression_vector,
-                            ds.chunk(dict(date=-1)),
-                            exclude_dims=set(('date',)),
-                            input_core_dims=[["date"]],
-                            output_core_dims=[['slope_intercept_pvalue']],
-                            vectorize=True,
-                            dask="parallelized",
-                            output_dtypes=[ds.dtype],
-                            dask_gufunc_kwargs={'output_sizes':{"slope_intercept_pvalue": 3}}
-                            )
+    da_day, mask_water, mask_ice = xr.apply_ufunc(_ice_event_dates, da,
+                                                  kwargs={'event': event, 'end_window': end_window},
+                                                  input_core_dims=[['time']],
+                                                  output_core_dims=[[], [], []],
+                                                  dask='parallelized',
+                                                  output_dtypes=[np.int64, np.float64, np.float64],
+                                                  keep_attrs=False)
 
+    return da_day.assign_attrs(da.attrs), mask_water, mask_ice
 
-    return ds_out
 
-def compute_linreg(da):
+def nanquantiles(values, q, axis=-1):
     """
-    Compute linear regression
-    :param da: input sic dataset
-    :return: linear regression slope and pvalue as dataarrays
+    Several quantiles along one axis ignoring NaN values. All quantiles are derived from
+    one np.partition per group of cells with the same number of valid values. The result is
+    the same as np.nanquantile with linear interpolation
+    :param values: numpy array
+    :param q: list of quantiles (between 0 and 1)
+    :param axis: axis along which quantiles are calculated
+    :return: numpy array with quantiles as first dimension followed by the remaining dimensions
     """
+    values = np.moveaxis(np.asarray(values, dtype=np.float64), axis, -1)
+    q = np.asarray(q, dtype=np.float64)
 
-    # computation is very slow as there are many grid cells/timesteps
-    # to make the computation faster we do the following
-    # 1. stack array along xc and yc
-    # 2. drop all cells for which standard deviation is 0 (no ice/ice for every year)
-    # 3. calculate linear regression
-    # 4. merge output from 3 with dummy dataset to get dropped grid cells back
-    # 5. split slope/pvalue to different xr DataArrays
+    nvalid = (~np.isnan(values)).sum(axis=-1)
+    out = np.full((len(q),) + values.shape[:-1], np.nan)
+    for n in np.unique(nvalid):
+        if n == 0:
+            continue
+        cells = nvalid == n
 
-    # with dask.config.set(**{'array.slicing.split_large_chunks': True}):
-    da_std = da.std(dim='date')
-    da_tmp = xr.where(da_std == 0, np.nan, da)
-    da_stack = da_tmp.stack(z=("yc", "xc"))
-    da_stack_miss = da_stack.dropna(dim='z', how='all')
+        # indices of the sorted values next to the quantiles (NaN values are sorted to the end)
+        virtual_index = (n - 1) * q
+        previous_index = np.minimum(np.floor(virtual_index).astype(int), n - 1)
+        next_index = np.minimum(previous_index + 1, n - 1)
+        gamma = virtual_index - np.floor(virtual_index)
+
+        sample = np.partition(values[cells], np.union1d(previous_index, next_index), axis=-1)
+        lower, upper = sample[:, previous_index], sample[:, next_index]
+
+        # linear interpolation as in numpy
+        diff = upper - lower
+        out[:, cells] = np.where(gamma >= 0.5, upper - diff * (1 - gamma), lower + diff * gamma).T
+    return out
 
-    da_linreg_stack = xr_regression_3d(da_stack_miss)
 
-    da_linreg = (xr.merge([xr.zeros_like(da_stack).rename('dummy'),
-                                         da_linreg_stack.rename('linreg')])).unstack()
-    da_linreg = da_linreg['linreg']
+def quantiles(da, q, dim):
+    """
+    Several quantiles of xarray DataArray computed at once (see nanquantiles)
+    :param da: xr DataArray
+    :param q: list of quantiles (between 0 and 1)
+    :param dim: dimension or tuple of dimensions over which quantiles are calculated
+    :return: xr DataArray with new first dimension quantile
+    """
+    dims = [dim] if isinstance(dim, str) else list(dim)
+    if da.chunks is not None:
+        da = da.chunk({_dim: -1 for _dim in dims})
 
-    da_slope = xr.where(da_std == 0, 0, da_linreg.isel(slope_intercept_pvalue=0))
-    da_intercept = xr.where(da_std == 0, 1, da_linreg.isel(slope_intercept_pvalue=1))
-    da_pvalue = xr.where(da_std == 0, 1, da_linreg.isel(slope_intercept_pvalue=2))
+    def _quantiles(values):
+        values = values.reshape(values.shape[:-len(dims)] + (-1,))
+        return np.moveaxis(nanquantiles(values, q), 0, -1)
+
+    da_quantiles = xr.apply_ufunc(_quantiles, da,
+                                  input_core_dims=[dims],
+                                  output_core_dims=[['quantile']],
+                                  dask='parallelized',
+                                  output_dtypes=[np.float64],
+                                  dask_gufunc_kwargs={'output_sizes': {'quantile': len(q)}})
+
+    return da_quantiles.assign_coords(quantile=list(q)).transpose('quantile', ...)
 
 
-    return da_slope, da_intercept, da_pvalue
 def create_combined_mask(_ds_verif, _ds_fc):
     """
     Create a mask for cells which are set to NaN in verification or forecast data
@@ -153,17 +893,17 @@ def create_combined_mask(_ds_verif, _ds_fc):
 
     return combined_mask
 
-def area_cut(ds, lon1, lon2, lat1, lat2):
+def region_box_mask(ds, lon1, lon2, lat1, lat2):
     """
-    Set values outside lon/lat regions specified here to NaN values
-    :param ds: input xarray DataArray
+    Boolean mask of grid cells within lon/lat region (boxes crossing the dateline are
+    given with lon1 > lon2)
+    :param ds: xarray object with longitude/latitude (or lon/lat) coordinates
     :param lon1: east longitude
     :param lon2: west longitude
     :param lat1: south latitude
     :param lat2: north latitude
-    :return: maksed dataArray
+    :return: boolean xarray DataArray with dimensions of the coordinates
     """
-
     if 'longitude' in ds.coords:
         lon_name = 'longitude'
         lat_name = 'latitude'
@@ -171,20 +911,13 @@ def area_cut(ds, lon1, lon2, lat1, lat2):
         lon_name = 'lon'
         lat_name = 'lat'
 
+    _lon = ds[lon_name]
+    _lat = ds[lat_name]
     if lon1 > lon2:
-        data_masked1 = ds.where((ds[lat_name] > lat1) & (ds[lat_name] <= lat2)
-                                & (ds[lon_name] > lon1) & (ds[lon_name] < 180))
-        data_masked2 = ds.where((ds[lat_name] > lat1) & (ds[lat_name] <= lat2)
-                                & (ds[lon_name] >= -180) & (ds[lon_name] < lon2))
+        return (_lat > lat1) & (_lat <= lat2) & (((_lon > lon1) & (_lon < 180)) |
+                                                 ((_lon >= -180) & (_lon < lon2)))
+    return (_lat >= lat1) & (_lat <= lat2) & (_lon >= lon1) & (_lon <= lon2)
 
-        combined_mask = np.logical_or(~np.isnan(data_masked1), ~np.isnan(data_masked2))
-        _data = xr.where(combined_mask, ds, float('nan'))
-    else:
-        _data = ds.where((ds[lat_name] >= lat1) & (ds[lat_name] <= lat2)
-                         & (ds[lon_name] >= lon1) & (ds[lon_name] <= lon2))
-
-
-    return _data
 
 def get_nsidc_region(ds, name):
     """
@@ -197,15 +930,27 @@ def get_nsidc_region(ds, name):
     region_short_names = np.asarray(ds.attrs['flag_meanings_short'])
     region_number = np.asarray(ds.attrs['flag_values'])
     if name in region_full_names:
-        return int(region_number[region_full_names==name])
+        return int(region_number[region_full_names==name][0])
     elif name.upper() in region_short_names:
-        return int(region_number[region_short_names==name.upper()])
+        return int(region_number[region_short_names==name.upper()][0])
     else:
         raise NotImplementedError
 
+def detect_edge_cells(ice):
+    """
+    Detect ice edge for all fields at once. Edge grid cells are defined as those with ice
+    and with one of the four surrounding cells with no ice (boundary rows/columns are excluded)
+    :param ice: boolean array with yc and xc as last dimensions
+    :return: boolean array (without boundary rows/columns)
+    """
+    center = ice[..., 1:-1, 1:-1]
+    neighbours_ice = (ice[..., 1:-1, :-2] & ice[..., 1:-1, 2:] &
+                      ice[..., :-2, 1:-1] & ice[..., 2:, 1:-1])
+    return center & ~neighbours_ice
+
 def detect_edge(ds, threshold=0.15):
     """
-    Detect ice edge in xarray DataArray
+    Detect ice edge in xarray DataArray (for all fields, i.e. all dimensions except yc/xc)
     :param ds: xr DataArray containing sea ice data
     :param threshold: sea ice threshold for which sic is set to 1 (set to None is already calculated before)
     :return: xr DataArray with position of sea ice edge
@@ -214,45 +959,18 @@ def detect_edge(ds, threshold=0.15):
         ds_bool = ds
     else:
         ds_bool = xr.where(ds > threshold, 1, 0)
+    ds_bool = ds_bool.transpose(..., 'yc', 'xc')
 
-
-    for dim in ('inidate', 'date', 'member','time'):
-        if dim not in ds_bool.dims:
-            ds_bool = ds_bool.expand_dims(dim)
-
-
-
-    ds_center = ds_bool.isel(xc=slice(1, -1), yc=slice(1, -1))
-    ds_left_center = ds_bool.isel(xc=slice(None, -2), yc=slice(1, -1))
-    ds_right_center = ds_bool.isel(xc=slice(2, None), yc=slice(1, -1))
-    ds_up_center = ds_bool.isel(xc=slice(1, -1), yc=slice(None, -2))
-    ds_down_center = ds_bool.isel(xc=slice(1, -1), yc=slice(2, None))
-
-    # create stacked shifted grids
-    ds_merged = np.stack((ds_left_center.values,
-                          ds_right_center.values,
-                          ds_up_center.values,
-                          ds_down_center.values), axis=0)
-
-    # calculate minimum over shifted grids
-    ds_merged_min = ds_merged.min(axis=0)
-
-    # edge grid cells are define as those with ice
-    # and with one surrounding cell with no ice
-
-    # set nan values (land) to zero to detect sea ice edge around land
-    ds_merged_min = xr.where(np.isnan(ds_merged_min),0,ds_merged_min)
-
-    edge_arr = np.logical_and(ds_merged_min == 0, ds_center > 0)
-    ds_bool_np = np.zeros(ds_bool.shape)
-    ds_bool_np[:,:,:,:, 1:-1, 1:-1] = edge_arr
-    ds_edge = ds_bool.copy(deep=True, data=ds_bool_np)
+    # nan values (land) are treated as no ice to detect sea ice edge around land
+    edge_arr = np.zeros(ds_bool.shape)
+    edge_arr[..., 1:-1, 1:-1] = detect_edge_cells(ds_bool.values > 0)
+    ds_edge = ds_bool.copy(deep=True, data=edge_arr)
 
     return ds_edge
 
 def detect_extended_edge(ds_edge, max_extent=200):
     """
-    Detect extended sea ice edge (all grid cells with distance <= max_extent
+    Detect extended sea ice edge (all grid cells with distance <= max_extent to the edge)
     :param ds_edge: sea ice edge xr DataArray object
     :param max_extent: maximum extent in km
     :return: xr DataArray with position of extended sea ice edge
@@ -261,39 +979,30 @@ def detect_extended_edge(ds_edge, max_extent=200):
     utils.print_info('Extended Edge detection algorithm')
 
     # use grid spacing to derive number of cells using max_extent
-    dx = np.diff(ds_edge.xc)[0]/1000
+    dx = np.abs(np.diff(ds_edge.xc)[0])/1000
     cells_add = np.round((max_extent / dx)).astype(int)
 
+    ds_edge = ds_edge.transpose(..., 'yc', 'xc')
+    edge = ds_edge.values.reshape((-1,) + ds_edge.shape[-2:]) > 0
 
-    ds_new = ds_edge.values.copy()
-
-    for xi in np.arange(-cells_add, cells_add + 1):
-        for yi in np.arange(-cells_add, cells_add + 1):
-
-            ds_tmp = np.zeros(ds_edge.shape)
-            # derive distance and check it's not larger than cells_add
-            if np.sqrt(np.abs(xi) ** 2 + np.abs(yi) ** 2) <= cells_add:
-                if xi > 0 and yi > 0:
-                    ds_tmp[:,:,:,:, :-yi, :-xi] = ds_edge.isel(xc=slice(xi, None), yc=slice(yi, None)).values
-                elif xi > 0 and yi < 0:
-                    ds_tmp[:,:,:,:, np.abs(yi):, :-xi] = ds_edge.isel(xc=slice(xi, None), yc=slice(None, yi)).values
-                elif xi < 0 and yi < 0:
-                    ds_tmp[:,:,:,:, np.abs(yi):, np.abs(xi):] = ds_edge.isel(xc=slice(None, xi), yc=slice(None, yi)).values
-                elif xi < 0 and yi > 0:
-                    ds_tmp[:,:,:,:, :-yi, np.abs(xi):] = ds_edge.isel(xc=slice(None, xi), yc=slice(yi, None)).values
+    # distance (in grid cells) of each cell to the closest edge cell of the same field. Fields are
+    # stacked along the first axis with a spacing larger than any distance within a field
+    ext_edge = np.zeros(edge.shape, dtype=bool)
+    if edge.any():
+        field_spacing = max(sum(edge.shape[1:]), cells_add + 1)
+        distance = ndimage.distance_transform_edt(~edge, sampling=(field_spacing, 1, 1))
+        ext_edge = distance <= cells_add
 
-                elif xi == 0 and yi > 0:
-                    ds_tmp[:,:,:,:, :-yi, :] = ds_edge.isel(yc=slice(yi, None)).values
-                elif xi == 0 and yi < 0:
-                    ds_tmp[:,:,:,:, np.abs(yi):, :] = ds_edge.isel(yc=slice(None, yi)).values
-                elif yi == 0 and xi > 0:
-                    ds_tmp[:,:,:,:, :, :-xi] = ds_edge.isel(xc=slice(xi, None)).values
-                elif yi == 0 and xi < 0:
-                    ds_tmp[:,:,:,:, :, np.abs(xi):] = ds_edge.isel(xc=slice(None, xi)).values
-
-                ds_new = ds_new + ds_tmp
-
-    ds_extended_edge = ds_edge.copy(deep=True, data=ds_new)
-    ds_extended_edge = xr.where(ds_extended_edge > 0, 1, 0)
+    ds_extended_edge = ds_edge.copy(deep=True, data=ext_edge.reshape(ds_edge.shape).astype(int))
 
     return ds_extended_edge
+
+def edge_band_mask(ds, threshold=0.15, max_extent=200):
+    """
+    Mask of all grid cells close to the sea ice edge (extended ice edge)
+    :param ds: xr DataArray containing sea ice data
+    :param threshold: sea ice threshold for ice edge detection (None if ds is already 1/0)
+    :param max_extent: maximum distance to the ice edge in km
+    :return: boolean xr DataArray (True within max_extent of the ice edge)
+    """
+    return detect_extended_edge(detect_edge(ds, threshold=threshold), max_extent=max_extent) == 1
@@ -34,22 +34,10 @@ class Metric(BaseMetric):
         processed_data_dict = self.process_data_for_metric(average_dims, persistence, sice_threshold)
 
 
-        if self.calib:
-            da_fc_verif = processed_data_dict['da_fc_verif_bc'].mean(dim='member')
-        else:
-            da_fc_verif = processed_data_dict['da_fc_verif'].mean(dim='member')
-
-        da_verdata_verif = processed_data_dict['da_verdata_verif'].mean(dim='member')
-
-        da_rmse = np.sqrt(((da_fc_verif - da_verdata_verif) ** 2).mean(dim=('inidate', 'date')))
-
-        data = [da_rmse]
-
-
-        da_persistence = processed_data_dict['da_verdata_persistence']
-
-        da_pers_rmse = np.sqrt(((da_persistence - da_verdata_verif) ** 2).mean(dim=('inidate', 'date')))
-        data.append(da_pers_rmse)
+        acc = self.accumulate_scores(processed_data_dict, ['se'])
+        da_rmse = np.sqrt(acc.get('se_fc'))
+        da_pers_rmse = np.sqrt(acc.get('se_pers'))
+        data = [da_rmse, da_pers_rmse]
 
 
         if self.area_statistic_kind == 'score':
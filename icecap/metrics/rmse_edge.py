@@ -0,0 +1,9 @@
+""" Metric calculating RMSE close to the sea ice edge """
+from . import rmse
+
+
+class Metric(rmse.Metric):
+    """ Metric object (data restricted to extended ice edge of observations in process_data_for_metric) """
+    def __init__(self, name, conf):
+        super().__init__(name, conf)
+        self.plottext = 'close to ice edge'
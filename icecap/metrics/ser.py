@@ -4,6 +4,7 @@ import numpy as np
 import xarray as xr
 import matplotlib.colors as mcolors
 import utils
+import metrics.metric_utils as mutils
 from .metric import BaseMetric
 
 
@@ -38,31 +39,15 @@ class Metric(BaseMetric):
 
         processed_data_dict = self.process_data_for_metric(average_dims, persistence)
 
-        if self.calib:
-            da_fc_verif = processed_data_dict['da_fc_verif_bc']
-        else:
-            da_fc_verif = processed_data_dict['da_fc_verif']
-
-        da_verdata_verif = processed_data_dict['da_verdata_verif'].isel(member=0)
-
-        da_rmse = np.sqrt(((da_fc_verif.mean(dim='member') - da_verdata_verif) ** 2).mean(dim=('inidate', 'date')))
-        da_spread = np.sqrt(da_fc_verif.var(dim='member').mean(dim=('inidate', 'date')))
+        acc = self.accumulate_scores(processed_data_dict, ['se', 'var'])
+        da_rmse = np.sqrt(acc.get('se_fc'))
+        da_spread = np.sqrt(acc.get('var_fc'))
 
         # scaling of spread and error w.r.t. ensemble size
         da_spread = da_spread * np.sqrt(int(self.verif_enssize[0]) / (int(self.verif_enssize[0]) - 1))
         da_rmse = da_rmse * np.sqrt(int(self.verif_enssize[0]) / (int(self.verif_enssize[0]) + 1))
 
-        # set zero values to 1e-11 to avoid division by 0
-        da_rmse = xr.where(da_rmse == 0, 1e-11, da_rmse)
-        da_spread = xr.where(da_spread == 0, 1e-11, da_spread)
-
-
-
-        da_ser = da_spread / da_rmse
-
-        # restore zero values before saving
-        da_rmse = xr.where(da_rmse == 1e-11, 0, da_rmse)
-        da_spread = xr.where(da_spread == 1e-11, 0, da_spread)
+        da_ser = mutils.skill_ratio(da_spread, da_rmse)
 
         if self.area_statistic_kind == 'score':
             data, lsm = self.calc_area_statistics([da_rmse, da_spread, da_ser],
@@ -35,17 +35,9 @@ class Metric(BaseMetric):
                                                            sice_threshold)
 
 
-        if self.calib:
-            da_fc_verif= processed_data_dict['da_fc_verif_bc'].mean(dim='member')
-        else:
-            da_fc_verif = processed_data_dict['da_fc_verif'].mean(dim='member')
-
-        da_persistence = processed_data_dict['da_verdata_persistence']
-        da_verdata_verif = processed_data_dict['da_verdata_verif'].isel(member=0)
-
-
-        da_mse = ((da_verdata_verif - da_fc_verif) ** 2).mean(dim=('inidate', 'date'))
-        da_mse_pers = ((da_verdata_verif - da_persistence) ** 2).mean(dim=('inidate', 'date'))
+        acc = self.accumulate_scores(processed_data_dict, ['brier'])
+        da_mse = acc.get('brier_fc')
+        da_mse_pers = acc.get('brier_pers')
         data, lsm = self.calc_area_statistics([da_mse, da_mse_pers], processed_data_dict['lsm_full'],
                                               statistic='sum')
 
@@ -55,6 +55,27 @@ config_optnames = {
             'printname': 'directory of preexisting calibration files',
             'optional' : True,
         },
+        'obs_cache_memory':{
+            'printname': 'memory budget of in-process cache for observations (e.g. 2GB, 0 to disable)',
+            'optional' : True,
+            'default_value' : ["2GB"],
+        },
+        'shared_data_memory':{
+            'printname': 'memory budget of data shared between plotids plotted in one process (e.g. 2GB)',
+            'optional' : True,
+            'default_value' : ["2GB"],
+        },
+        'read_workers':{
+            'printname': 'number of threads used to read cache files when computing metrics',
+            'optional' : True,
+            'default_value' : ["1"],
+        },
+        'processed_cache':{
+            'printname' : 'keep processed (masked/calibrated) data in metricdir for later plots',
+            'optional' : True,
+            'default_value' : ["no"],
+            'allowed_values' : ["yes", "no"]
+        },
     }, # end environment
     'ecflow': {
         'ecfhomeroot': {
@@ -91,6 +112,23 @@ config_optnames = {
             'optional' : True,
             'default_value' : ["no"],
             'allowed_values' : ["yes", "no"]
+        },
+        'cache_layout' : {
+            'printname' : 'layout of forecast cache files (one file per member or one file per start date)',
+            'optional' : True,
+            'default_value' : ["member"],
+            'allowed_values' : ["member", "ensemble", "zarr"]
+        },
+        'download_workers' : {
+            'printname' : 'number of verification data files downloaded at the same time',
+            'optional' : True,
+            'default_value' : ["4"],
+        },
+        # no default_value as values containing ':' are interpreted as dependencies
+        # on other entries (the default server is set in verdata.py)
+        'verdata_server' : {
+            'printname' : 'root URL of the THREDDS file server providing the verification data',
+            'optional' : True,
         }
     }, # end staging
     'fc' : {
@@ -325,6 +363,11 @@ config_optnames = {
             'optional' : True,
             'allowed_values' : ["yes", "no"],
         },
+        'calib_update': {
+            'printname':'Reuse statistics of existing calibration files and only load remaining dates',
+            'optional' : True,
+            'allowed_values' : ["yes", "no"],
+        },
         'copy_id' : {
             'printname':'Copy config from different plotset',
             'optional' : True
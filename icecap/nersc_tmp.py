@@ -42,6 +42,9 @@ class NerscData(dataobjects.ForecastObject):
 
 
     def make_filelist(self):
+        if self.cache_layout != 'member':
+            return [self._save_filename_ensemble(self.startdate, self.grid)]
+
         filename = self._filenaming_convention('fc')
 
         files = [filename.format(self.startdate, member, self.params, self.grid)
@@ -55,37 +58,61 @@ class NerscData(dataobjects.ForecastObject):
         startdatedt = utils.string_to_datetime(self.startdate)
         startdatestring = utils.datetime_to_string(startdatedt,'%Y-%m-%d')
 
-        for member in range(self.enssize):
-
-            ofile = self._save_filename(date=self.startdate, number=member, grid=self.grid)
-
-            if ofile in self.files_to_retrieve:
-
-                file_tmp = self.root_server+self.fileformat.format(startdatedt.strftime('%Y/%m'),
-                                                                   member+1,startdatestring)
-
-                ds_in = xr.open_dataset(file_tmp)
-                da_in = ds_in[self.varname].rename(self.params)
-                da_in = da_in.expand_dims({'number': [member]})
-                da_in = da_in.transpose('number','time', 'y', 'x')
+        if self.cache_layout != 'member':
+            members = []
+            if self._save_filename_ensemble(self.startdate, self.grid) in self.files_to_retrieve:
+                members = list(range(self.enssize))
+        else:
+            members = [member for member in range(self.enssize)
+                       if self._save_filename(date=self.startdate, number=member,
+                                              grid=self.grid) in self.files_to_retrieve]
+
+        # members for consolidated ensemble files (cache_layout ensemble/zarr) and
+        # members to be interpolated (all members are interpolated at once)
+        _ensemble_native = []
+        _ensemble_grid = []
+
+        for member in members:
+
+            file_tmp = self.root_server+self.fileformat.format(startdatedt.strftime('%Y/%m'),
+                                                               member+1,startdatestring)
+
+            ds_in = xr.open_dataset(file_tmp)
+            da_in = ds_in[self.varname].rename(self.params)
+            da_in = da_in.expand_dims({'number': [member]})
+            da_in = da_in.transpose('number','time', 'y', 'x')
+
+            if self.keep_native == "yes":
+                da_out_save = da_in.isel(time=slice(self.ndays))
+
+                # save projection details as attributes
+                if getattr(da_out_save, 'grid_mapping') == 'stereographic':
+                    da_in_grid = ds_in['stereographic']
+                    da_out_save.attrs['projection'] = 'Stereographic'
+                    da_out_save.attrs['central_latitude'] = getattr(da_in_grid, 'latitude_of_projection_origin')
+                    da_out_save.attrs['central_longitude'] = getattr(da_in_grid, 'longitude_of_projection_origin')
+                da_out_save = da_out_save.rename({'y':'yc','x':'xc'})
+                da_out_save['yc'] = da_out_save['yc'] *100 *1000
+                da_out_save['xc'] = da_out_save['xc'] * 100 * 1000
+                if self.cache_layout != 'member':
+                    _ensemble_native.append(da_out_save)
+                else:
+                    ofile = self._save_filename(date=self.startdate, number=member, grid='native')
+                    self.save_cache_file(da_out_save.sel(number=member), ofile)
 
-                if self.keep_native == "yes":
-                    da_out_save = da_in.isel(time=slice(self.ndays))
 
-                    # save projection details as attributes
-                    if getattr(da_out_save, 'grid_mapping') == 'stereographic':
-                        da_in_grid = ds_in['stereographic']
-                        da_out_save.attrs['projection'] = 'Stereographic'
-                        da_out_save.attrs['central_latitude'] = getattr(da_in_grid, 'latitude_of_projection_origin')
-                        da_out_save.attrs['central_longitude'] = getattr(da_in_grid, 'longitude_of_projection_origin')
-                    da_out_save = da_out_save.rename({'y':'yc','x':'xc'})
-                    da_out_save['yc'] = da_out_save['yc'] *100 *1000
-                    da_out_save['xc'] = da_out_save['xc'] * 100 * 1000
-                    ofile = self._save_filename(date=self.startdate, number=member, grid='native')
-                    da_out_save.sel(number=member).to_netcdf(ofile)
+            if self.linterp:
+                _ensemble_grid.append(da_in.isel(time=slice(self.ndays)))
 
+        if _ensemble_native:
+            self.save_ensemble(xr.concat(_ensemble_native, dim='number'), self.startdate, 'native')
 
-                if self.linterp:
-                    da_out_save = self.interpolate(da_in.isel(time=slice(self.ndays)))
+        # interpolate all members at once
+        if _ensemble_grid:
+            da_out_grid = self.interpolate(xr.concat(_ensemble_grid, dim='number'))
+            if self.cache_layout != 'member':
+                self.save_ensemble(da_out_grid, self.startdate, self.grid)
+            else:
+                for member in da_out_grid['number'].values:
                     ofile = self._save_filename(date=self.startdate, number=member, grid=self.grid)
-                    da_out_save.sel(number=member).to_netcdf(ofile)
+                    self.save_cache_file(da_out_grid.sel(number=member), ofile)
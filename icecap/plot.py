@@ -7,6 +7,7 @@ import metrics
 import utils
 import plottype_map
 import plottype_ts
+from metrics.metric import SHARED_DATA, BaseMetric
 
 
 def plot_api(conf, args):
@@ -35,6 +36,42 @@ def plot_api(conf, args):
 
     return ofiles
 
+def plot_api_multi(conf, args, plotids):
+    """
+    API running plot_api for several plotids in one process.
+    Plotids with identical data requirements (verification/calibration forecasts,
+    target, grid, calibration) are grouped and the data are loaded only once per group
+    :param conf: configuration object
+    :param args: command line arguments
+    :param plotids: list of plotids
+    :return: list of output files created
+    """
+    groups = {}
+    for plotid in plotids:
+        groups.setdefault(BaseMetric.data_signature(conf, plotid), []).append(plotid)
+
+    ofiles_plotid = {}
+    try:
+        for group in groups.values():
+            # data is only kept in memory if it is used by several plotids
+            SHARED_DATA.enabled = len(group) > 1
+            if SHARED_DATA.enabled:
+                utils.print_info(f'Plotting {", ".join(group)} with shared data')
+            for plotid in group:
+                args.plotid = plotid
+                ofiles_plotid[plotid] = plot_api(conf, args)
+            SHARED_DATA.clear()
+    finally:
+        SHARED_DATA.enabled = False
+        SHARED_DATA.clear()
+
+    # output files in the order of plotids
+    ofiles_all = []
+    for plotid in plotids:
+        if ofiles_plotid[plotid] is not None:
+            ofiles_all += ofiles_plotid[plotid]
+    return ofiles_all
+
 if __name__ == '__main__':
     des = 'Plot a metric from staged data files'
     parser = argparse.ArgumentParser(description=des,
@@ -51,4 +88,8 @@ if __name__ == '__main__':
 
     conf = config.Configuration(file=args.configfile)
 
-    plot_api(conf, args)
+    plotids = utils.csv_to_list(args.plotid)
+    if len(plotids) > 1:
+        plot_api_multi(conf, args, plotids)
+    else:
+        plot_api(conf, args)
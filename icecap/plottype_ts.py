@@ -12,6 +12,7 @@ import matplotlib as mpl
 
 import plottypes
 import utils
+import metrics.metric_utils as mutils
 
 
 class TsPlot(plottypes.GenericPlot):
@@ -175,9 +176,12 @@ class TsPlot(plottypes.GenericPlot):
                     if self.plot_shading:
                         perc = self.plot_shading  # ,1/3*100]
                         shading = (np.linspace(0.2,1,len(perc)+1)**3)[1:]
+                        # lower and upper percentiles of all bands are computed at once
+                        _quantiles = mutils.quantiles(_ds_file_var, [p/100 for p in perc] + [1-p/100 for p in perc],
+                                                      dim='member')
                         for pi, p in enumerate(perc):
-                            ax.fill_between(x_axis_values, _ds_file_var.quantile(p/100, dim='member'),
-                                             _ds_file_var.quantile(1-p/100, dim='member'),
+                            ax.fill_between(x_axis_values, _quantiles.isel(quantile=pi),
+                                             _quantiles.isel(quantile=len(perc) + pi),
                                              color='teal', alpha=shading[pi],
                                             label=f'probability: {p}-{100 - p}%')
                     else:
@@ -0,0 +1,30 @@
+"""Script to rebuild the manifests of all cache directories from the files on disk"""
+
+import argparse
+import os
+import config
+import clargs
+import utils
+import cache_manifest
+
+os.environ['HDF5_USE_FILE_LOCKING']='FALSE'
+
+
+if __name__ == '__main__':
+    description = 'Rebuild manifests of all directories in cachedir'
+    parser = argparse.ArgumentParser(description=description,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    clargs.add_config_option(parser)
+    args = parser.parse_args()
+    conf = config.Configuration(file=args.configfile)
+
+    for _root, _dirs, _files in os.walk(conf.cachedir):
+        # Zarr stores are recorded as one file
+        _dirs[:] = [_dir for _dir in _dirs if not _dir.endswith('.zarr')]
+        manifest = cache_manifest.CacheManifest(_root)
+        nfiles = manifest.rebuild(pattern=f'*_{conf.params}*')
+        if nfiles:
+            utils.print_info(f'{manifest.filename}: {nfiles} files')
+
+    utils.print_banner('ALL DONE')
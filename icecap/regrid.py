@@ -0,0 +1,101 @@
+"""Regridding of forecast data to the observation grid using precomputed sparse weights.
+Weights are stored in the ESMF/xesmf format (1-based indices col/row and weights S)
+and applied as scipy sparse matrix product, so that xesmf is only needed to create them"""
+
+import numpy as np
+import xarray as xr
+from scipy import sparse
+
+# approximate size (in bytes) of the input block regridded at once
+REGRID_CHUNK_BYTES = 256 * 1024**2
+
+
+def horizontal_dims(ds):
+    """
+    Horizontal dimensions of a dataset with lon/lat coordinates (either 1D or 2D)
+    :param ds: xarray object with lon and lat
+    :return: tuple of dimension names in (y, x) order
+    """
+    if ds['lat'].ndim == 2:
+        return ds['lat'].dims
+    return ds['lat'].dims + ds['lon'].dims
+
+
+def read_weights(filename, n_in, n_out):
+    """
+    Read weights file and convert it to sparse matrix
+    :param filename: netcdf file with variables col, row and S
+    :param n_in: number of grid cells of the source grid
+    :param n_out: number of grid cells of the target grid
+    :return: scipy CSR matrix with shape (n_out, n_in)
+    """
+    with xr.open_dataset(filename) as ds_weights:
+        col = ds_weights['col'].values.astype('int64') - 1
+        row = ds_weights['row'].values.astype('int64') - 1
+        values = ds_weights['S'].values
+
+    return sparse.csr_matrix((values, (row, col)), shape=(n_out, n_in))
+
+
+class Regridder:
+    """ Regrid xarray objects from a source to a target grid using sparse weights """
+
+    def __init__(self, weights_file, ds_in, ds_out):
+        """
+        :param weights_file: netcdf file with weights (as written by xesmf)
+        :param ds_in: xarray object on source grid (with lon/lat)
+        :param ds_out: xarray object on target grid (with lon/lat)
+        """
+        self.dims_in = horizontal_dims(ds_in)
+        self.dims_out = horizontal_dims(ds_out)
+        self.shape_in = tuple(ds_in.sizes[_dim] for _dim in self.dims_in)
+        self.shape_out = tuple(ds_out.sizes[_dim] for _dim in self.dims_out)
+
+        self.weights = read_weights(weights_file, int(np.prod(self.shape_in)),
+                                    int(np.prod(self.shape_out)))
+        # target grid cells without any source cell are set to NaN
+        self.unmapped = np.diff(self.weights.indptr) == 0
+
+        self.coords_out = {_name: ds_out[_name].variable for _name in ['lon', 'lat']}
+
+    def regrid_array(self, data):
+        """
+        Regrid numpy array. The horizontal dimensions need to be the last two dimensions.
+        Leading dimensions are regridded in blocks of about REGRID_CHUNK_BYTES
+        :param data: numpy array with shape (..., shape_in)
+        :return: numpy array with shape (..., shape_out)
+        """
+        leading_shape = data.shape[:-2]
+        data_flat = data.reshape(-1, self.weights.shape[1])
+        dtype = np.result_type(data.dtype, np.float32)
+
+        out_flat = np.empty((data_flat.shape[0], self.weights.shape[0]), dtype=dtype)
+        _nblock = max(1, REGRID_CHUNK_BYTES // max(1, data_flat.shape[1] * data_flat.itemsize))
+        for _start in range(0, data_flat.shape[0], _nblock):
+            _block = data_flat[_start:_start + _nblock]
+            out_flat[_start:_start + _nblock] = (self.weights @ _block.T).T
+        out_flat[:, self.unmapped] = np.nan
+
+        return out_flat.reshape(leading_shape + self.shape_out)
+
+    def __call__(self, da_in):
+        """
+        Regrid xarray DataArray. All dimensions except the horizontal ones are kept
+        :param da_in: xarray DataArray on source grid
+        :return: xarray DataArray on target grid with lon/lat of the target grid
+        """
+        # avoid name clashes if source and target grid use the same dimension names
+        _rename = {_dim: f'{_dim}_in' for _dim in self.dims_in if _dim in self.dims_out}
+        da_in = da_in.rename(_rename)
+        dims_in = [_rename.get(_dim, _dim) for _dim in self.dims_in]
+
+        da_out = xr.apply_ufunc(self.regrid_array, da_in,
+                                input_core_dims=[dims_in],
+                                output_core_dims=[list(self.dims_out)],
+                                exclude_dims=set(dims_in),
+                                dask='parallelized',
+                                output_dtypes=[np.result_type(da_in.dtype, np.float32)],
+                                dask_gufunc_kwargs={'output_sizes': dict(zip(self.dims_out,
+                                                                             self.shape_out))},
+                                keep_attrs=False)
+        return da_out.assign_coords(self.coords_out)
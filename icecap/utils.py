@@ -262,6 +262,22 @@ def make_hc_datelist_new(refdates, fromdates, todates):
 
     return hc_date_dict, shc_date_dict, [num for sublist in alldates for num in sublist]
 
+def memory_to_bytes(_memory):
+    """
+    Convert memory string to number of bytes
+    :param _memory: memory as string, e.g. 512MB, 4GB or number of bytes
+    :return: number of bytes as integer
+    """
+    units = {'KB': 1024, 'MB': 1024**2, 'GB': 1024**3, 'TB': 1024**4}
+
+    _memory = str(_memory).strip().upper()
+    if not _memory:
+        return 0
+    for unit, factor in units.items():
+        if _memory.endswith(unit):
+            return int(float(_memory[:-len(unit)]) * factor)
+    return int(float(_memory))
+
 def make_dir(directory_name, verbose=False):
     """
     routine to create directory on operating system
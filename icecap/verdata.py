@@ -2,6 +2,11 @@
 
 import os
 import shutil
+import time
+import tempfile
+import urllib.request
+import urllib.error
+import concurrent.futures
 import datetime as dt
 import xarray as xr
 from dateutil.relativedelta import relativedelta
@@ -12,6 +17,14 @@ import utils
 
 xr.set_options(keep_attrs=True)
 
+# number of attempts per server, waiting time (s) before the first retry (doubled for each
+# further retry) and timeout (s) of one download
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_BACKOFF = 2.
+DOWNLOAD_TIMEOUT = 120
+# root URL of the http file server of the OSI SAF THREDDS server (if verdata_server is not set)
+OSI_THREDDS_SERVER = "https://thredds.met.no/thredds/fileServer/osisaf/met.no/"
+
 params_verdata = {
     'sic' : {
         'osi-450-a1' : 'ice_conc',
@@ -64,8 +77,17 @@ class _OSIThreddsRetrieval(VerifyingData):
     def __init__(self, conf):
         super().__init__(conf)
         self.dummydate = None
+        self.download_workers = int(conf.download_workers)
+
+        # files are downloaded using the http file server of thredds
+        self.root_server = (conf.verdata_server or OSI_THREDDS_SERVER).rstrip('/') + '/'
+        self._set_sources()
+
+        if self.dummydate not in self.loopdates:
+            self.loopdates.append(self.dummydate)
 
-        self.root_server = "https://thredds.met.no/thredds/dodsC/osisaf/met.no/"
+    def _set_sources(self):
+        """ Set servers, filenames and dummy date of verif_name (relative to root_server) """
         if self.verif_name == 'osi-450-a':
             self.server = [self.root_server+"reprocessed/ice/conc_450a_files/"]
             self.filebase = ["ice_conc_nh_ease2-250_cdr-v3p0_"]
@@ -101,11 +123,6 @@ class _OSIThreddsRetrieval(VerifyingData):
                              f'This also means that no dummy data has been specified for this dataset \n'
                              f'(Please check the manual how to specify such a dummy observation file for a new dataset)')
 
-        if self.dummydate not in self.loopdates:
-            self.loopdates.append(self.dummydate)
-
-
-
     def make_filelist(self):
         """Generate a list of files which are expected to be staged"""
         filename = self._filenaming_convention('verif')
@@ -114,68 +131,117 @@ class _OSIThreddsRetrieval(VerifyingData):
         files.append(f'{self.obscachedir}/{self.verif_name}.nc')
         return files
 
-    def process(self, verbose):
+    def _urls(self, _date):
+        """
+        URLs of one date in the order in which the servers are tried
+        :param _date: date as YYYYMMDD
+        :return: list of URLs
         """
-        Retrieve and process verification data file
+        return [f'{server}{_date[:4]}/{_date[4:6]}/{filebase}{_date}{fileext}'
+                for server, filebase, fileext in zip(self.server, self.filebase, self.fileext)]
+
+    def _download(self, _date, ofile):
+        """
+        Download file of one date. Servers are tried in the given order and temporary errors
+        (e.g. timeouts or server errors) are retried with increasing waiting time.
+        Files which don't exist on a server (HTTP 404) are not retried
+        :param _date: date as YYYYMMDD
+        :param ofile: local filename
+        :return: URL of the downloaded file or None if no server provides the file
+        """
+        for url in self._urls(_date):
+            for attempt in range(DOWNLOAD_RETRIES):
+                try:
+                    with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response, \
+                            open(ofile, 'wb') as fh_out:
+                        shutil.copyfileobj(response, fh_out)
+                    return url
+                except urllib.error.HTTPError as err:
+                    if err.code == 404:
+                        break
+                except OSError:
+                    # includes connection errors and timeouts
+                    pass
+                if attempt < DOWNLOAD_RETRIES - 1:
+                    time.sleep(DOWNLOAD_BACKOFF * 2**attempt)
+        return None
+
+    def _retrieve_date(self, _date, _ofile, verbose):
+        """
+        Download, process and save verification data of one date
+        :param _date: date as YYYYMMDD
+        :param _ofile: cache filename
         :param verbose: more debugging output
+        :return: True if data has been found and processed
         """
-        filename = self._filenaming_convention('verif')
-        utils.make_dir(self.obscachedir)
+        _fd, _tmpfile = tempfile.mkstemp(dir=self.obscachedir, suffix='.download')
+        os.close(_fd)
+        try:
+            file = self._download(_date, _tmpfile)
+            if file is None:
+                print(f'Data {self._urls(_date)[-1]} not found')
+                return False
+            if verbose:
+                print(f'Processing file {file}')
+
+            self._process_file(_tmpfile, _ofile)
+        # a corrupt or unexpected file only invalidates this date
+        except (OSError, ValueError, KeyError, AttributeError) as err:
+            print(f'Data of {_date} could not be processed ({err})')
+            return False
+        finally:
+            os.remove(_tmpfile)
+        return True
+
+    def _process_file(self, _file, _ofile):
+        """
+        Convert downloaded file to cache file
+        :param _file: downloaded file
+        :param _ofile: cache filename
+        """
+        with xr.open_dataset(_file) as ds_in:
+            da_in = ds_in[params_verdata[self.params][self.verif_name]].load()
+            da_in_grid = ds_in[getattr(da_in, 'grid_mapping')]
 
+        da_in = da_in.rename(self.params)
 
+        da_in = da_in/100
+        da_in = da_in.rename({'lon': 'longitude', 'lat': 'latitude'})
+        da_in = da_in.transpose( 'time', 'yc', 'xc')
+        da_in['xc'] = da_in['xc'] * 1000
+        da_in['yc'] = da_in['yc'] * 1000
 
-        for _date in self.loopdates:
-            lfound = True
-            _ofile = f'{self.obscachedir}/{filename.format(_date, self.params)}'
+        if getattr(da_in_grid, 'grid_mapping_name') == 'lambert_azimuthal_equal_area':
+            da_in.attrs['projection'] = 'LambertAzimuthalEqualArea'
+            da_in.attrs['central_latitude'] = getattr(da_in_grid, 'latitude_of_projection_origin')
+            da_in.attrs['central_longitude'] = getattr(da_in_grid, 'longitude_of_projection_origin')
 
+        if getattr(da_in_grid, 'grid_mapping_name') == 'polar_stereographic':
+            da_in.attrs['projection'] = 'Stereographic'
+            da_in.attrs['central_latitude'] = getattr(da_in_grid, 'latitude_of_projection_origin')
+            da_in.attrs['central_longitude'] = getattr(da_in_grid, 'straight_vertical_longitude_from_pole')
+            da_in.attrs['true_scale_latitude'] = getattr(da_in_grid, 'standard_parallel')
 
-            if _ofile in self.files_to_retrieve:
-                try:
-                    file = f'{self.server[0]}{_date[:4]}/{_date[4:6]}/{self.filebase[0]}{_date}{self.fileext[0]}'
-                    da_in = xr.open_dataset(file)[params_verdata[self.params][self.verif_name]]
-                    if verbose:
-                        print(f'Processing file {file}')
-
-                except:
-                    if len(self.server) > 1:
-                        try:
-                            file = f'{self.server[1]}{_date[:4]}/{_date[4:6]}/{self.filebase[1]}{_date}{self.fileext[1]}'
-                            da_in = xr.open_dataset(file)[params_verdata[self.params][self.verif_name]]
-                            if verbose:
-                                print(f'Processing file {file}')
-                        except:
-                            print(f'Data {file} not found')
-                            lfound = False
-                    else:
-                        print(f'Data {file} not found')
-                        lfound = False
-
-
-                if lfound:
-                    da_in = da_in.rename(self.params)
-
-                    da_in = da_in/100
-                    da_in = da_in.rename({'lon': 'longitude', 'lat': 'latitude'})
-                    da_in = da_in.transpose( 'time', 'yc', 'xc')
-                    da_in['xc'] = da_in['xc'] * 1000
-                    da_in['yc'] = da_in['yc'] * 1000
-
-
-                    mapping_grid = getattr(da_in,'grid_mapping')
-                    da_in_grid = xr.open_dataset(file)[mapping_grid]
-                    if getattr(da_in_grid, 'grid_mapping_name') == 'lambert_azimuthal_equal_area':
-                        da_in.attrs['projection'] = 'LambertAzimuthalEqualArea'
-                        da_in.attrs['central_latitude'] = getattr(da_in_grid, 'latitude_of_projection_origin')
-                        da_in.attrs['central_longitude'] = getattr(da_in_grid, 'longitude_of_projection_origin')
-
-                    if getattr(da_in_grid, 'grid_mapping_name') == 'polar_stereographic':
-                        da_in.attrs['projection'] = 'Stereographic'
-                        da_in.attrs['central_latitude'] = getattr(da_in_grid, 'latitude_of_projection_origin')
-                        da_in.attrs['central_longitude'] = getattr(da_in_grid, 'straight_vertical_longitude_from_pole')
-                        da_in.attrs['true_scale_latitude'] = getattr(da_in_grid, 'standard_parallel')
-
-
-                    da_in.to_netcdf(_ofile)
+        self.save_cache_file(da_in, _ofile)
+
+    def process(self, verbose):
+        """
+        Retrieve and process verification data files. Up to download_workers files
+        are downloaded at the same time
+        :param verbose: more debugging output
+        """
+        filename = self._filenaming_convention('verif')
+        utils.make_dir(self.obscachedir)
+
+        _todo = [(_date, f'{self.obscachedir}/{filename.format(_date, self.params)}')
+                 for _date in self.loopdates]
+        _todo = [(_date, _ofile) for _date, _ofile in _todo if _ofile in self.files_to_retrieve]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(self.download_workers, 1)) as pool:
+            _futures = [pool.submit(self._retrieve_date, _date, _ofile, verbose)
+                        for _date, _ofile in _todo]
+            for _future in _futures:
+                _future.result()
 
         # copy dummy file to new id
         if not os.path.isfile(f'{self.obscachedir}/{self.verif_name}.nc'):
@@ -0,0 +1,5 @@
+"""pytest configuration: ICECAP modules are imported without package prefix"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'icecap'))
@@ -0,0 +1,86 @@
+"""Tests of the manifest of the cache files in one directory"""
+import os
+
+import numpy as np
+import xarray as xr
+
+import cache_manifest
+
+
+def _write_file(filename, ntime=2):
+    """ Write cache file with ntime timesteps """
+    da = xr.DataArray(np.zeros((ntime, 3, 4), dtype='float32'), dims=('time', 'yc', 'xc'), name='sic')
+    da.to_netcdf(filename)
+    return da
+
+
+def test_record_lookup(tmp_path):
+    """ Recorded files are found after reading the manifest file again """
+    da = _write_file(tmp_path / '20200101_sic.nc')
+    cache_manifest.CacheManifest(str(tmp_path)).record(str(tmp_path / '20200101_sic.nc'), da)
+
+    entry = cache_manifest.CacheManifest(str(tmp_path)).lookup(str(tmp_path / '20200101_sic.nc'))
+    assert entry['ntime'] == 2
+    assert entry['shape'] == [2, 3, 4]
+    assert entry['dtype'] == 'float32'
+    assert entry['sha1'] == cache_manifest.file_checksum(str(tmp_path / '20200101_sic.nc'))
+    assert cache_manifest.CacheManifest(str(tmp_path)).lookup(str(tmp_path / '20200102_sic.nc')) is None
+
+
+def test_stale_entries(tmp_path):
+    """ Entries are not returned if modification time or size of the file have changed """
+    manifest = cache_manifest.CacheManifest(str(tmp_path))
+    for _date in ['20200101', '20200102']:
+        manifest.record(str(tmp_path / f'{_date}_sic.nc'), _write_file(tmp_path / f'{_date}_sic.nc'))
+
+    _stat = os.stat(tmp_path / '20200101_sic.nc')
+    os.utime(tmp_path / '20200101_sic.nc', ns=(_stat.st_atime_ns, _stat.st_mtime_ns + 10**9))
+    assert manifest.lookup(str(tmp_path / '20200101_sic.nc')) is None
+
+    _write_file(tmp_path / '20200102_sic.nc', ntime=3)
+    assert manifest.lookup(str(tmp_path / '20200102_sic.nc')) is None
+
+
+def test_removed_entries(tmp_path):
+    """ Removed files are dropped from the entries, also after reading the manifest file again """
+    manifest = cache_manifest.CacheManifest(str(tmp_path))
+    for _date in ['20200101', '20200102']:
+        manifest.record(str(tmp_path / f'{_date}_sic.nc'), _write_file(tmp_path / f'{_date}_sic.nc'))
+    manifest.remove(str(tmp_path / '20200101_sic.nc'))
+
+    assert manifest.lookup(str(tmp_path / '20200101_sic.nc')) is None
+    assert set(cache_manifest.CacheManifest(str(tmp_path)).entries) == {'20200102_sic.nc'}
+
+
+def test_truncated_line(tmp_path):
+    """ Incomplete last line (interrupted task) is skipped and doesn't corrupt later entries """
+    manifest = cache_manifest.CacheManifest(str(tmp_path))
+    manifest.record(str(tmp_path / '20200101_sic.nc'), _write_file(tmp_path / '20200101_sic.nc'))
+    with open(manifest.filename, 'a', encoding='utf-8') as _fh:
+        _fh.write('{"file": "20200102_sic.nc", "ntime": ')
+
+    manifest = cache_manifest.CacheManifest(str(tmp_path))
+    assert set(manifest.entries) == {'20200101_sic.nc'}
+
+    manifest.record(str(tmp_path / '20200103_sic.nc'), _write_file(tmp_path / '20200103_sic.nc'))
+    assert set(cache_manifest.CacheManifest(str(tmp_path)).entries) == {'20200101_sic.nc', '20200103_sic.nc'}
+
+
+def test_rebuild(tmp_path):
+    """ Rebuilding the entries of some files keeps the entries of the other existing files """
+    manifest = cache_manifest.CacheManifest(str(tmp_path))
+    for _name in ['20200101_sic', '20200102_sic', 'lsm_sic']:
+        manifest.record(str(tmp_path / f'{_name}.nc'), _write_file(tmp_path / f'{_name}.nc'))
+    os.remove(tmp_path / '20200102_sic.nc')
+    # file written without being recorded
+    _write_file(tmp_path / '20200103_sic.nc')
+
+    assert manifest.rebuild('2020*') == 2
+    entries = cache_manifest.CacheManifest(str(tmp_path)).entries
+    assert set(entries) == {'20200101_sic.nc', '20200103_sic.nc', 'lsm_sic.nc'}
+    assert entries['lsm_sic.nc'] == manifest.lookup(str(tmp_path / 'lsm_sic.nc'))
+
+    # entries of deleted files not matching pattern are dropped as well
+    os.remove(tmp_path / 'lsm_sic.nc')
+    assert manifest.rebuild('2020*') == 2
+    assert set(manifest.entries) == {'20200101_sic.nc', '20200103_sic.nc'}
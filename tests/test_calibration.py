@@ -0,0 +1,88 @@
+"""Tests of calibration files with sufficient statistics"""
+import numpy as np
+import xarray as xr
+import pytest
+
+import metrics.metric as metric
+import metrics.metric_utils as mutils
+
+
+def _calibration_data(ndate=6, ntime=4):
+    """ Random calibration forecast/observations with missing observations for some dates """
+    rng = np.random.default_rng(0)
+    coords = {'date': np.arange(ndate), 'time': np.arange(ntime)}
+    da_fc = xr.DataArray(rng.random((1, ndate, 3, ntime, 5, 6)),
+                         dims=('inidate', 'date', 'member', 'time', 'yc', 'xc'), coords=coords)
+    da_obs = xr.DataArray(rng.random((1, ndate, ntime, 5, 6)),
+                          dims=('inidate', 'date', 'time', 'yc', 'xc'), coords=coords)
+    da_obs[0, 1, :, 0, :] = np.nan
+    da_obs[0, 4, 2, :, 3] = np.nan
+    return da_fc, da_obs
+
+
+def _metric(calibrationdir, filename, target='r:0,4'):
+    """ Metric object writing calibration file filename (without reading a configuration file) """
+    obj = object.__new__(metric.BaseMetric)
+    obj.params = 'sic'
+    obj.target = target
+    obj.calibrationdir = str(calibrationdir)
+    obj._calibration_filename = lambda pattern=False: filename
+    return obj
+
+
+@pytest.mark.parametrize('method', ['mean', 'anom'])
+def test_merge_files(tmp_path, method):
+    """ Correction from two files with partial start dates equals correction over all dates """
+    da_fc, da_obs = _calibration_data()
+    ds_all = mutils.calibration_statistics(da_fc, da_obs)
+
+    _files = []
+    for _dates in [slice(0, 2), slice(2, None)]:
+        ds_part = mutils.calibration_statistics(da_fc.isel(date=_dates), da_obs.isel(date=_dates))
+        ds_part.attrs = {'calib_sdates': ','.join(str(_date) for _date in da_fc['date'].values[_dates])}
+        obj = _metric(tmp_path, f'calib_{len(_files)}.nc')
+        obj._save_calibration_statistics(ds_part, method)
+        _files.append(f'{tmp_path}/calib_{len(_files)}.nc')
+
+    ds_merged = mutils.merge_calibration_statistics([metric.BaseMetric._load_calibration_statistics(_file)
+                                                     for _file in _files])
+    xr.testing.assert_allclose(mutils.calibration_correction(ds_merged, method),
+                               mutils.calibration_correction(ds_all, method))
+
+
+def test_file_contains_correction(tmp_path):
+    """ Readers expecting the correction only get the correction from files with statistics """
+    da_fc, da_obs = _calibration_data()
+    ds_stats = mutils.calibration_statistics(da_fc, da_obs)
+    ds_stats.attrs = {'calib_sdates': '0,1,2,3,4,5'}
+    _metric(tmp_path, 'calib.nc')._save_calibration_statistics(ds_stats, 'mean')
+
+    with xr.open_dataset(f'{tmp_path}/calib.nc') as ds_calib:
+        assert ds_calib.attrs['calib_sdates'] == '0,1,2,3,4,5'
+        correction = ds_calib.to_dataarray().squeeze(drop=True)
+    xr.testing.assert_allclose(correction, mutils.calibration_correction(ds_stats, 'mean'),
+                               check_dim_order=False)
+
+
+def test_merge_different_lead_times():
+    """ Statistics computed for different lead times are not merged """
+    da_fc, da_obs = _calibration_data()
+    ds_first = mutils.calibration_statistics(da_fc.isel(date=[0]), da_obs.isel(date=[0]))
+    ds_second = mutils.calibration_statistics(da_fc.isel(date=[1], time=slice(0, 3)),
+                                              da_obs.isel(date=[1], time=slice(0, 3)))
+    with pytest.raises(ValueError):
+        mutils.merge_calibration_statistics([ds_first, ds_second])
+
+
+def test_select_calibration_times():
+    """ Calibration statistics need to cover all lead times of the target """
+    da_fc, da_obs = _calibration_data()
+    ds_stats = mutils.calibration_statistics(da_fc, da_obs)
+
+    obj = _metric(None, 'calib.nc', target='r:1,3')
+    ds_sel = obj._select_calibration_times(ds_stats, da_fc.isel(time=[1, 2]))
+    assert list(ds_sel['time'].values) == [1, 2]
+
+    obj = _metric(None, 'calib.nc', target='r:0,6')
+    with pytest.raises(RuntimeError):
+        obj._select_calibration_times(ds_stats, da_fc)
@@ -0,0 +1,77 @@
+"""Tests of the averaging of forecast/observation data while loading the cache files"""
+import numpy as np
+import pandas as pd
+import xarray as xr
+import pytest
+
+import metrics.metric as metric
+
+NY, NX = 6, 5
+
+
+def _write_file(filename, data, times, **coords):
+    """ Write cache file with the structure of the ICECAP cache """
+    lon = np.linspace(-180, 180, NY * NX).reshape(NY, NX)
+    lat = np.linspace(50, 90, NY * NX).reshape(NY, NX)
+    da = xr.DataArray(data, dims=('time', 'yc', 'xc'), name='sic', attrs={'projection': 'x'},
+                      coords={'time': times, 'yc': np.arange(NY) * 1., 'xc': np.arange(NX) * 1.,
+                              'longitude': (('yc', 'xc'), lon), 'latitude': (('yc', 'xc'), lat),
+                              **coords})
+    da.to_netcdf(filename)
+
+
+@pytest.fixture(name='cache', scope='module')
+def fixture_cache(tmp_path_factory):
+    """ Forecast and observation cache files with missing values differing between
+    members, start dates and observation days """
+    tmp_path = tmp_path_factory.mktemp('cache')
+    rng = np.random.default_rng(0)
+    (tmp_path / 'fc').mkdir()
+    (tmp_path / 'obs').mkdir()
+    for _year in range(2000, 2004):
+        _times = pd.date_range(f'{_year}0101', periods=20)
+        for _member in range(3):
+            data = rng.random((20, NY, NX))
+            data[:, 0, 0] = np.nan
+            data[:, _member, _year % 4] = np.nan
+            _write_file(tmp_path / 'fc' / f'{_year}0101_mem-{_member:03d}_sic_g.nc', data, _times,
+                        number=_member)
+        for _time in _times:
+            # some days are missing
+            if _time.day == 5:
+                continue
+            data = rng.random((1, NY, NX))
+            data[:, 1, _time.day % NX] = np.nan
+            _write_file(tmp_path / 'obs' / f'{_time:%Y%m%d}_sic.nc', data, [_time])
+    return tmp_path
+
+
+def _metric(cachedir):
+    """ Metric object reading the cache (without reading a configuration file) """
+    obj = object.__new__(metric.BaseMetric)
+    obj.__dict__.update(params='sic', grid='g', cacherootdir=str(cachedir), verif_name='obs',
+                        target='r:0,15', use_dask=True, cache_layout='member', read_workers=1,
+                        spatial_window=None, manifests={}, temporal_average_timescale=None,
+                        temporal_average_type=None, temporal_average_value=None)
+    obj.fcverifsets = {'0101': {'sdates': ['20000101', '20010101', '20020101'],
+                                'cachedir': f'{cachedir}/fc', 'enssize': 3},
+                       '0101b': {'sdates': ['20030101', '20010101'],
+                                 'cachedir': f'{cachedir}/fc', 'enssize': 2}}
+    return obj
+
+
+@pytest.mark.parametrize('datatype', ['fc', 'verif'])
+@pytest.mark.parametrize('average_dim', [['member'], ['member', 'date'], ['member', 'date', 'inidate'],
+                                         ['date', 'inidate'], ['member', 'inidate']])
+def test_average_while_loading(cache, datatype, average_dim):
+    """ Averages computed while loading equal the mean over members, then dates and then
+    start dates of the complete data """
+    obj = _metric(cache)
+    da_ref = obj._load_data(obj.fcverifsets, datatype, average_dim=[]).load()
+    for _dim in ['member', 'date', 'inidate']:
+        if _dim in average_dim:
+            da_ref = da_ref.mean(dim=_dim)
+
+    da_out = obj._load_data(obj.fcverifsets, datatype, average_dim=average_dim).load()
+    assert da_out.dims == da_ref.dims
+    np.testing.assert_allclose(da_out.values, da_ref.values, rtol=1e-6)
@@ -0,0 +1,89 @@
+"""Tests of the single-pass score accumulator against the scores computed from the complete data"""
+import numpy as np
+import xarray as xr
+import pytest
+
+import metrics.metric as metric
+
+THRESHOLD = 0.15
+
+
+@pytest.fixture(name='processed_data')
+def fixture_processed_data():
+    """ Processed forecast, observation and persistence data (as created by process_data_for_metric)
+    with land cells and missing observations """
+    rng = np.random.default_rng(0)
+    dims = ('inidate', 'date', 'member', 'time', 'yc', 'xc')
+    coords = {'inidate': ['0101', '0102'], 'date': np.arange(3), 'time': np.arange(5),
+              'yc': np.arange(4.), 'xc': np.arange(3.)}
+    # values close to the threshold, so that ice edge errors occur
+    da_fc = xr.DataArray(rng.random((2, 3, 4, 5, 4, 3)) * 0.3, dims=dims,
+                         coords={**coords, 'member': np.arange(4)})
+    da_obs = xr.DataArray(rng.random((2, 3, 1, 5, 4, 3)) * 0.3, dims=dims,
+                          coords={**coords, 'member': [0]})
+    da_pers = xr.DataArray(rng.random((2, 3, 4, 3)) * 0.3, dims=('inidate', 'date', 'yc', 'xc'),
+                           coords={_dim: coords[_dim] for _dim in ['inidate', 'date', 'yc', 'xc']})
+
+    for _da in [da_fc, da_obs, da_pers]:
+        _da.loc[{'yc': 0., 'xc': 0.}] = np.nan
+    da_obs[0, 1, 0, 2] = np.nan
+    da_obs[1, :, 0, 3, 2, 1] = np.nan
+    da_pers[1, 2, 3, 2] = np.nan
+    da_fc = da_fc.where(~np.isnan(da_obs.isel(member=0, drop=True)))
+
+    return {'da_fc_verif': da_fc, 'da_verdata_verif': da_obs, 'da_verdata_persistence': da_pers}
+
+
+def _accumulate(processed_data, scores):
+    """ Accumulate scores using BaseMetric.accumulate_scores (area sums over the whole grid) """
+    obj = object.__new__(metric.BaseMetric)
+    obj.calib = False
+    return obj.accumulate_scores(processed_data, scores,
+                                 area_sum=lambda _das: [_da.sum(dim=('yc', 'xc')) for _da in _das])
+
+
+def _assert_equal(da_out, da_ref):
+    """ Compare data ignoring the order of the dimensions """
+    xr.testing.assert_allclose(da_out.transpose(*da_ref.dims), da_ref)
+
+
+def test_rmse(processed_data):
+    """ rmse as in rmse.py (squared error of the ensemble mean averaged over all dates) """
+    acc = _accumulate(processed_data, ['se'])
+    da_obs = processed_data['da_verdata_verif'].mean(dim='member')
+    da_fc = processed_data['da_fc_verif'].mean(dim='member')
+    da_pers = processed_data['da_verdata_persistence']
+
+    _assert_equal(np.sqrt(acc.get('se_fc')), np.sqrt(((da_fc - da_obs) ** 2).mean(dim=('inidate', 'date'))))
+    _assert_equal(np.sqrt(acc.get('se_pers')), np.sqrt(((da_pers - da_obs) ** 2).mean(dim=('inidate', 'date'))))
+
+
+def test_brier(processed_data):
+    """ brier score as in brier.py (data set to 1/0 with threshold before averaging over members) """
+    acc = _accumulate(processed_data, ['brier'])
+    _ice = {_name: xr.where(_da > THRESHOLD, 1, 0).where(~np.isnan(_da))
+            for _name, _da in processed_data.items()}
+    da_prob = _ice['da_fc_verif'].mean(dim='member')
+    da_obs = _ice['da_verdata_verif'].isel(member=0, drop=True)
+
+    _assert_equal(acc.get('brier_fc'), ((da_prob - da_obs) ** 2).mean(dim=('date', 'inidate')))
+    _assert_equal(acc.get('brier_pers'),
+                  ((_ice['da_verdata_persistence'] - da_obs) ** 2).mean(dim=('date', 'inidate')))
+
+
+def test_iiee(processed_data):
+    """ iiee, absolute extent error and misplacement error as in iiee.py """
+    acc = _accumulate(processed_data, ['iiee'])
+    da_obs = processed_data['da_verdata_verif'].mean(dim='member')
+    da_valid = ~np.isnan(da_obs)
+    da_obs_ice = xr.where(da_obs > THRESHOLD, 1, 0)
+
+    for _name, _da in [('fc', processed_data['da_fc_verif'].mean(dim='member')),
+                       ('pers', processed_data['da_verdata_persistence'])]:
+        _ice = xr.where(xr.where(da_valid, _da, np.nan) > THRESHOLD, 1, 0)
+        _over = xr.ones_like(da_obs_ice).where(_ice - da_obs_ice == 1, 0).sum(dim=('yc', 'xc'))
+        _under = xr.ones_like(da_obs_ice).where(_ice - da_obs_ice == -1, 0).sum(dim=('yc', 'xc'))
+
+        _assert_equal(acc.get(f'iiee_{_name}'), (_over + _under).mean(dim=('inidate', 'date')))
+        _assert_equal(acc.get(f'aee_{_name}'), np.fabs(_over - _under).mean(dim=('inidate', 'date')))
+        _assert_equal(acc.get(f'me_{_name}'), (2 * np.minimum(_over, _under)).mean(dim=('inidate', 'date')))
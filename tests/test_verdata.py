@@ -0,0 +1,116 @@
+"""Tests of the download of OSI SAF verification data from a local http server"""
+import os
+import glob
+import functools
+import threading
+import http.server
+
+import numpy as np
+import xarray as xr
+import pytest
+
+import verdata
+
+# files of the dates are provided by the first (cdr) or second (icdr) server, 20171202
+# is corrupt and 20171203 is missing on both servers
+CDR_DATES = ['20171129', '20171201']
+ICDR_DATES = ['20171130', '20171202']
+DATES = CDR_DATES + ICDR_DATES + ['20171203']
+# number of requests answered with a server error before the file is provided
+SERVER_ERRORS = {'20171201': 2}
+
+
+def _write_osi_file(filename, _date):
+    """ Write file with the structure of OSI SAF sea ice concentration files """
+    ds = xr.Dataset({'ice_conc': (('time', 'yc', 'xc'), np.full((1, 3, 4), 50.),
+                                  {'grid_mapping': 'Lambert_Azimuthal_Grid'}),
+                     'Lambert_Azimuthal_Grid': ((), 0,
+                                                {'grid_mapping_name': 'lambert_azimuthal_equal_area',
+                                                 'latitude_of_projection_origin': 90.,
+                                                 'longitude_of_projection_origin': 0.})},
+                    coords={'time': [np.datetime64(f'{_date[:4]}-{_date[4:6]}-{_date[6:]}T12')],
+                            'xc': np.arange(4.), 'yc': np.arange(3.),
+                            'lon': (('yc', 'xc'), np.zeros((3, 4))),
+                            'lat': (('yc', 'xc'), np.full((3, 4), 80.))})
+    ds.to_netcdf(filename)
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    """ File server counting requests and answering the first requests of some dates with 503 """
+    requests = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests[self.path] = self.requests.get(self.path, 0) + 1
+        for _date, nerrors in SERVER_ERRORS.items():
+            if _date in self.path and self.requests[self.path] <= nerrors:
+                self.send_error(503)
+                return
+        super().do_GET()
+
+
+@pytest.fixture(name='server')
+def fixture_server(tmp_path):
+    """ Local http server with the directory structure of the OSI SAF THREDDS server """
+    root = tmp_path / 'server'
+    for subdir, filebase, dates in [('conc_450a1_files', 'ice_conc_nh_ease2-250_cdr-v3p1_', CDR_DATES),
+                                    ('conc_cra_files', 'ice_conc_nh_ease2-250_icdr-v3p0_', ICDR_DATES)]:
+        for _date in dates:
+            _dir = root / 'reprocessed' / 'ice' / subdir / _date[:4] / _date[4:6]
+            _dir.mkdir(parents=True, exist_ok=True)
+            if _date == '20171202':
+                (_dir / f'{filebase}{_date}1200.nc').write_text('no netcdf')
+            else:
+                _write_osi_file(_dir / f'{filebase}{_date}1200.nc', _date)
+
+    _Handler.requests = {}
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                            functools.partial(_Handler, directory=str(root)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _retrieval(server, cachedir):
+    """ Retrieval object for osi-cdr using server (without reading a configuration file) """
+    obj = object.__new__(verdata._OSIThreddsRetrieval)
+    obj.verif_name = 'osi-cdr'
+    obj.params = 'sic'
+    obj.cacherootdir = str(cachedir)
+    obj.manifests = {}
+    obj.download_workers = 3
+    obj.root_server = f'{server}/'
+    obj.dummydate = None
+    obj._set_sources()
+    obj.loopdates = DATES
+    obj.files_to_retrieve = [f'{obj.obscachedir}/{_date}_sic.nc' for _date in DATES]
+    return obj
+
+
+def test_download(server, tmp_path, monkeypatch):
+    """ Fallback to the second server, retries of server errors and handling of bad files """
+    monkeypatch.setattr(verdata, 'DOWNLOAD_BACKOFF', 0.01)
+    obj = _retrieval(server, tmp_path / 'cache')
+    obj.process(verbose=False)
+
+    # missing and corrupt files don't stop the retrieval of the other dates
+    cached = sorted(os.path.basename(_file) for _file in glob.glob(f'{obj.obscachedir}/*.nc'))
+    assert cached == ['20171129_sic.nc', '20171130_sic.nc', '20171201_sic.nc', 'osi-cdr.nc']
+    # no temporary files are left behind
+    assert not glob.glob(f'{obj.obscachedir}/*.download')
+
+    # file not found on the first server is taken from the second one
+    requests = _Handler.requests
+    assert requests['/reprocessed/ice/conc_450a1_files/2017/11/ice_conc_nh_ease2-250_cdr-v3p1_201711301200.nc'] == 1
+    assert requests['/reprocessed/ice/conc_cra_files/2017/11/ice_conc_nh_ease2-250_icdr-v3p0_201711301200.nc'] == 1
+
+    # server errors are retried
+    assert requests['/reprocessed/ice/conc_450a1_files/2017/12/ice_conc_nh_ease2-250_cdr-v3p1_201712011200.nc'] == 3
+    with xr.open_dataarray(f'{obj.obscachedir}/20171201_sic.nc') as da_out:
+        np.testing.assert_allclose(da_out.values, 0.5)
+
+    assert set(obj.manifest(obj.obscachedir).entries) == set(cached) - {'osi-cdr.nc'}